@@ -1,109 +1,218 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from app.services.embedding_service import embedding_service
 from app.services.vector_store import vector_store
+from app.services.phash_index import phash_index
 from app.services.heatmap_service import heatmap_service
 from app.services.metadata_service import metadata_service
 from app.services.safety_service import safety_service
 from app.services.remedy_engine import remedy_engine
 from app.services.regeneration_service import regeneration_service
+from app.services.heatmap_render import (
+    HEATMAP_FORMAT, HEATMAP_MAX_EDGE, HEATMAP_MODE, HEATMAP_MODES, HEATMAP_QUALITY,
+    attention_grid, heatmap_mime, render_heatmap
+)
+from app.services.executors import STAGES, run_stage, inference_executor, cpu_executor
+from app.services.analysis_cache import analysis_cache
 from typing import Optional
+import asyncio
+import copy
 import json
-import io
+import numpy as np
+import time
 import traceback
-from PIL import Image
 
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 
 router = APIRouter()
 
+# Similarity floors for vector matches, applied inside FAISS. Below these
+# the risk engine ignores the visual / text score anyway.
+VISUAL_MIN_SIMILARITY = 0.2
+TEXT_MIN_SIMILARITY = 0.3
+
+# Render settings a cached heatmap was produced with
+HEATMAP_KEY = f"{HEATMAP_FORMAT}:{HEATMAP_MAX_EDGE}:{HEATMAP_QUALITY}"
+
+async def timed(timings: dict, name: str, awaitable):
+    """Await `awaitable`, recording its wall-clock time in ms under `name`."""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
 @router.post("/analyze/logo")
-async def analyze_logo(file: UploadFile = File(...)):
+async def analyze_logo(file: UploadFile = File(...), heatmap_mode: Optional[str] = None):
+    # Every blocking stage runs on an executor under a per-stage limit
+    # (app.services.executors), so the event loop stays free for other
+    # requests and overload surfaces as 429 instead of queueing forever.
     try:
+        # "image" (rendered overlay) or "grid" (attention grid only)
+        heatmap_mode = heatmap_mode or HEATMAP_MODE
+        if heatmap_mode not in HEATMAP_MODES:
+            raise HTTPException(status_code=400, detail=f"heatmap_mode must be one of {HEATMAP_MODES}")
+        
+        # Per-stage wall-clock timings (ms), returned and logged
+        timings = {}
+        request_start = time.perf_counter()
+        
         # Read file content
         content = await file.read()
         
         # --- Layer 1: Preprocessing ---
-        # Note: We use the raw bytes for some services to avoid re-encoding loss, 
-        # but PreprocessingService ensures we can handle the image format.
-        # In a full pipeline, we might save the preprocessed image to a temp file here.
+        # Decode the upload once. The resulting ImageContext carries the
+        # EXIF-transposed RGB image plus cached resizes (224px for CLIP,
+        # 32px for pHash, <=1024px for OCR) and is shared by every layer below.
         from app.services.preprocessing_service import preprocessing_service
-        # Verify image is valid
-        preprocessing_service.preprocess(content)
+        image_ctx = await timed(timings, "decode", run_stage("decode", preprocessing_service.preprocess, content))
+
+        # Look the decoded pixels up in the analysis cache. `cached` holds
+        # whatever earlier scans of the same image produced (match lists
+        # only if the vector store has not changed since); the branches
+        # below reuse it and record what they compute in `entry`.
+        def cache_lookup():
+            digest = image_ctx.pixel_digest()
+            # The version of the indexes this worker searches, not the
+            # latest one, which its mapped indexes may not reflect yet
+            version = vector_store.loaded_version
+            return digest, version, analysis_cache.get(digest, version)
+        digest, store_version, cached = await timed(timings, "cache_lookup", run_stage("cache", cache_lookup))
+        entry = dict(cached)
 
+        # Layers 2-5 only depend on the decoded image, so they run as
+        # independent branches and join before risk scoring. Latency is
+        # that of the slowest branch (usually OCR or CLIP + heatmap).
+        
         # --- Layer 2: Visual Fingerprinting ---
-        # Generate pHash for duplicate detection
-        phash = embedding_service.get_phash(content)
+        async def phash_branch():
+            # Generate pHash and look it up in the registered-marks pHash index
+            phash = await run_stage("phash", embedding_service.get_phash, image_ctx)
+            return phash, await run_stage("phash", phash_index.search, phash)
         
         # --- Layer 3: Deep Visual Semantic Analysis (CLIP) ---
-        # Generate CLIP embedding
-        image_embedding = embedding_service.get_image_embedding(content)
-        # Search vector store for visual matches
-        visual_matches = vector_store.search_image(image_embedding)
+        async def visual_branch():
+            if "image_embedding" in cached:
+                image_embedding = cached["image_embedding"]
+                attention_map = np.asarray(cached["attention_map"], dtype=np.float32)
+            else:
+                # One CLIP vision pass yields both the embedding and the
+                # attention map for the heatmap (visual interpretation)
+                async with STAGES["embedding"].slot():
+                    image_embedding, attention_map = await timed(
+                        timings, "clip_vision", embedding_service.get_image_embedding_with_attention_async(image_ctx)
+                    )
+                entry["image_embedding"] = image_embedding
+            # Search vector store for visual matches while the heatmap renders
+            return await asyncio.gather(
+                timed(timings, "visual_search", visual_search(image_embedding)),
+                timed(timings, "heatmap", heatmap_branch(attention_map)),
+            )
         
-        # Generate Heatmap (Visual Interpretation)
-        heatmap_b64 = heatmap_service.generate_heatmap(content)
+        async def visual_search(image_embedding):
+            if "visual_matches" not in cached:
+                entry["visual_matches"] = await run_stage(
+                    "vector_search", vector_store.search_image, image_embedding, min_similarity=VISUAL_MIN_SIMILARITY
+                )
+            # Copied: the response annotates matches in place
+            return copy.deepcopy(entry["visual_matches"])
         
-        # --- Layer 4: Textual & Semantic Analysis (OCR + SBERT) ---
-        from app.services.ocr_service import ocr_service
-        # Extract text from logo
-        extracted_text_image = Image.open(io.BytesIO(content))
-        detected_text = ocr_service.extract_text(extracted_text_image)
+        async def heatmap_branch(attention_map):
+            if attention_map is None:
+                # No attention weights from the shared pass: gradient
+                # saliency on the inference pool
+                attention_map = await timed(timings, "heatmap_saliency", run_stage(
+                    "heatmap", heatmap_service.saliency_map, image_ctx, executor=inference_executor()
+                ))
+            entry["attention_map"] = np.asarray(attention_map).tolist()
+            if heatmap_mode == "grid":
+                # The client colorizes the grid itself
+                return None, attention_grid(attention_map).round(3).tolist()
+            if cached.get("heatmap_key") == HEATMAP_KEY:
+                return cached["heatmap"], None
+            # Rendering runs in the CPU process pool, on the already
+            # downscaled image (also keeps the pickled payload small)
+            heatmap_b64 = await timed(timings, "heatmap_render", run_stage(
+                "heatmap_render", render_heatmap, image_ctx.bounded(HEATMAP_MAX_EDGE), attention_map,
+                executor=cpu_executor()
+            ))
+            entry["heatmap"], entry["heatmap_key"] = heatmap_b64, HEATMAP_KEY
+            return heatmap_b64, None
         
-        text_matches = []
-        text_score = 0
-        if detected_text:
+        # --- Layer 4: Textual & Semantic Analysis (OCR + SBERT) ---
+        async def text_branch():
+            from app.services.ocr_service import ocr_service
+            # Extract text from logo
+            if "detected_text" in cached:
+                detected_text = cached["detected_text"]
+            else:
+                detected_text = await timed(timings, "ocr", run_stage(
+                    "ocr", ocr_service.extract_text, image_ctx, executor=inference_executor()
+                ))
+                entry["detected_text"] = detected_text
+            if not detected_text:
+                return detected_text, []
             # Generate SBERT embedding for extracted text
-            text_embedding = embedding_service.get_text_embedding(detected_text)
+            if "text_embedding" in cached:
+                text_embedding = cached["text_embedding"]
+            else:
+                async with STAGES["embedding"].slot():
+                    text_embedding = await timed(
+                        timings, "text_embedding", embedding_service.get_text_embedding_async(detected_text)
+                    )
+                entry["text_embedding"] = text_embedding
             # Search vector store for text matches
-            text_matches = vector_store.search_text(text_embedding)
-            
-            # Calculate simple text score (max similarity found)
-            if text_matches:
-                # Convert distance to similarity roughly
-                # Distances are L2. Lower is better. 
-                # Very rough approximation for now.
-                best_text_dist = text_matches[0]['score']
-                text_score = max(0, (1 - best_text_dist) * 100) # heuristic
+            if "text_matches" not in cached:
+                entry["text_matches"] = await timed(timings, "text_search", run_stage(
+                    "vector_search", vector_store.search_text, text_embedding, min_similarity=TEXT_MIN_SIMILARITY
+                ))
+            return detected_text, copy.deepcopy(entry["text_matches"])
         
         # --- Layer 5: Risk & Legal Scoring ---
-        # Metadata
-        metadata = metadata_service.extract_metadata(content, file.filename)
+        async def metadata_branch():
+            return await run_stage("metadata", metadata_service.extract_metadata, image_ctx, file.filename)
+        
+        (phash, phash_matches), (visual_matches, (heatmap_b64, heatmap_grid)), (detected_text, text_matches), metadata = (
+            await asyncio.gather(
+                timed(timings, "phash", phash_branch()),
+                timed(timings, "visual", visual_branch()),
+                timed(timings, "text", text_branch()),
+                timed(timings, "metadata", metadata_branch()),
+            )
+        )
+        
+        if entry != cached:
+            await run_stage("cache", analysis_cache.put, digest, store_version, entry)
+        
+        # Text score is the best cosine similarity found
+        text_score = 0
+        if text_matches:
+            text_score = text_matches[0]['similarity'] * 100
+        
         metadata['ocr_text'] = detected_text
         
         # Safety
         safety_results = safety_service.check_safety(metadata)
         
         # Check for pHash match (duplicate)
-        # We need to check if any visual match is a "duplicate"
-        # Since vector store returns L2 distance, we can't directly compare pHash there 
-        # unless stored. For now, we trust the Vector Score for similarity, 
-        # but in a real DB we'd query by pHash. 
-        # Let's assume high vector similarity (> 0.95 approx) implies duplicate for now.
-        # Visual matches: score is L2 distance. 
-        # similarity = 1 - (dist / 2)
+        # A registered mark within DUPLICATE_DISTANCE bits of the upload's
+        # pHash is a near-exact copy.
+        phash_match = bool(phash_matches)
         
+        # Vector matches carry cosine similarity (0-1); report it as 0-100
         best_visual_sim = 0
-        phash_match = False
         
         processed_matches = []
         if visual_matches:
-            min_dist = visual_matches[0]['score']
-            best_visual_sim = max(0, (1 - (min_dist / 2)) * 100)
-            
-            if best_visual_sim > 90:
-                phash_match = True # Approximate "exact match" logic
+            best_visual_sim = visual_matches[0]['similarity'] * 100
                 
             for res in visual_matches:
-                sim = max(0, (1 - (res['score'] / 2)) * 100)
-                res['similarity'] = round(sim, 2)
+                res['similarity'] = round(res['similarity'] * 100, 2)
                 res['type'] = 'visual'
                 processed_matches.append(res)
                 
         # Combine text matches
         for res in text_matches:
-             # Heuristic conversion for text
-             sim = max(0, (1 - res['score']) * 100) 
-             res['similarity'] = round(sim, 2)
+             res['similarity'] = round(res['similarity'] * 100, 2)
              res['type'] = 'text'
              processed_matches.append(res)
              
@@ -130,7 +239,7 @@ async def analyze_logo(file: UploadFile = File(...)):
                 risk_level=risk_result['level'],
                 risk_score=risk_result['score'],
                 metadata={
-                    "heatmap": True if heatmap_b64 else False,
+                    "heatmap": True if heatmap_b64 or heatmap_grid else False,
                     "ocr_text": detected_text,
                     "risk_factors": risk_result['factors']
                 }
@@ -139,6 +248,9 @@ async def analyze_logo(file: UploadFile = File(...)):
         except Exception as e:
             print(f"Store Error: {e}")
 
+        timings["total"] = round((time.perf_counter() - request_start) * 1000, 1)
+        print(f"analyze_logo timings (ms): {timings}")
+
         return {
             "filename": file.filename,
             "risk_score": risk_result['score'],
@@ -146,13 +258,21 @@ async def analyze_logo(file: UploadFile = File(...)):
             "risk_factors": risk_result['factors'],
             "risk_breakdown": risk_result['breakdown'],
             "phash": phash,
+            "phash_matches": phash_matches,
             "heatmap": heatmap_b64,
+            "heatmap_mime": heatmap_mime() if heatmap_b64 else None,
+            "heatmap_grid": heatmap_grid,
             "detected_text": detected_text,
             "similar_marks": processed_matches[:5], # Top 5 mixed
             "metadata": metadata,
             "safety": safety_results,
-            "remedy": remedy
+            "remedy": remedy,
+            "cached": bool(cached),
+            "timings": timings
         }
+    except HTTPException:
+        # Backpressure (429) from a stage limit
+        raise
     except Exception as e:
         print(f"Error in analyze_logo: {e}")
         import traceback
@@ -174,11 +294,14 @@ async def generate_logo(file: UploadFile = File(...), risk_score: float = Form(.
 @router.post("/analyze/text")
 async def analyze_text(text: str = Form(...)):
     try:
-        embedding = embedding_service.get_text_embedding(text)
-        results = vector_store.search_text(embedding)
+        async with STAGES["embedding"].slot():
+            embedding = await embedding_service.get_text_embedding_async(text)
+        results = await run_stage("vector_search", vector_store.search_text, embedding)
         return {
             "text": text,
             "similar_marks": results
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
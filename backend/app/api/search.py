@@ -1,20 +1,48 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from app.services.embedding_service import embedding_service
 from app.services.vector_store import vector_store
+from app.services.executors import STAGES, run_stage, inference_executor
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
+# Results per query: FAISS work and response size grow with k
+MAX_K = 100
+
 class SearchRequest(BaseModel):
     query: str
-    k: int = 5
+    k: int = Field(5, ge=1, le=MAX_K)
 
 class SearchResult(BaseModel):
     score: float
+    similarity: float
     metadata: dict
     content: Optional[str] = None # Helper to extract content directly if available
 
+class BatchSearchRequest(BaseModel):
+    queries: List[str] = Field(..., max_length=10000)
+    k: int = Field(5, ge=1, le=MAX_K)
+    min_similarity: Optional[float] = None
+    # "text": SBERT over the text index; "image": CLIP text over the image index
+    modality: Literal["text", "image"] = "text"
+
+class BatchSearchResult(BaseModel):
+    query: str
+    results: List[SearchResult]
+
+def _format_result(res: dict) -> SearchResult:
+    # Add simple content extraction if metadata has 'text' or 'content' field
+    # strict typing for Pydantic
+    metadata = res.get("metadata", {})
+    content = metadata.get("text") or metadata.get("content") or ""
+    return SearchResult(
+        score=res["score"],
+        similarity=res["similarity"],
+        metadata=metadata,
+        content=str(content)
+    )
+
 @router.post("/", response_model=List[SearchResult])
 async def search_knowledge_base(request: SearchRequest):
     """
@@ -23,29 +51,47 @@ async def search_knowledge_base(request: SearchRequest):
     """
     try:
         # 1. Generate embedding for the query
-        # Using get_text_embedding from embedding_service (SBERT)
+        # Using get_text_embedding_async from embedding_service (SBERT, micro-batched)
         # Ensure this matches the embedding model used for the index
-        query_vector = embedding_service.get_text_embedding(request.query)
+        async with STAGES["embedding"].slot():
+            query_vector = await embedding_service.get_text_embedding_async(request.query)
         
         # 2. Search text index
-        results = vector_store.search_text(query_vector, k=request.k)
+        results = await run_stage("vector_search", vector_store.search_text, query_vector, k=request.k)
         
         # 3. Format results
-        formatted_results = []
-        for res in results:
-            # Add simple content extraction if metadata has 'text' or 'content' field
-            # strict typing for Pydantic
-            metadata = res.get("metadata", {})
-            content = metadata.get("text") or metadata.get("content") or ""
-            
-            formatted_results.append(SearchResult(
-                score=res["score"],
-                metadata=metadata,
-                content=str(content)
-            ))
-            
-        return formatted_results
+        return [_format_result(res) for res in results]
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Search error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/batch", response_model=List[BatchSearchResult])
+async def search_batch(request: BatchSearchRequest):
+    """
+    Screen many queries in one call (e.g. the nightly watch-list job).
+    Queries are embedded in batches and searched with a single FAISS call.
+    """
+    try:
+        if request.modality == "image":
+            embed, search = embedding_service.get_clip_text_embeddings, vector_store.search_image_batch
+        else:
+            embed, search = embedding_service.get_text_embeddings, vector_store.search_text_batch
+        # Already one large batch: straight to the inference pool
+        query_vectors = await run_stage("embedding", embed, request.queries, executor=inference_executor())
+        batch_results = await run_stage(
+            "vector_search", search, query_vectors, k=request.k, min_similarity=request.min_similarity
+        )
+
+        return [
+            BatchSearchResult(query=query, results=[_format_result(res) for res in results])
+            for query, results in zip(request.queries, batch_results)
+        ]
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Batch search error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,6 +1,13 @@
+import asyncio
+import logging
+import os
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="TruLogo API", version="0.1.0")
 
 # CORS
@@ -23,10 +30,37 @@ app.include_router(search.router, prefix="/api/v1")
 from app.api.endpoints import generate
 app.include_router(generate.router, prefix="/api/v1")
 
+# Load models in the background at start-up; /ready reports when done
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "1") == "1"
+_warmup_task = None
+_warmup_error = None
+
+def _warmup_done(task):
+    # Keep the failure for /ready and /health instead of reporting "loading" forever
+    global _warmup_error
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        _warmup_error = str(error)
+        logger.error("Model warm-up failed: %s", error)
+
 @app.on_event("startup")
 async def startup():
-    # Initialize services if needed (e.g. model loading)
-    pass
+    global _warmup_task
+    if WARMUP_MODELS:
+        # Register every lazily loaded model, then load them off the event
+        # loop so the server accepts requests (and /health) immediately
+        from app.services import ocr_service  # noqa: F401
+        from app.services.lazy_model import warm_up
+        loop = asyncio.get_running_loop()
+        _warmup_task = loop.run_in_executor(None, warm_up)
+        _warmup_task.add_done_callback(_warmup_done)
+
+@app.on_event("shutdown")
+async def shutdown():
+    from app.services import executors
+    executors.shutdown()
 
 @app.get("/")
 async def root():
@@ -34,4 +68,39 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    # Per-stage load doubles as the queue-depth signal for load balancers
+    from app.services.executors import stage_stats
+    from app.services.lazy_model import load_errors
+    errors = load_errors()
+    return {
+        "status": "degraded" if errors else "healthy",
+        "stages": stage_stats(),
+        "warmup_error": _warmup_error,
+        "model_errors": errors,
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    # Unlike /health, not ready (503) until every model has been loaded;
+    # "failed" (with the errors) tells a broken load from a slow one
+    from app.services.lazy_model import load_errors, readiness
+    models = readiness()
+    ready = all(models.values())
+    errors = load_errors()
+    if ready:
+        status = "ready"
+    elif errors or _warmup_error:
+        status = "failed"
+    else:
+        status = "loading"
+    content = {"status": status, "models": models}
+    if status == "failed":
+        content.update(error=_warmup_error, model_errors=errors)
+    return JSONResponse(status_code=200 if ready else 503, content=content)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    # Hit rates for tuning the cache sizes (per worker process)
+    from app.services.analysis_cache import analysis_cache
+    from app.services.embedding_service import embedding_service
+    return {"embeddings": embedding_service.cache_stats(), "analysis": analysis_cache.stats()}
@@ -0,0 +1,85 @@
+import json
+import os
+
+from app.services.cache import DiskCache, LRUCache
+from app.services.embedding_service import CLIP_MODEL_NAME, SBERT_MODEL_NAME
+from app.services.ocr_service import OCR_MODE
+
+# In-memory tier bounds
+ANALYSIS_CACHE_ITEMS = int(os.getenv("ANALYSIS_CACHE_ITEMS", "1024"))
+ANALYSIS_CACHE_BYTES = int(os.getenv("ANALYSIS_CACHE_BYTES", str(64 << 20)))
+
+# Optional on-disk tier (SQLite) shared by all workers; unset = memory only
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH")
+ANALYSIS_CACHE_DISK_ITEMS = int(os.getenv("ANALYSIS_CACHE_DISK_ITEMS", "100000"))
+
+# Models and settings cached outputs depend on. It prefixes every key, so
+# changing any of them (here or in another worker) never serves outputs
+# of the old pipeline.
+PIPELINE_ID = f"clip={CLIP_MODEL_NAME};sbert={SBERT_MODEL_NAME};ocr={OCR_MODE}"
+
+# Entry fields that depend on the vector store's contents
+MATCH_FIELDS = ("visual_matches", "text_matches")
+
+
+class AnalysisCache:
+    """
+    Content-addressed cache of per-image analysis results, keyed by
+    ImageContext.pixel_digest() so re-uploads of the same logo (renamed,
+    re-encoded, retried) skip the models.
+
+    An entry holds what only depends on the pixels (CLIP embedding and
+    attention map, OCR text and its embedding, the rendered heatmap) plus
+    the raw vector-store match lists, tagged with the store version they
+    were found at. get() drops match lists of older versions, so after the
+    store changes only the searches rerun.
+
+    Entries are stored as JSON: LRU in memory, optionally also on disk,
+    under keys prefixed with `pipeline` (see PIPELINE_ID).
+    """
+
+    def __init__(self, max_items: int = ANALYSIS_CACHE_ITEMS, max_bytes: int = ANALYSIS_CACHE_BYTES,
+                 path: str = ANALYSIS_CACHE_PATH, disk_max_items: int = ANALYSIS_CACHE_DISK_ITEMS,
+                 pipeline: str = PIPELINE_ID):
+        self.pipeline = pipeline
+        self.memory = LRUCache(max_items=max_items, max_bytes=max_bytes)
+        self.disk = DiskCache(path, max_items=disk_max_items) if path else None
+
+    def get(self, digest: str, version: int) -> dict:
+        """Cached fields for `digest` ({} on a miss); match lists only if found at `version`."""
+        key = f"{self.pipeline}:{digest}"
+        data = self.memory.get(key)
+        if data is None and self.disk is not None:
+            data = self.disk.get(key)
+            if data is not None:
+                self.memory.put(key, data)
+        if data is None:
+            return {}
+
+        entry = json.loads(data)
+        if entry.pop("version", None) != version:
+            for field in MATCH_FIELDS:
+                entry.pop(field, None)
+        return entry
+
+    def put(self, digest: str, version: int, entry: dict):
+        """Store `entry` (JSON-serializable fields) for `digest`, found at store `version`."""
+        key = f"{self.pipeline}:{digest}"
+        data = json.dumps(dict(entry, version=version)).encode()
+        self.memory.put(key, data)
+        if self.disk is not None:
+            self.disk.put(key, data)
+
+    def clear(self):
+        """Drop the in-memory tier (the disk tier is shared with other workers)."""
+        self.memory.clear()
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "disk": None if self.disk is None else self.disk.stats(),
+        }
+
+
+# Singleton instance
+analysis_cache = AnalysisCache()
@@ -0,0 +1,130 @@
+import os
+import threading
+import unicodedata
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.services.cache import DiskCache, LRUCache
+
+# In-process tier: entries per model
+EMBEDDING_CACHE_ITEMS = int(os.getenv("EMBEDDING_CACHE_ITEMS", "50000"))
+
+# Optional on-disk tier (SQLite) shared by all workers; unset = memory only
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")
+EMBEDDING_CACHE_DISK_ITEMS = int(os.getenv("EMBEDDING_CACHE_DISK_ITEMS", "1000000"))
+
+_disk_caches = {}
+
+
+def _shared_disk_cache(path: str) -> DiskCache:
+    # One connection per file, shared by the caches of every model
+    if path not in _disk_caches:
+        _disk_caches[path] = DiskCache(path, max_items=EMBEDDING_CACHE_DISK_ITEMS)
+    return _disk_caches[path]
+
+
+def normalize_text(text: str) -> str:
+    """
+    Cache key form of `text`: NFC, collapsed whitespace, lower case.
+
+    Lower-casing is lossless here: the SBERT (MiniLM, uncased) and CLIP
+    tokenizers both lower-case their input.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split()).lower()
+
+
+class EmbeddingCache:
+    """
+    Cache of text embeddings for one model, keyed by normalized text.
+
+    Brand names and OCR fragments repeat a lot, so most lookups skip the
+    model. Vectors live in an in-process LRU and, with `path`, in a SQLite
+    file every worker shares (keys are prefixed with `model_id`, so models
+    can share one file).
+    """
+
+    def __init__(self, model_id: str, dimension: int, max_items: int = EMBEDDING_CACHE_ITEMS,
+                 path: str = EMBEDDING_CACHE_PATH):
+        self.model_id = model_id
+        self.dimension = dimension
+        self.memory = LRUCache(max_items=max_items)
+        self.disk = _shared_disk_cache(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        # Lookups come from several micro-batcher threads
+        self._lock = threading.Lock()
+
+    def _key(self, text: str) -> str:
+        return f"{self.model_id}:{normalize_text(text)}"
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vector of each text, or None."""
+        keys = [self._key(text) for text in texts]
+        vectors = {key: self.memory.get(key) for key in dict.fromkeys(keys)}
+
+        missing = [key for key, vector in vectors.items() if vector is None]
+        if missing and self.disk is not None:
+            for key, value in self.disk.get_many(missing).items():
+                vector = np.frombuffer(value, dtype=np.float32)
+                self.memory.put(key, vector)
+                vectors[key] = vector
+
+        results = [vectors[key] for key in keys]
+        found = sum(vector is not None for vector in results)
+        with self._lock:
+            self.hits += found
+            self.misses += len(results) - found
+        return results
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        return self.get_many([text])[0]
+
+    def put_many(self, texts: List[str], vectors):
+        items = []
+        for text, vector in zip(texts, vectors):
+            vector = np.array(vector, dtype=np.float32)
+            vector.setflags(write=False)  # Shared by every caller
+            key = self._key(text)
+            self.memory.put(key, vector)
+            items.append((key, vector.tobytes()))
+        if self.disk is not None and items:
+            self.disk.put_many(items)
+
+    def put(self, text: str, vector):
+        self.put_many([text], [vector])
+
+    def embed(self, texts: List[str], compute: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embeddings of `texts` as an (N, dimension) array, calling
+        `compute` once for the distinct texts that are not cached.
+        """
+        cached = self.get_many(texts)
+        # One text per missing key ("Nike" and "NIKE " embed alike)
+        missing = {}
+        for text, vector in zip(texts, cached):
+            if vector is None:
+                missing.setdefault(self._key(text), text)
+        if missing:
+            computed = compute(list(missing.values()))
+            self.put_many(missing.values(), computed)
+            by_key = dict(zip(missing, computed))
+            cached = [
+                by_key[self._key(text)] if vector is None else vector for text, vector in zip(texts, cached)
+            ]
+        if not cached:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.stack(cached).astype(np.float32, copy=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "model": self.model_id,
+            "items": len(self.memory),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "disk": None if self.disk is None else self.disk.stats(),
+        }
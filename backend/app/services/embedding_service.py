@@ -1,21 +1,58 @@
-import torch
-from sentence_transformers import SentenceTransformer
-from transformers import CLIPProcessor, CLIPModel
-from PIL import Image
-import io
-import tempfile
-import os
+from typing import Optional
+
+import numpy as np
+
+from app.services.embedding_cache import EmbeddingCache
+from app.services.executors import limit_torch_threads
+from app.services.image_context import ImageContext
+from app.services.lazy_model import LazyModel
+from app.services.micro_batcher import MicroBatcher
 
 # Import custom perceptual hashing module
 from app.services.perceptual_hash import (
     PerceptualHasher,
     HashAlgorithm,
+    compute_all_hashes,
     hamming_distance,
     hash_to_hex,
     hex_to_hash,
-    similarity_from_distance
+    similarity_from_distance,
+    thumbnail_size
 )
 
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+SBERT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def _load_sbert():
+    from sentence_transformers import SentenceTransformer
+    # Forwards run on micro-batcher threads, not the inference executor
+    limit_torch_threads()
+    return SentenceTransformer(SBERT_MODEL_NAME)
+
+
+def _load_clip():
+    from transformers import CLIPProcessor, CLIPModel
+    limit_torch_threads()
+    # Eager attention: SDPA kernels do not return the attention weights
+    # that get_image_embeddings_with_attention reads
+    model = CLIPModel.from_pretrained(CLIP_MODEL_NAME, attn_implementation="eager")
+    return model, CLIPProcessor.from_pretrained(CLIP_MODEL_NAME)
+
+
+def cls_attention_grid(attentions) -> Optional[np.ndarray]:
+    """
+    CLS-to-patch attention of the last vision layer as (N, grid, grid)
+    maps, averaged over heads. CLIP ViT-B/32 has 7x7 = 49 patches for a
+    224x224 input. None if the model did not return attention weights.
+    """
+    if not attentions or attentions[-1] is None:
+        return None
+    # Shape: (batch, num_heads, seq_len, seq_len); first token is CLS
+    cls_attention = attentions[-1].mean(dim=1)[:, 0, 1:]
+    grid = int(np.sqrt(cls_attention.shape[1]))
+    return cls_attention.float().numpy().reshape(-1, grid, grid)
+
 
 class EmbeddingService:
     """
@@ -26,40 +63,158 @@ class EmbeddingService:
     - SBERT embeddings for text (384-dim vectors)
     - Perceptual hashing with pHash, aHash, dHash algorithms
     - Hash comparison and similarity scoring
+    
+    Request handlers use the `*_async` methods, which micro-batch
+    concurrent calls into one forward pass per batch. Text embeddings are
+    cached by normalized text (see EmbeddingCache).
+    
+    Models (and torch/transformers themselves) load on first use or at
+    start-up warm-up, not when this module is imported.
     """
     
     def __init__(self):
-        # Load SBERT for text
-        self.text_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # SBERT for text
+        self._sbert = LazyModel("sbert", _load_sbert)
         
-        # Load CLIP for images
-        self.clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-        self.clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
+        # CLIP for images (model + processor)
+        self._clip = LazyModel("clip", _load_clip)
         
         # Initialize perceptual hashers for each algorithm
         self._phash_hasher = PerceptualHasher(algorithm=HashAlgorithm.PHASH)
         self._ahash_hasher = PerceptualHasher(algorithm=HashAlgorithm.AHASH)
         self._dhash_hasher = PerceptualHasher(algorithm=HashAlgorithm.DHASH)
+        
+        # Text embedding caches, in front of the models
+        self.text_cache = EmbeddingCache(SBERT_MODEL_NAME, 384)
+        self.clip_text_cache = EmbeddingCache(f"clip-text:{CLIP_MODEL_NAME}", 512)
+        
+        # Micro-batching schedulers for concurrent requests. Cache lookups
+        # happen per batch on the worker thread, off the event loop.
+        self._text_batcher = MicroBatcher(self.get_text_embeddings, name="sbert-batcher")
+        self._clip_text_batcher = MicroBatcher(self.get_clip_text_embeddings, name="clip-text-batcher")
+        self._image_batcher = MicroBatcher(self._embed_and_attend, name="clip-image-batcher")
+
+    @property
+    def text_model(self):
+        return self._sbert.get()
+
+    @property
+    def clip_model(self):
+        return self._clip.get()[0]
+
+    @property
+    def clip_processor(self):
+        return self._clip.get()[1]
 
     def get_text_embedding(self, text: str):
         """Generate embedding for text using SBERT."""
-        return self.text_model.encode(text).tolist()
+        return self.get_text_embeddings([text])[0].tolist()
+
+    def get_text_embeddings(self, texts: list, batch_size: int = 64) -> np.ndarray:
+        """Generate SBERT embeddings for many texts as an (N, 384) array."""
+        return self.text_cache.embed(
+            texts, lambda missing: self.text_model.encode(missing, batch_size=batch_size, convert_to_numpy=True)
+        )
+
+    def get_clip_text_embeddings(self, texts: list, batch_size: int = 64) -> np.ndarray:
+        """Generate normalized CLIP text embeddings for many texts as an (N, 512) array."""
+        return self.clip_text_cache.embed(texts, lambda missing: self._encode_clip_texts(missing, batch_size))
+
+    def _encode_clip_texts(self, texts: list, batch_size: int) -> np.ndarray:
+        import torch
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.clip_processor(text=texts[start:start + batch_size], return_tensors="pt", padding=True)
+            with torch.no_grad():
+                text_features = self.clip_model.get_text_features(**inputs)
+            text_features = text_features / text_features.norm(p=2, dim=-1, keepdim=True)
+            batches.append(text_features.numpy())
+        return np.concatenate(batches) if batches else np.zeros((0, 512), dtype=np.float32)
 
     def get_clip_text_embedding(self, text: str):
         """Generate embedding for text using CLIP (for zero-shot image matching)."""
-        inputs = self.clip_processor(text=[text], return_tensors="pt", padding=True)
+        return self.get_clip_text_embeddings([text])[0].tolist()
+
+    def get_image_embeddings(self, images: list) -> np.ndarray:
+        """
+        Generate normalized CLIP embeddings for many images (ImageContexts
+        or raw bytes) in one forward pass, as an (N, 512) array.
+        """
+        import torch
+        clip_images = [ImageContext.coerce(image).clip_image for image in images]
+        inputs = self.clip_processor(images=clip_images, return_tensors="pt")
         
         with torch.no_grad():
-            text_features = self.clip_model.get_text_features(**inputs)
+            image_features = self.clip_model.get_image_features(**inputs)
         
-        # Normalize
-        text_features = text_features / text_features.norm(p=2, dim=-1, keepdim=True)
-        return text_features[0].tolist()
+        image_features = image_features / image_features.norm(p=2, dim=-1, keepdim=True)
+        return image_features.numpy()
 
-    def get_image_embedding(self, image_bytes: bytes):
-        """Generate embedding for image using CLIP."""
-        image = Image.open(io.BytesIO(image_bytes))
-        inputs = self.clip_processor(images=image, return_tensors="pt")
+    def cache_stats(self) -> dict:
+        """Hit rates of the text embedding caches."""
+        return {"sbert": self.text_cache.stats(), "clip_text": self.clip_text_cache.stats()}
+
+    def get_image_embeddings_with_attention(self, images: list) -> tuple:
+        """
+        Normalized CLIP embeddings (N, 512) and last-layer CLS attention maps
+        (N, 7, 7) for many images from a single vision forward pass, so the
+        heatmap needs no forward of its own. The maps are None if the
+        model returned no attention weights.
+        """
+        import torch
+        clip_images = [ImageContext.coerce(image).clip_image for image in images]
+        inputs = self.clip_processor(images=clip_images, return_tensors="pt")
+        
+        with torch.inference_mode():
+            vision_outputs = self.clip_model.vision_model(
+                pixel_values=inputs['pixel_values'],
+                output_attentions=True
+            )
+            # Same projection get_image_features applies to the pooled output
+            image_features = self.clip_model.visual_projection(vision_outputs.pooler_output)
+            image_features = image_features / image_features.norm(p=2, dim=-1, keepdim=True)
+            return image_features.numpy(), cls_attention_grid(vision_outputs.attentions)
+
+    def get_image_embedding_with_attention(self, image) -> tuple:
+        """Embedding (list) and attention map of one image, from one forward pass."""
+        embeddings, attention_maps = self.get_image_embeddings_with_attention([image])
+        return embeddings[0].tolist(), None if attention_maps is None else attention_maps[0]
+
+    def _embed_and_attend(self, images: list) -> list:
+        # Batch function of the image batcher: (embedding, attention map) per image
+        embeddings, attention_maps = self.get_image_embeddings_with_attention(images)
+        if attention_maps is None:
+            attention_maps = [None] * len(images)
+        return list(zip(embeddings, attention_maps))
+
+    async def get_text_embedding_async(self, text: str) -> list:
+        """get_text_embedding, batched with concurrent callers."""
+        return (await self._text_batcher.submit_async(text)).tolist()
+
+    async def get_clip_text_embedding_async(self, text: str) -> list:
+        """get_clip_text_embedding, batched with concurrent callers."""
+        return (await self._clip_text_batcher.submit_async(text)).tolist()
+
+    async def get_image_embedding_async(self, image) -> list:
+        """get_image_embedding, batched with concurrent callers."""
+        embedding, _ = await self._image_batcher.submit_async(image)
+        return embedding.tolist()
+
+    async def get_image_embedding_with_attention_async(self, image) -> tuple:
+        """get_image_embedding_with_attention, batched with concurrent callers."""
+        embedding, attention_map = await self._image_batcher.submit_async(image)
+        return embedding.tolist(), attention_map
+
+    def get_image_embedding(self, image):
+        """
+        Generate embedding for image using CLIP.
+
+        Accepts an ImageContext (or raw bytes) and feeds CLIP the context's
+        cached 224px image instead of the full-resolution upload.
+        """
+        import torch
+        ctx = ImageContext.coerce(image)
+        inputs = self.clip_processor(images=ctx.clip_image, return_tensors="pt")
         
         with torch.no_grad():
             image_features = self.clip_model.get_image_features(**inputs)
@@ -68,26 +223,20 @@ class EmbeddingService:
         image_features = image_features / image_features.norm(p=2, dim=-1, keepdim=True)
         return image_features[0].tolist()
 
-    def _hash_from_bytes(self, image_bytes: bytes, hasher: PerceptualHasher) -> str:
+    def _hash_from_context(self, ctx: ImageContext, hasher: PerceptualHasher) -> str:
         """
-        Generate perceptual hash from image bytes.
+        Generate perceptual hash from an already decoded image.
         
-        The hasher expects a file path, so we write to a temp file.
+        Hashing runs entirely in memory on the context's cached grayscale
+        image (the 32px thumbnail for pHash), without re-encoding it.
         """
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-            # Convert bytes to image and save
-            image = Image.open(io.BytesIO(image_bytes))
-            image.save(tmp.name, format='PNG')
-            tmp_path = tmp.name
-        
-        try:
-            result = hasher.hash_image(tmp_path)
-            return result.hash_hex
-        finally:
-            # Clean up temp file
-            os.unlink(tmp_path)
+        if hasher.algorithm == HashAlgorithm.PHASH:
+            image = np.asarray(ctx.hash_thumbnail(thumbnail_size(hasher.algorithm, hasher.hash_size)))
+        else:
+            image = ctx.gray
+        return hasher.hash_image(image).hash_hex
 
-    def get_phash(self, image_bytes: bytes) -> str:
+    def get_phash(self, image) -> str:
         """
         Generate DCT-based perceptual hash (pHash) for image.
         
@@ -97,9 +246,9 @@ class EmbeddingService:
         Returns:
             16-character hex string representing 64-bit hash
         """
-        return self._hash_from_bytes(image_bytes, self._phash_hasher)
+        return self._hash_from_context(ImageContext.coerce(image), self._phash_hasher)
 
-    def get_ahash(self, image_bytes: bytes) -> str:
+    def get_ahash(self, image) -> str:
         """
         Generate average hash (aHash) for image.
         
@@ -108,9 +257,9 @@ class EmbeddingService:
         Returns:
             16-character hex string representing 64-bit hash
         """
-        return self._hash_from_bytes(image_bytes, self._ahash_hasher)
+        return self._hash_from_context(ImageContext.coerce(image), self._ahash_hasher)
 
-    def get_dhash(self, image_bytes: bytes) -> str:
+    def get_dhash(self, image) -> str:
         """
         Generate difference hash (dHash) for image.
         
@@ -119,19 +268,21 @@ class EmbeddingService:
         Returns:
             16-character hex string representing 64-bit hash
         """
-        return self._hash_from_bytes(image_bytes, self._dhash_hasher)
+        return self._hash_from_context(ImageContext.coerce(image), self._dhash_hasher)
 
-    def get_all_hashes(self, image_bytes: bytes) -> dict:
+    def get_all_hashes(self, image) -> dict:
         """
         Generate all three perceptual hashes for an image.
         
         Returns:
             Dict with 'phash', 'ahash', 'dhash' keys
         """
+        ctx = ImageContext.coerce(image)
+        hashes = compute_all_hashes(ctx.gray)
         return {
-            'phash': self.get_phash(image_bytes),
-            'ahash': self.get_ahash(image_bytes),
-            'dhash': self.get_dhash(image_bytes)
+            'phash': hash_to_hex(hashes[HashAlgorithm.PHASH]),
+            'ahash': hash_to_hex(hashes[HashAlgorithm.AHASH]),
+            'dhash': hash_to_hex(hashes[HashAlgorithm.DHASH])
         }
 
     def compare_hashes(self, hash1: str, hash2: str) -> dict:
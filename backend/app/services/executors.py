@@ -0,0 +1,140 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+# Threads running model inference (CLIP attention, EasyOCR). Each forward
+# pass already parallelizes internally, so torch's intra-op pool is split
+# between them instead of every pass oversubscribing all cores.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", str(max(1, (os.cpu_count() or 1) // INFERENCE_WORKERS))))
+
+# Processes for pure PIL/NumPy work that holds the GIL (heatmap rendering)
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(max(1, min(4, (os.cpu_count() or 1) // 2)))))
+
+
+class StageLimit:
+    """
+    Concurrency limit of one pipeline stage.
+
+    At most `concurrency` calls run at once and at most `max_queue` more
+    wait; beyond that the stage rejects work with 429 so a burst turns into
+    fast, retryable errors instead of unbounded latency for everyone.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.in_flight = 0  # Running + waiting
+        self._semaphore = None
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.in_flight - self.concurrency)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.in_flight >= self.concurrency + self.max_queue:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Server busy: the {self.name} stage has {self.queued} requests queued",
+                headers={"Retry-After": "1"}
+            )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.in_flight += 1
+        try:
+            async with self._semaphore:
+                yield
+        finally:
+            self.in_flight -= 1
+
+
+STAGES = {
+    stage.name: stage for stage in (
+        StageLimit("decode", concurrency=8, max_queue=32),
+        StageLimit("phash", concurrency=8, max_queue=32),
+        StageLimit("embedding", concurrency=32, max_queue=128),  # Micro-batched
+        StageLimit("vector_search", concurrency=8, max_queue=64),
+        StageLimit("heatmap", concurrency=INFERENCE_WORKERS, max_queue=16),
+        StageLimit("heatmap_render", concurrency=CPU_WORKERS, max_queue=16),
+        StageLimit("ocr", concurrency=INFERENCE_WORKERS, max_queue=16),
+        StageLimit("metadata", concurrency=8, max_queue=32),
+        StageLimit("cache", concurrency=8, max_queue=64),  # Analysis cache lookups and writes
+    )
+}
+
+_lock = threading.Lock()
+_inference_executor = None
+_cpu_executor = None
+
+
+def limit_torch_threads():
+    """
+    Cap torch's intra-op pool at TORCH_THREADS. The pool is process-wide,
+    so model loaders call this before the first forward pass, whichever
+    thread (executor or micro-batcher) runs it.
+    """
+    import torch
+    torch.set_num_threads(TORCH_THREADS)
+
+
+def inference_executor() -> ThreadPoolExecutor:
+    """Bounded thread pool for model inference, created on first use."""
+    global _inference_executor
+    with _lock:
+        if _inference_executor is None:
+            limit_torch_threads()
+            _inference_executor = ThreadPoolExecutor(
+                max_workers=INFERENCE_WORKERS, thread_name_prefix="inference"
+            )
+        return _inference_executor
+
+
+def cpu_executor() -> ProcessPoolExecutor:
+    """Bounded process pool for GIL-bound PIL/NumPy work, created on first use."""
+    global _cpu_executor
+    with _lock:
+        if _cpu_executor is None:
+            # spawn: forking a process that runs torch threads is unsafe
+            _cpu_executor = ProcessPoolExecutor(
+                max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _cpu_executor
+
+
+async def run_stage(stage: str, fn, *args, executor=None, **kwargs):
+    """
+    Run `fn(*args, **kwargs)` off the event loop under `stage`'s limit.
+
+    `executor` defaults to the loop's thread pool, which suits short
+    calls that release the GIL (decoding, FAISS, SQLite).
+    """
+    async with STAGES[stage].slot():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+def stage_stats() -> dict:
+    """Current load of every stage, for health checks."""
+    return {
+        name: {"in_flight": stage.in_flight, "queued": stage.queued, "concurrency": stage.concurrency}
+        for name, stage in STAGES.items()
+    }
+
+
+def shutdown():
+    global _inference_executor, _cpu_executor
+    with _lock:
+        if _inference_executor is not None:
+            _inference_executor.shutdown(wait=False)
+            _inference_executor = None
+        if _cpu_executor is not None:
+            _cpu_executor.shutdown(wait=False)
+            _cpu_executor = None
@@ -0,0 +1,183 @@
+"""
+Heatmap rendering: attention map + image -> base64 image overlay.
+
+Kept free of model imports so it can run in the CPU process pool
+(see app.services.executors) without loading CLIP in the worker.
+
+The overlay is rendered at most HEATMAP_MAX_EDGE pixels on its longest
+side and encoded as HEATMAP_FORMAT. With HEATMAP_MODE=grid the API skips
+rendering and returns the smoothed patch grid (attention_grid) for the
+client to colorize.
+"""
+
+import base64
+import io
+import os
+
+import numpy as np
+from PIL import Image
+from scipy.ndimage import gaussian_filter
+
+
+def _create_colormap():
+    """Create a professional colormap (inferno-like: purple -> red -> yellow)."""
+    colors = []
+    for i in range(256):
+        t = i / 255.0
+        if t < 0.25:
+            # Black to Purple
+            r = int(t * 4 * 60)
+            g = 0
+            b = int(t * 4 * 140)
+        elif t < 0.5:
+            # Purple to Red
+            r = int(60 + (t - 0.25) * 4 * 195)
+            g = 0
+            b = int(140 - (t - 0.25) * 4 * 140)
+        elif t < 0.75:
+            # Red to Orange
+            r = 255
+            g = int((t - 0.5) * 4 * 165)
+            b = 0
+        else:
+            # Orange to Yellow
+            r = 255
+            g = int(165 + (t - 0.75) * 4 * 90)
+            b = int((t - 0.75) * 4 * 80)
+        colors.append((min(255, r), min(255, g), min(255, b)))
+    return colors
+
+
+COLORMAP = _create_colormap()
+
+# The colormap as a 256x3 lookup table, indexed by whole attention arrays
+COLORMAP_LUT = np.array(COLORMAP, dtype=np.uint8)
+
+# Max alpha of the overlay, reached at full attention
+MAX_ALPHA = 180
+
+
+def colorize(attention: np.ndarray) -> Image.Image:
+    """
+    RGBA overlay for a 0-1 attention array (H x W): colormap lookup for the
+    color, and variable transparency (more attention = more visible).
+    """
+    overlay = np.empty(attention.shape + (4,), dtype=np.uint8)
+    overlay[..., :3] = COLORMAP_LUT[(attention * 255).astype(np.uint8)]
+    overlay[..., 3] = (attention * MAX_ALPHA).astype(np.uint8)
+    return Image.fromarray(overlay)
+
+
+# "image": rendered overlay; "grid": only the patch grid, colorized client-side
+HEATMAP_MODES = ("image", "grid")
+HEATMAP_MODE = os.getenv("HEATMAP_MODE", "image")
+
+# Longest side of the rendered overlay (0 = the upload's own size)
+HEATMAP_MAX_EDGE = int(os.getenv("HEATMAP_MAX_EDGE", "768"))
+
+# Output encoding: format name -> (PIL format, MIME type)
+HEATMAP_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png"),
+}
+HEATMAP_FORMAT = os.getenv("HEATMAP_FORMAT", "webp")
+HEATMAP_QUALITY = int(os.getenv("HEATMAP_QUALITY", "80"))  # WebP/JPEG only
+
+# Fail at start-up rather than on every request
+if HEATMAP_MODE not in HEATMAP_MODES:
+    raise ValueError(f"Unknown HEATMAP_MODE {HEATMAP_MODE!r}; expected one of {HEATMAP_MODES}")
+if HEATMAP_FORMAT not in HEATMAP_FORMATS:
+    raise ValueError(f"Unknown HEATMAP_FORMAT {HEATMAP_FORMAT!r}; expected one of {tuple(HEATMAP_FORMATS)}")
+
+# Longest side the full-size smoothing pass runs at. The blur removes all
+# detail finer than the patch grid anyway, so blurring a small copy and
+# upscaling it looks the same as blurring at output size.
+BLUR_EDGE = 128
+
+
+def heatmap_mime(format: str = None) -> str:
+    """MIME type of heatmaps encoded as `format` (default HEATMAP_FORMAT)."""
+    return HEATMAP_FORMATS[format or HEATMAP_FORMAT][1]
+
+
+def _normalize(values: np.ndarray) -> np.ndarray:
+    """Scale to 0-1."""
+    values = values - values.min()
+    if values.max() > 0:
+        values = values / values.max()
+    return values
+
+
+def bounded_size(size: tuple, max_edge: int) -> tuple:
+    """`size` scaled down (keeping aspect) so its longest side is at most `max_edge`."""
+    width, height = size
+    if not max_edge or max(width, height) <= max_edge:
+        return size
+    scale = max_edge / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def attention_grid(attention_map: np.ndarray) -> np.ndarray:
+    """Normalized, lightly smoothed patch-grid attention map (0-1)."""
+    # Gaussian smoothing for visual appeal
+    return _normalize(gaussian_filter(_normalize(attention_map.astype(np.float32)), sigma=0.8))
+
+
+def smooth_attention(attention_map: np.ndarray, size: tuple) -> np.ndarray:
+    """
+    Patch-grid attention map upscaled to `size` (width, height) and smoothed
+    with a blur of sigma max(size) / 50, normalized to 0-1.
+    """
+    grid = attention_grid(attention_map)
+
+    # Resize to a small working size and smooth there
+    work_size = bounded_size(size, BLUR_EDGE)
+    work = np.asarray(
+        Image.fromarray(grid).resize(work_size, Image.Resampling.BILINEAR)
+    )
+    work = _normalize(gaussian_filter(work, sigma=max(work_size) / 50))
+
+    # Upscale the smooth map to the output size
+    if work_size == size:
+        return work
+    return np.asarray(Image.fromarray(work).resize(size, Image.Resampling.BILINEAR))
+
+
+def render_heatmap(
+    image: Image.Image,
+    attention_map: np.ndarray,
+    max_edge: int = None,
+    format: str = None,
+    quality: int = None
+) -> str:
+    """
+    Overlay a (patch grid) attention map on `image`, downscaled to at most
+    `max_edge` pixels on its longest side (default HEATMAP_MAX_EDGE).
+    Returns the overlay base64 encoded as `format` (default HEATMAP_FORMAT,
+    see heatmap_mime).
+    """
+    max_edge = HEATMAP_MAX_EDGE if max_edge is None else max_edge
+    format = format or HEATMAP_FORMAT
+    quality = quality or HEATMAP_QUALITY
+    pil_format = HEATMAP_FORMATS[format][0]
+
+    size = bounded_size(image.size, max_edge)
+    if size != image.size:
+        image = image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+    # Create heatmap overlay with colormap
+    heatmap = colorize(np.clip(smooth_attention(attention_map, size), 0.0, 1.0))
+
+    # Composite heatmap on original image
+    combined = Image.alpha_composite(image.convert("RGBA"), heatmap)
+    if pil_format != "PNG":
+        # Opaque anyway; no alpha plane to encode
+        combined = combined.convert("RGB")
+
+    buffered = io.BytesIO()
+    if pil_format == "PNG":
+        combined.save(buffered, format=pil_format)
+    else:
+        combined.save(buffered, format=pil_format, quality=quality)
+    return base64.b64encode(buffered.getvalue()).decode()
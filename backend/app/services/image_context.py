@@ -0,0 +1,124 @@
+from PIL import Image, ImageOps
+import hashlib
+import io
+import threading
+
+# Derived resolutions shared by the analysis pipeline
+CLIP_SIZE = 224        # Shortest side fed to the CLIP processor
+HASH_SIZE = 32         # pHash DCT input (hash_size * highfreq_factor)
+OCR_MAX_SIZE = 1024    # Longest side fed to EasyOCR
+
+
+class ImageContext:
+    """
+    A decoded upload shared by every stage of the analysis pipeline.
+
+    The raw bytes are decoded exactly once. The EXIF-transposed RGB image,
+    its grayscale version and the resized copies each service needs are
+    computed on first access and cached, so the same upload is never
+    decoded or resized twice within a request. Stages running concurrently
+    on different threads may share one context.
+    """
+
+    def __init__(self, image_bytes: bytes):
+        self.raw_bytes = image_bytes
+
+        image = Image.open(io.BytesIO(image_bytes))
+        # Source attributes are only available before conversion
+        self.format = image.format
+        self.mode = image.mode
+        self.size = image.size
+        self.exif = image.getexif()
+
+        # Handle orientation from EXIF
+        image = ImageOps.exif_transpose(image)
+
+        # Convert to RGB (remove alpha channel if present)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        else:
+            image.load()
+
+        self.image = image
+        self._gray = None
+        self._resized = {}
+        # Derived images are built once even when stages race for them
+        self._lock = threading.RLock()
+
+    @classmethod
+    def coerce(cls, source) -> "ImageContext":
+        """Return `source` if it is already a context, otherwise decode it."""
+        if isinstance(source, cls):
+            return source
+        return cls(source)
+
+    @property
+    def width(self) -> int:
+        return self.image.width
+
+    @property
+    def height(self) -> int:
+        return self.image.height
+
+    @property
+    def file_size(self) -> int:
+        return len(self.raw_bytes)
+
+    def pixel_digest(self) -> str:
+        """
+        Hex digest of the decoded RGB pixels and their dimensions, so the
+        same image re-encoded or renamed gets the same digest.
+        """
+        def build():
+            digest = hashlib.sha256()
+            digest.update(f"{self.width}x{self.height}:".encode())
+            digest.update(self.image.tobytes())
+            return digest.hexdigest()
+        return self._cached('digest', build)
+
+    @property
+    def gray(self) -> Image.Image:
+        """Grayscale ('L') version of the RGB image."""
+        if self._gray is None:
+            with self._lock:
+                if self._gray is None:
+                    self._gray = self.image.convert('L')
+        return self._gray
+
+    def _cached(self, key, build):
+        if key not in self._resized:
+            with self._lock:
+                if key not in self._resized:
+                    self._resized[key] = build()
+        return self._resized[key]
+
+    @property
+    def clip_image(self) -> Image.Image:
+        """RGB image with its shortest side scaled to CLIP's input size."""
+        def build():
+            w, h = self.image.size
+            scale = CLIP_SIZE / min(w, h)
+            if scale >= 1:
+                return self.image
+            size = (max(CLIP_SIZE, round(w * scale)), max(CLIP_SIZE, round(h * scale)))
+            return self.image.resize(size, Image.Resampling.BICUBIC)
+        return self._cached('clip', build)
+
+    def bounded(self, max_edge: int) -> Image.Image:
+        """RGB image whose longest side is at most `max_edge` (0 = unbounded)."""
+        def build():
+            if not max_edge or (self.width <= max_edge and self.height <= max_edge):
+                return self.image
+            image = self.image.copy()
+            image.thumbnail((max_edge, max_edge))
+            return image
+        return self._cached(('bounded', max_edge), build)
+
+    @property
+    def ocr_image(self) -> Image.Image:
+        """RGB image whose longest side is at most OCR_MAX_SIZE."""
+        return self.bounded(OCR_MAX_SIZE)
+
+    def hash_thumbnail(self, size=(HASH_SIZE, HASH_SIZE)) -> Image.Image:
+        """Grayscale thumbnail at `size` (width, height) used for perceptual hashing."""
+        return self._cached(('hash', size), lambda: self.gray.resize(size, Image.Resampling.LANCZOS))
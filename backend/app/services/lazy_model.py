@@ -0,0 +1,77 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Every LazyModel, in creation order, for warm-up and readiness checks
+MODELS: List["LazyModel"] = []
+
+
+class LazyModel:
+    """
+    Thread-safe handle to a model that is loaded on first use.
+
+    `loader` runs at most once, under a lock, the first time `get()` is
+    called (by a request or by warm_up()); concurrent callers wait for that
+    load instead of starting their own. Heavy libraries (torch,
+    transformers, easyocr) should be imported inside the loader so that
+    importing a service stays cheap.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self._loader = loader
+        self._model = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.error = None  # Last load failure, until a load succeeds
+        MODELS.append(self)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    try:
+                        self._model = self._loader()
+                    except Exception as e:
+                        self.error = f"{type(e).__name__}: {e}"
+                        raise
+                    self.load_seconds = round(time.perf_counter() - start, 2)
+                    self._loaded = True
+                    self.error = None
+                    print(f"Loaded {self.name} in {self.load_seconds}s")
+        return self._model
+
+
+def warm_up():
+    """
+    Load every registered model (e.g. from the startup hook). Every model
+    is attempted; if any fails, RuntimeError names them afterwards.
+    """
+    failed = []
+    for model in MODELS:
+        try:
+            model.get()
+        except Exception:
+            logger.exception("Warm-up of %s failed", model.name)
+            failed.append(f"{model.name} ({model.error})")
+    if failed:
+        raise RuntimeError(f"Warm-up failed: {', '.join(failed)}")
+
+
+def readiness() -> Dict[str, bool]:
+    """Whether each registered model is loaded."""
+    return {model.name: model.loaded for model in MODELS}
+
+
+def load_errors() -> Dict[str, str]:
+    """Last load failure of each registered model that has one."""
+    return {model.name: model.error for model in MODELS if model.error}
@@ -0,0 +1,67 @@
+from contextlib import contextmanager
+from typing import Union
+
+from app.services.phash_index import PHashIndex, phash_index
+from app.services.vector_store import VectorStore, vector_store
+
+
+class MarkRegistry:
+    """
+    The single write path for registered marks.
+
+    A mark can live in several stores under the same registry id: text
+    and CLIP vectors in the vector store, and the perceptual hash of logos
+    in the pHash index. Adding or deleting through here keeps them in
+    step, so a replaced or deleted logo never lingers in one of them.
+    """
+
+    def __init__(self, vectors: VectorStore = vector_store, phashes: PHashIndex = phash_index):
+        self.vectors = vectors
+        self.phashes = phashes
+        self._batch_depth = 0
+        self._phashes_dirty = False
+
+    @contextmanager
+    def batch(self, flush_every: int = None):
+        """
+        Group many writes: the vector store batches its saves (see
+        VectorStore.batch) and the pHash index is saved once at the end.
+        """
+        self._batch_depth += 1
+        try:
+            with self.vectors.batch(flush_every=flush_every):
+                yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._phashes_dirty:
+                self.phashes.save_index()
+                self._phashes_dirty = False
+
+    def _phashes_changed(self):
+        if self._batch_depth:
+            self._phashes_dirty = True
+        else:
+            self.phashes.save_index()
+
+    def add_text_mark(self, id: str, text_embedding, clip_text_embedding, metadata: dict):
+        """Upsert a word mark: its SBERT vector and its CLIP text vector (zero-shot concept)."""
+        self.vectors.add_text(id, text_embedding, metadata)
+        self.vectors.add_image(id, clip_text_embedding, dict(metadata, type="text_concept"))
+
+    def add_logo(self, id: str, image_embedding, phash: Union[str, int], metadata: dict):
+        """Upsert a logo: its CLIP image vector and its perceptual hash."""
+        self.vectors.add_image(id, image_embedding, metadata)
+        self.phashes.add(id, phash, metadata, save=False)
+        self._phashes_changed()
+
+    def delete(self, ids: list) -> int:
+        """Delete marks by registry id from every store; returns the number of entries removed."""
+        removed = self.vectors.delete_text(ids) + self.vectors.delete_image(ids)
+        phashes_removed = self.phashes.delete(ids, save=False)
+        if phashes_removed:
+            self._phashes_changed()
+        return removed + phashes_removed
+
+
+# Singleton
+mark_registry = MarkRegistry()
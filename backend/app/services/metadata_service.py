@@ -1,30 +1,32 @@
 from PIL import Image
-import io
-import os
 from datetime import datetime
 
+from app.services.image_context import ImageContext
+
 class MetadataService:
-    def extract_metadata(self, image_bytes: bytes, filename: str) -> dict:
+    def extract_metadata(self, image, filename: str) -> dict:
         """
         Extracts metadata from the uploaded image.
+        Accepts an ImageContext (or raw bytes).
         """
         try:
-            image = Image.open(io.BytesIO(image_bytes))
+            ctx = ImageContext.coerce(image)
             
-            # Basic attributes
-            width, height = image.size
-            format = image.format
-            mode = image.mode
+            # Basic attributes (of the file as uploaded)
+            width, height = ctx.size
+            format = ctx.format
+            mode = ctx.mode
             
             # File size in KB
-            file_size_kb = len(image_bytes) / 1024
+            file_size_kb = ctx.file_size / 1024
             
             # Color palette (simplified to dominant color for now)
             # In a real app, we'd use k-means clustering
-            dominant_color = self._get_dominant_color(image)
+            # Sampled from the cached CLIP-sized copy instead of the full upload
+            dominant_color = self._get_dominant_color(ctx.clip_image)
             
             # EXIF Data (if available)
-            exif_data = image.getexif()
+            exif_data = ctx.exif
             exif_info = {}
             if exif_data:
                 for tag_id, value in exif_data.items():
@@ -54,8 +56,7 @@ class MetadataService:
         Resize image to 1x1 and get the color.
         """
         try:
-            img = image.copy()
-            img = img.convert("RGB")
+            img = image.convert("RGB") if image.mode != "RGB" else image
             img = img.resize((1, 1), resample=0)
             color = img.getpixel((0, 0))
             return f"#{color[0]:02x}{color[1]:02x}{color[2]:02x}"
@@ -0,0 +1,277 @@
+import json
+import numpy as np
+import os
+import pickle
+import sqlite3
+import threading
+
+# Vector-store modalities; one table each
+KINDS = ("text", "image")
+
+# Bytes of the database file SQLite may memory-map for reads
+MMAP_SIZE = 1 << 30
+
+# Bound parameters per IN (...) query (older SQLite builds allow 999)
+MAX_VARIABLES = 500
+
+
+class MetadataStore:
+    """
+    Mark metadata keyed by integer FAISS id, one SQLite table per modality.
+
+    Rows live on disk and are read through SQLite's mmap, so opening the
+    store costs nothing and a search only materializes the rows it returns.
+    Each row also records the mark's external (registry) id. FAISS ids are
+    allocated here from a per-modality sequence and never reused.
+
+    Reads never create the database: until the first write (or
+    migrate()), a new store reads as empty and a store with legacy pickled
+    metadata is served from the pickle, which that first write imports.
+    """
+
+    def __init__(self, path: str, legacy_path: str = None):
+        self.path = path
+        # Pickled metadata of stores older than this one, imported on first open
+        self.legacy_path = legacy_path
+        self._legacy_rows = None
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily on first use
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            migrate = (
+                self.legacy_path is not None
+                and os.path.exists(self.legacy_path)
+                and not os.path.exists(self.path)
+            )
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            for kind in KINDS:
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {kind} "
+                    "(id INTEGER PRIMARY KEY, external_id TEXT, data TEXT NOT NULL)"
+                )
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {kind}_external_id ON {kind} (external_id)")
+            # Next FAISS id per modality
+            conn.execute("CREATE TABLE IF NOT EXISTS sequences (kind TEXT PRIMARY KEY, next_id INTEGER NOT NULL)")
+            # Deleted ids still present in indexes that cannot remove vectors (HNSW)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tombstones (kind TEXT, id INTEGER, PRIMARY KEY (kind, id))"
+            )
+            # Counter bumped on every change to the store's contents
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS version (id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+            if migrate:
+                self.import_pickle(self.legacy_path)
+        return self._conn
+
+    def _legacy(self):
+        """
+        Read-only `{kind: {id: (external_id, metadata)}}` rows of a store
+        whose database does not exist yet: an unimported legacy pickle, or
+        no rows at all. None once the database exists.
+        """
+        with self._lock:
+            if self._conn is not None or os.path.exists(self.path):
+                self._legacy_rows = None
+                return None
+            if self.legacy_path is None or not os.path.exists(self.legacy_path):
+                return {kind: {} for kind in KINDS}
+            if self._legacy_rows is None:
+                self._legacy_rows = {
+                    kind: {id: (external_id, metadata) for id, external_id, metadata in rows}
+                    for kind, rows in self._read_pickle(self.legacy_path).items()
+                }
+            return self._legacy_rows
+
+    def migrate(self):
+        """Import legacy pickled metadata now, if there is any (otherwise the first write does)."""
+        with self._lock:
+            self._connect()
+
+    @staticmethod
+    def _table(kind: str) -> str:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind {kind!r}; expected one of {KINDS}")
+        return kind
+
+    def _select_in(self, query: str, values: list) -> list:
+        """Run `query (?, ?, ...)` over `values` in chunks and concatenate the rows."""
+        rows = []
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(values), MAX_VARIABLES):
+                chunk = values[start:start + MAX_VARIABLES]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(conn.execute(f"{query} ({placeholders})", chunk).fetchall())
+        return rows
+
+    def put_many(self, kind: str, rows):
+        """
+        Insert or replace `(id, external_id, metadata)` rows.
+
+        Changes become durable on the next commit().
+        """
+        table = self._table(kind)
+        with self._lock:
+            self._connect().executemany(
+                f"INSERT OR REPLACE INTO {table} (id, external_id, data) VALUES (?, ?, ?)",
+                [
+                    (int(id), None if external_id is None else str(external_id), json.dumps(metadata))
+                    for id, external_id, metadata in rows
+                ]
+            )
+
+    def get_many(self, kind: str, ids) -> dict:
+        """Map each of `ids` that has a row to its metadata dict."""
+        table = self._table(kind)
+        legacy = self._legacy()
+        if legacy is not None:
+            rows = legacy[kind]
+            return {int(id): rows[int(id)][1] for id in ids if int(id) in rows}
+        rows = self._select_in(f"SELECT id, data FROM {table} WHERE id IN", [int(id) for id in ids])
+        return {id: json.loads(data) for id, data in rows}
+
+    def get(self, kind: str, id: int) -> dict:
+        return self.get_many(kind, [id]).get(int(id), {})
+
+    def find_ids(self, kind: str, external_ids) -> np.ndarray:
+        """FAISS ids of every row whose external id is in `external_ids`."""
+        table = self._table(kind)
+        external_ids = [str(external_id) for external_id in external_ids]
+        legacy = self._legacy()
+        if legacy is not None:
+            wanted = set(external_ids)
+            return np.array(
+                [id for id, (external_id, _) in legacy[kind].items() if external_id in wanted], dtype=np.int64
+            )
+        rows = self._select_in(f"SELECT id FROM {table} WHERE external_id IN", external_ids)
+        return np.array([id for id, in rows], dtype=np.int64)
+
+    def ids(self, kind: str) -> np.ndarray:
+        """All FAISS ids that have a row, ascending."""
+        table = self._table(kind)
+        legacy = self._legacy()
+        if legacy is not None:
+            return np.array(sorted(legacy[kind]), dtype=np.int64)
+        with self._lock:
+            rows = self._connect().execute(f"SELECT id FROM {table} ORDER BY id").fetchall()
+        return np.array([id for id, in rows], dtype=np.int64)
+
+    def delete(self, kind: str, ids):
+        table = self._table(kind)
+        with self._lock:
+            self._connect().executemany(f"DELETE FROM {table} WHERE id = ?", [(int(id),) for id in ids])
+
+    def allocate_ids(self, kind: str, count: int, minimum: int = 0) -> np.ndarray:
+        """
+        Reserve `count` new FAISS ids, all at or above `minimum`.
+        """
+        table = self._table(kind)
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT next_id FROM sequences WHERE kind = ?", (kind,)).fetchone()
+            if row is None:
+                # First allocation: continue after existing (e.g. migrated) rows
+                start = conn.execute(f"SELECT COALESCE(MAX(id) + 1, 0) FROM {table}").fetchone()[0]
+            else:
+                start = row[0]
+            start = max(start, minimum)
+            conn.execute(
+                "INSERT OR REPLACE INTO sequences (kind, next_id) VALUES (?, ?)", (kind, start + count)
+            )
+        return np.arange(start, start + count, dtype=np.int64)
+
+    def add_tombstones(self, kind: str, ids):
+        self._table(kind)
+        with self._lock:
+            self._connect().executemany(
+                "INSERT OR IGNORE INTO tombstones (kind, id) VALUES (?, ?)", [(kind, int(id)) for id in ids]
+            )
+
+    def tombstone_count(self, kind: str) -> int:
+        if self._legacy() is not None:
+            return 0
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM tombstones WHERE kind = ?", (kind,)
+            ).fetchone()[0]
+
+    def clear_tombstones(self, kind: str):
+        with self._lock:
+            self._connect().execute("DELETE FROM tombstones WHERE kind = ?", (kind,))
+
+    def version(self) -> int:
+        """Current contents version (0 for a new store)."""
+        if self._legacy() is not None:
+            return 0
+        with self._lock:
+            row = self._connect().execute("SELECT value FROM version WHERE id = 0").fetchone()
+        return 0 if row is None else row[0]
+
+    def bump_version(self) -> int:
+        """
+        Record a change to the store's contents; returns the new version.
+
+        Like other writes, visible to other processes after commit().
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO version (id, value) VALUES (0, 1) "
+                "ON CONFLICT (id) DO UPDATE SET value = value + 1"
+            )
+            return conn.execute("SELECT value FROM version WHERE id = 0").fetchone()[0]
+
+    def count(self, kind: str) -> int:
+        table = self._table(kind)
+        legacy = self._legacy()
+        if legacy is not None:
+            return len(legacy[kind])
+        with self._lock:
+            return self._connect().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def commit(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def _read_pickle(pickle_path: str) -> dict:
+        """`{kind: [(id, external_id, metadata)]}` rows of a legacy pickle."""
+        with open(pickle_path, 'rb') as f:
+            legacy = pickle.load(f)
+
+        rows = {kind: [] for kind in KINDS}
+        for key, metadata in legacy.items():
+            kind, _, id = key.rpartition("_")
+            if kind in rows:
+                rows[kind].append((int(id), metadata.get("name"), metadata))
+        return rows
+
+    def import_pickle(self, pickle_path: str):
+        """
+        One-time migration from the legacy pickled `{"<kind>_<id>": metadata}` dict.
+
+        Legacy stores ignored the caller's id; seed_db always passed the
+        mark name, so that is used as the external id.
+        """
+        rows = self._read_pickle(pickle_path)
+        for kind, kind_rows in rows.items():
+            self.put_many(kind, kind_rows)
+        self.commit()
+        print(f"Migrated {sum(map(len, rows.values()))} metadata entries from {pickle_path}")
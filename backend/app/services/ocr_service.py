@@ -1,41 +1,183 @@
-import easyocr
+import os
+
 import numpy as np
 from PIL import Image
 
+from app.services.executors import limit_torch_threads
+from app.services.image_context import OCR_MAX_SIZE, ImageContext
+from app.services.lazy_model import LazyModel
+
+# "fast": a low-resolution detection pass gates OCR (no text, no
+# recognition) and sizes the full pass by the detected text height;
+# "full": detection + recognition at up to OCR_MAX_SIZE on every image
+OCR_MODES = ("fast", "full")
+OCR_MODE = os.getenv("OCR_MODE", "fast")
+if OCR_MODE not in OCR_MODES:
+    raise ValueError(f"Unknown OCR_MODE {OCR_MODE!r}; expected one of {OCR_MODES}")
+
+# EasyOCR on CPU by default; its intra-op threads follow TORCH_THREADS
+OCR_GPU = os.getenv("OCR_GPU", "0") == "1"
+
+# Longest side of the text-presence detection pass
+OCR_GATE_SIZE = int(os.getenv("OCR_GATE_SIZE", "512"))
+# Smallest text boxes (px at gate resolution) that count as text
+OCR_GATE_MIN_SIZE = 10
+# Height (px) the smallest detected text line is scaled to for the full
+# pass; larger text is read at a correspondingly lower resolution
+OCR_TEXT_HEIGHT = int(os.getenv("OCR_TEXT_HEIGHT", "32"))
+
+# Images per detection batch in extract_texts
+OCR_BATCH_SIZE = 8
+
+def _load_reader():
+    # Initialize reader for English.
+    # Note: Initializing this might take time on first run as it downloads models.
+    try:
+        import easyocr
+        if not OCR_GPU:
+            limit_torch_threads()
+        return easyocr.Reader(['en'], gpu=OCR_GPU)
+    except Exception as e:
+        print(f"Failed to initialize EasyOCR: {e}")
+        return None
+
+def _check_mode(mode: str) -> str:
+    """`mode`, or OCR_MODE when it is None; unknown modes raise ValueError."""
+    mode = mode or OCR_MODE
+    if mode not in OCR_MODES:
+        raise ValueError(f"Unknown OCR mode {mode!r}; expected one of {OCR_MODES}")
+    return mode
+
+def _box_heights(horizontal_list, free_list) -> list:
+    """Heights of EasyOCR boxes: [x_min, x_max, y_min, y_max] and 4-point polygons."""
+    heights = [y_max - y_min for _, _, y_min, y_max in horizontal_list]
+    heights += [max(y for _, y in box) - min(y for _, y in box) for box in free_list]
+    return [height for height in heights if height > 0]
+
 class OCRService:
     def __init__(self):
-        # Initialize reader for English. 'gpu=False' if no GPU, but let's try auto.
-        # Note: Initializing this might take time on first run as it downloads models.
-        try:
-            self.reader = easyocr.Reader(['en']) 
-        except Exception as e:
-            print(f"Failed to initialize EasyOCR: {e}")
-            self.reader = None
+        # Built on first use or at start-up warm-up
+        self._reader = LazyModel("easyocr", _load_reader)
+
+    @property
+    def reader(self):
+        return self._reader.get()
+
+    @staticmethod
+    def _ocr_image(image) -> Image.Image:
+        """RGB image of at most OCR_MAX_SIZE px, without modifying the caller's image."""
+        # Contexts carry an already downscaled copy for OCR
+        if isinstance(image, ImageContext):
+            return image.ocr_image
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        # Resize image if too large (speed optimization)
+        if image.width > OCR_MAX_SIZE or image.height > OCR_MAX_SIZE:
+            image = image.copy()
+            image.thumbnail((OCR_MAX_SIZE, OCR_MAX_SIZE))
+        return image
+
+    def _readtext(self, image: Image.Image) -> str:
+        # Detail=0 gives simple list of text
+        results = self.reader.readtext(np.asarray(image), detail=0, canvas_size=max(image.size))
+        # Join all detected text
+        return " ".join(results).strip()
 
-    def extract_text(self, image: Image.Image) -> str:
+    def _gate(self, images: list) -> list:
         """
-        Extracts text from a PIL Image.
+        Low-resolution text detection for a batch of images, in one
+        detector call. Returns (scale, text box heights) per image, the
+        heights in gate pixels.
         """
+        scales, arrays = [], []
+        for image in images:
+            scale = min(1.0, OCR_GATE_SIZE / max(image.size))
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            scales.append(scale)
+            arrays.append(np.asarray(image if scale == 1.0 else image.resize(size, Image.Resampling.BILINEAR)))
+
+        if len(arrays) == 1:
+            batch = arrays[0]
+        else:
+            # Batched detection needs one shape: pad at the bottom/right,
+            # which leaves box coordinates unchanged
+            height = max(array.shape[0] for array in arrays)
+            width = max(array.shape[1] for array in arrays)
+            batch = np.zeros((len(arrays), height, width, 3), dtype=np.uint8)
+            for i, array in enumerate(arrays):
+                batch[i, :array.shape[0], :array.shape[1]] = array
+
+        horizontal_lists, free_lists = self.reader.detect(
+            batch, min_size=OCR_GATE_MIN_SIZE, canvas_size=OCR_GATE_SIZE, mag_ratio=1.0, reformat=False
+        )
+        return [
+            (scale, _box_heights(horizontal, free))
+            for scale, horizontal, free in zip(scales, horizontal_lists, free_lists)
+        ]
+
+    def _read_gated(self, image: Image.Image, gate_scale: float, heights: list) -> str:
+        if not heights:
+            return ""  # No text: skip recognition entirely
+
+        # Scale the smallest text line to OCR_TEXT_HEIGHT, but never below
+        # the gate resolution (which already found it) or above OCR_MAX_SIZE
+        min_height = min(heights) / gate_scale
+        scale = max(gate_scale, min(1.0, OCR_TEXT_HEIGHT / min_height))
+        if scale < 1.0:
+            image = image.resize(
+                (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                Image.Resampling.BILINEAR
+            )
+        return self._readtext(image)
+
+    def extract_text(self, image, mode: str = None) -> str:
+        """
+        Extracts text from a PIL Image or an ImageContext.
+
+        `mode` overrides OCR_MODE ("fast" or "full").
+        """
+        mode = _check_mode(mode)
         if not self.reader:
             return ""
 
         try:
-            # Resize image if too large (speed optimization)
-            max_dim = 1024
-            if image.width > max_dim or image.height > max_dim:
-                image.thumbnail((max_dim, max_dim))
-                
-            # EasyOCR expects numpy array or file path
-            img_np = np.array(image)
-            
-            # Detail=0 gives simple list of text
-            results = self.reader.readtext(img_np, detail=0)
-            
-            # Join all detected text
-            extracted_text = " ".join(results)
-            return extracted_text.strip()
+            image = self._ocr_image(image)
+            if mode == "full":
+                return self._readtext(image)
+            (gate_scale, heights), = self._gate([image])
+            return self._read_gated(image, gate_scale, heights)
         except Exception as e:
             print(f"OCR extraction error: {e}")
             return ""
 
+    def extract_texts(self, images: list, batch_size: int = OCR_BATCH_SIZE, mode: str = None) -> list:
+        """
+        Extracts text from many PIL Images or ImageContexts (e.g. when
+        ingesting a dataset). In fast mode text detection runs batched and
+        only images with text go on to recognition; `mode` overrides
+        OCR_MODE as in extract_text.
+        """
+        mode = _check_mode(mode)
+        if not self.reader:
+            return [""] * len(images)
+        if mode == "full":
+            return [self.extract_text(image, mode) for image in images]
+
+        texts = []
+        for start in range(0, len(images), batch_size):
+            batch = [self._ocr_image(image) for image in images[start:start + batch_size]]
+            try:
+                gates = self._gate(batch)
+            except Exception as e:
+                print(f"OCR detection error: {e}")
+                texts.extend([""] * len(batch))
+                continue
+            for image, (gate_scale, heights) in zip(batch, gates):
+                try:
+                    texts.append(self._read_gated(image, gate_scale, heights))
+                except Exception as e:
+                    print(f"OCR extraction error: {e}")
+                    texts.append("")
+        return texts
+
 ocr_service = OCRService()
@@ -6,23 +6,35 @@ with high-performance batch processing and intelligent duplicate/near-duplicate
 
 Features:
 - Core hashing algorithms: pHash (DCT-based), aHash (average), dHash (difference)
+- Hashing from paths or in-memory images (bytes, PIL images, numpy arrays)
 - Multiprocessing batch processing for large image sets
+- Batched NumPy kernels that hash whole (N, H, W) thumbnail stacks at once
 - Duplicate and near-duplicate detection with clustering
 - Efficient hash comparison using Hamming distance
-- Memory-efficient streaming for very large datasets
+- Columnar uint64 hash store, memory-mappable from disk
+- Memory-efficient streaming for very large datasets (bounded in-flight
+  batches over lazy path iterators, persistent worker pool)
 
 Author: TruLogo AI
 """
 
 from __future__ import annotations
 
+import io
+import json
 import logging
+import os
+import tempfile
 import time
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from math import comb
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
 from dataclasses import dataclass, field
 from enum import Enum
+from functools import lru_cache
+from itertools import combinations, islice
 from pathlib import Path
-from typing import Iterator, Callable, Union, Optional
+from typing import Iterable, Iterator, Callable, Sized, Union, Optional
 import warnings
 
 import numpy as np
@@ -48,7 +60,7 @@ class HashAlgorithm(Enum):
 @dataclass
 class ImageHash:
     """Result of hashing a single image."""
-    path: Path
+    path: Optional[Path]      # None for in-memory images
     hash_value: int           # 64-bit integer
     hash_hex: str             # Hex string representation
     algorithm: HashAlgorithm
@@ -126,12 +138,68 @@ def similarity_from_distance(distance: int, hash_bits: int = 64) -> float:
     return 1.0 - (distance / hash_bits)
 
 
+# Bits set in every byte value, for popcount on NumPy < 2.0
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount64(values: np.ndarray) -> np.ndarray:
+    """Vectorized popcount of a uint64 array (returns uint8 bit counts)."""
+    values = np.asarray(values, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    byte_view = values.view(np.uint8).reshape(values.shape + (8,))
+    return _BYTE_POPCOUNT[byte_view].sum(axis=-1, dtype=np.uint8)
+
+
+def hamming_distances(hash_value: int, hashes: np.ndarray) -> np.ndarray:
+    """Hamming distance from one hash to every hash in a uint64 array."""
+    return popcount64(np.asarray(hashes, dtype=np.uint64) ^ np.uint64(hash_value))
+
+
 # =============================================================================
 # IMAGE PREPROCESSING
 # =============================================================================
 
+# Anything the hash functions can read an image from
+ImageSource = Union[str, Path, bytes, bytearray, memoryview, Image.Image, np.ndarray]
+
+
+def _to_uint8(array: np.ndarray) -> np.ndarray:
+    """Pixels clipped to 0-255 as uint8, as PIL would store them."""
+    if array.dtype == np.uint8:
+        return array
+    return np.clip(array, 0, 255).astype(np.uint8)
+
+
+def _open_image(source: ImageSource) -> Image.Image:
+    """
+    Open an image source as a PIL image.
+    
+    Accepts a file path, an encoded bytes buffer, a PIL image or a numpy
+    array (2D grayscale or HxWxC). Paths and buffers are decoded; images
+    and arrays are used as they are.
+    """
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, np.ndarray):
+        return Image.fromarray(_to_uint8(source))
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(source))
+    return Image.open(source)
+
+
+def _to_grayscale(img: Image.Image) -> Image.Image:
+    """Convert an image to grayscale ('L') the same way for every source."""
+    # Convert to RGB first to handle various formats
+    if img.mode not in ('L', 'RGB', 'RGBA'):
+        img = img.convert('RGB')
+    if img.mode != 'L':
+        img = img.convert('L')
+    return img
+
+
 def load_and_preprocess(
-    image_path: Union[str, Path],
+    source: ImageSource,
     size: tuple[int, int],
     grayscale: bool = True
 ) -> np.ndarray:
@@ -139,7 +207,7 @@ def load_and_preprocess(
     Load and preprocess an image for hashing.
     
     Args:
-        image_path: Path to the image file
+        source: Path to the image file, encoded bytes, PIL image or numpy array
         size: Target size (width, height)
         grayscale: Whether to convert to grayscale
         
@@ -149,25 +217,94 @@ def load_and_preprocess(
     Raises:
         IOError: If image cannot be loaded
     """
-    with Image.open(image_path) as img:
-        # Convert to RGB first to handle various formats
-        if img.mode not in ('L', 'RGB', 'RGBA'):
+    # Arrays already at the target size (e.g. cached thumbnails) skip PIL
+    # entirely, normalized to uint8 pixels like every other source
+    if (
+        isinstance(source, np.ndarray)
+        and source.shape[:2] == (size[1], size[0])
+        and (source.ndim == 2 or not grayscale)
+    ):
+        return _to_uint8(source).astype(np.float64)
+    
+    opened = _open_image(source)
+    try:
+        img = opened
+        if grayscale:
+            img = _to_grayscale(img)
+        elif img.mode not in ('L', 'RGB', 'RGBA'):
             img = img.convert('RGB')
         
-        if grayscale and img.mode != 'L':
-            img = img.convert('L')
-        
         # Use high-quality resampling
         img = img.resize(size, Image.Resampling.LANCZOS)
         
         return np.array(img, dtype=np.float64)
+    finally:
+        # Only close images we opened ourselves
+        if opened is not source:
+            opened.close()
 
 
 # =============================================================================
 # CORE HASH ALGORITHMS
 # =============================================================================
 
-def compute_phash(image_path: Union[str, Path], hash_size: int = 8) -> int:
+def _bits_to_int(hash_bits: np.ndarray) -> int:
+    """Pack a flat array of 0/1 bits (most significant first) into an integer."""
+    bits = np.asarray(hash_bits, dtype=bool).ravel()
+    packed = np.packbits(bits)
+    # packbits pads the last byte with zeros on the right; shift them out
+    return int.from_bytes(packed.tobytes(), 'big') >> (-bits.size % 8)
+
+
+def _pack_bits_uint64(hash_bits: np.ndarray) -> np.ndarray:
+    """Pack an (N, 64) boolean array (most significant bit first) into N uint64 hashes."""
+    packed = np.packbits(hash_bits, axis=1)
+    return packed.view('>u8').ravel().astype(np.uint64)
+
+
+def _phash_from_pixels(pixels: np.ndarray, hash_size: int = 8) -> int:
+    """pHash of an already preprocessed (hash_size*4)² grayscale array."""
+    # Apply 2D DCT
+    dct_result = dct(dct(pixels, axis=0, norm='ortho'), axis=1, norm='ortho')
+    
+    # Extract low-frequency 8×8 block (top-left corner)
+    dct_low = dct_result[:hash_size, :hash_size]
+    
+    # Flatten, excluding DC component (top-left value)
+    dct_low_flat = dct_low.flatten()
+    
+    # Use median of low-frequency components (excluding DC) as threshold
+    # DC is at index 0
+    median_value = np.median(dct_low_flat[1:])
+    
+    # Generate hash: 1 if pixel > median, 0 otherwise
+    hash_bits = (dct_low_flat > median_value).astype(int)
+    
+    return _bits_to_int(hash_bits)
+
+
+def _ahash_from_pixels(pixels: np.ndarray) -> int:
+    """aHash of an already preprocessed hash_size² grayscale array."""
+    # Compute mean
+    mean_value = np.mean(pixels)
+    
+    # Threshold: 1 if pixel >= mean, 0 otherwise
+    hash_bits = (pixels >= mean_value).astype(int).flatten()
+    
+    return _bits_to_int(hash_bits)
+
+
+def _dhash_from_pixels(pixels: np.ndarray) -> int:
+    """dHash of an already preprocessed hash_size × (hash_size+1) grayscale array."""
+    # Compare adjacent pixels horizontally
+    # Result: 1 if left pixel > right pixel, 0 otherwise
+    diff = pixels[:, :-1] > pixels[:, 1:]
+    hash_bits = diff.flatten().astype(int)
+    
+    return _bits_to_int(hash_bits)
+
+
+def compute_phash(image: ImageSource, hash_size: int = 8) -> int:
     """
     Compute DCT-based perceptual hash (pHash).
     
@@ -179,7 +316,7 @@ def compute_phash(image_path: Union[str, Path], hash_size: int = 8) -> int:
     5. Output 64-bit hash
     
     Args:
-        image_path: Path to image file
+        image: Image path, encoded bytes, PIL image or numpy array
         hash_size: Size of hash grid (default 8 = 64-bit hash)
         
     Returns:
@@ -190,33 +327,12 @@ def compute_phash(image_path: Union[str, Path], hash_size: int = 8) -> int:
     img_size = hash_size * highfreq_factor
     
     # Load and preprocess
-    pixels = load_and_preprocess(image_path, (img_size, img_size), grayscale=True)
-    
-    # Apply 2D DCT
-    dct_result = dct(dct(pixels, axis=0, norm='ortho'), axis=1, norm='ortho')
-    
-    # Extract low-frequency 8×8 block (top-left corner)
-    dct_low = dct_result[:hash_size, :hash_size]
-    
-    # Flatten, excluding DC component (top-left value)
-    dct_low_flat = dct_low.flatten()
-    
-    # Use median of low-frequency components (excluding DC) as threshold
-    # DC is at index 0
-    median_value = np.median(dct_low_flat[1:])
-    
-    # Generate hash: 1 if pixel > median, 0 otherwise
-    hash_bits = (dct_low_flat > median_value).astype(int)
+    pixels = load_and_preprocess(image, (img_size, img_size), grayscale=True)
     
-    # Convert to integer
-    hash_value = 0
-    for bit in hash_bits:
-        hash_value = (hash_value << 1) | int(bit)
-    
-    return hash_value
+    return _phash_from_pixels(pixels, hash_size)
 
 
-def compute_ahash(image_path: Union[str, Path], hash_size: int = 8) -> int:
+def compute_ahash(image: ImageSource, hash_size: int = 8) -> int:
     """
     Compute average hash (aHash).
     
@@ -228,30 +344,19 @@ def compute_ahash(image_path: Union[str, Path], hash_size: int = 8) -> int:
     This is the fastest algorithm but less robust to edits.
     
     Args:
-        image_path: Path to image file
+        image: Image path, encoded bytes, PIL image or numpy array
         hash_size: Size of hash grid (default 8 = 64-bit hash)
         
     Returns:
         64-bit hash value as integer
     """
     # Load and preprocess
-    pixels = load_and_preprocess(image_path, (hash_size, hash_size), grayscale=True)
-    
-    # Compute mean
-    mean_value = np.mean(pixels)
-    
-    # Threshold: 1 if pixel >= mean, 0 otherwise
-    hash_bits = (pixels >= mean_value).astype(int).flatten()
-    
-    # Convert to integer
-    hash_value = 0
-    for bit in hash_bits:
-        hash_value = (hash_value << 1) | int(bit)
+    pixels = load_and_preprocess(image, (hash_size, hash_size), grayscale=True)
     
-    return hash_value
+    return _ahash_from_pixels(pixels)
 
 
-def compute_dhash(image_path: Union[str, Path], hash_size: int = 8) -> int:
+def compute_dhash(image: ImageSource, hash_size: int = 8) -> int:
     """
     Compute difference hash (dHash).
     
@@ -263,7 +368,7 @@ def compute_dhash(image_path: Union[str, Path], hash_size: int = 8) -> int:
     Good for detecting gradients and less sensitive to brightness changes.
     
     Args:
-        image_path: Path to image file
+        image: Image path, encoded bytes, PIL image or numpy array
         hash_size: Size of hash grid (default 8 = 64-bit hash)
         
     Returns:
@@ -271,22 +376,48 @@ def compute_dhash(image_path: Union[str, Path], hash_size: int = 8) -> int:
     """
     # Load with extra column for difference comparison
     pixels = load_and_preprocess(
-        image_path, 
+        image, 
         (hash_size + 1, hash_size), 
         grayscale=True
     )
     
-    # Compare adjacent pixels horizontally
-    # Result: 1 if left pixel > right pixel, 0 otherwise
-    diff = pixels[:, :-1] > pixels[:, 1:]
-    hash_bits = diff.flatten().astype(int)
+    return _dhash_from_pixels(pixels)
+
+
+def compute_all_hashes(image: ImageSource, hash_size: int = 8) -> dict[HashAlgorithm, int]:
+    """
+    Compute pHash, aHash and dHash from a single decode.
     
-    # Convert to integer
-    hash_value = 0
-    for bit in hash_bits:
-        hash_value = (hash_value << 1) | int(bit)
+    The image is opened and converted to grayscale once; the three
+    algorithm-specific thumbnails are all resized from that shared
+    grayscale image, so the results are bit-identical to calling
+    compute_phash/compute_ahash/compute_dhash separately.
     
-    return hash_value
+    Args:
+        image: Image path, encoded bytes, PIL image or numpy array
+        hash_size: Size of hash grid (default 8 = 64-bit hash)
+        
+    Returns:
+        Dict mapping each HashAlgorithm to its 64-bit hash value
+    """
+    opened = _open_image(image)
+    try:
+        gray = _to_grayscale(opened)
+        phash_size = hash_size * 4
+        return {
+            HashAlgorithm.PHASH: _phash_from_pixels(
+                load_and_preprocess(gray, (phash_size, phash_size)), hash_size
+            ),
+            HashAlgorithm.AHASH: _ahash_from_pixels(
+                load_and_preprocess(gray, (hash_size, hash_size))
+            ),
+            HashAlgorithm.DHASH: _dhash_from_pixels(
+                load_and_preprocess(gray, (hash_size + 1, hash_size))
+            ),
+        }
+    finally:
+        if opened is not image:
+            opened.close()
 
 
 # Hash function dispatcher
@@ -297,6 +428,113 @@ HASH_FUNCTIONS = {
 }
 
 
+def thumbnail_size(algorithm: HashAlgorithm, hash_size: int = 8) -> tuple[int, int]:
+    """Preprocessed thumbnail size (width, height) each algorithm hashes."""
+    if algorithm == HashAlgorithm.PHASH:
+        return (hash_size * 4, hash_size * 4)
+    if algorithm == HashAlgorithm.DHASH:
+        return (hash_size + 1, hash_size)
+    return (hash_size, hash_size)
+
+
+# =============================================================================
+# BATCHED NUMPY KERNELS
+# =============================================================================
+
+def phash_kernel(pixels: np.ndarray, hash_size: int = 8) -> np.ndarray:
+    """
+    Vectorized pHash over a stack of preprocessed thumbnails.
+    
+    Runs the 2D DCT, median thresholding and bit packing for the whole
+    stack at once. Bit-identical to compute_phash on each thumbnail.
+    
+    Args:
+        pixels: (N, 32, 32) stack of grayscale thumbnails
+        hash_size: Size of hash grid (must be 8 for uint64 output)
+        
+    Returns:
+        (N,) uint64 array of hash values
+    """
+    _check_kernel_hash_size(hash_size)
+    pixels = np.asarray(pixels, dtype=np.float64)
+    n = pixels.shape[0]
+    
+    dct_result = dct(dct(pixels, axis=1, norm='ortho'), axis=2, norm='ortho')
+    dct_low = dct_result[:, :hash_size, :hash_size].reshape(n, -1)
+    
+    # Per-image median of the low frequencies, excluding the DC component
+    median_values = np.median(dct_low[:, 1:], axis=1)
+    
+    return _pack_bits_uint64(dct_low > median_values[:, None])
+
+
+def ahash_kernel(pixels: np.ndarray, hash_size: int = 8) -> np.ndarray:
+    """
+    Vectorized aHash over an (N, 8, 8) stack of preprocessed thumbnails.
+    
+    Returns:
+        (N,) uint64 array of hash values
+    """
+    _check_kernel_hash_size(hash_size)
+    pixels = np.asarray(pixels, dtype=np.float64)
+    n = pixels.shape[0]
+    
+    flat = pixels.reshape(n, -1)
+    mean_values = flat.mean(axis=1)
+    
+    return _pack_bits_uint64(flat >= mean_values[:, None])
+
+
+def dhash_kernel(pixels: np.ndarray, hash_size: int = 8) -> np.ndarray:
+    """
+    Vectorized dHash over an (N, 8, 9) stack of preprocessed thumbnails.
+    
+    Returns:
+        (N,) uint64 array of hash values
+    """
+    _check_kernel_hash_size(hash_size)
+    pixels = np.asarray(pixels, dtype=np.float64)
+    n = pixels.shape[0]
+    
+    diff = pixels[:, :, :-1] > pixels[:, :, 1:]
+    
+    return _pack_bits_uint64(diff.reshape(n, -1))
+
+
+def _check_kernel_hash_size(hash_size: int) -> None:
+    if hash_size * hash_size != 64:
+        raise ValueError(
+            f"Batched kernels produce uint64 hashes and require hash_size=8, got {hash_size}"
+        )
+
+
+# Batched kernel dispatcher
+HASH_KERNELS = {
+    HashAlgorithm.PHASH: phash_kernel,
+    HashAlgorithm.AHASH: ahash_kernel,
+    HashAlgorithm.DHASH: dhash_kernel,
+}
+
+
+def hash_thumbnails(
+    pixels: np.ndarray,
+    algorithm: HashAlgorithm = HashAlgorithm.PHASH,
+    hash_size: int = 8
+) -> np.ndarray:
+    """
+    Hash a stack of preprocessed thumbnails in one vectorized call.
+    
+    Args:
+        pixels: (N, height, width) stack, sized per thumbnail_size()
+        algorithm: Which hashing algorithm to use
+        hash_size: Size of hash grid (8 = 64-bit hash)
+        
+    Returns:
+        (N,) uint64 array of hash values
+    """
+    return HASH_KERNELS[algorithm](pixels, hash_size)
+
+
 # =============================================================================
 # WORKER FUNCTION FOR MULTIPROCESSING
 # =============================================================================
@@ -336,6 +574,52 @@ def _hash_single_image(
         )
 
 
+def _hash_image_chunk(
+    args: tuple[list[Path], HashAlgorithm, int]
+) -> list[BatchResult]:
+    """
+    Worker function to hash a chunk of images.
+    
+    Each image is loaded and preprocessed individually, then the whole
+    chunk is hashed with one call to the batched NumPy kernel.
+    Designed to be called in a process pool.
+    """
+    paths, algorithm, hash_size = args
+    
+    if hash_size * hash_size != 64:
+        # Kernels only produce uint64 hashes; fall back to per-image hashing
+        return [_hash_single_image((p, algorithm, hash_size)) for p in paths]
+    
+    size = thumbnail_size(algorithm, hash_size)
+    results: list[BatchResult] = []
+    thumbnails: list[np.ndarray] = []
+    loaded: list[BatchResult] = []
+    
+    for path in paths:
+        start_time = time.perf_counter()
+        try:
+            thumbnails.append(load_and_preprocess(path, size, grayscale=True))
+            result = BatchResult(path=path, success=True)
+            loaded.append(result)
+        except Exception as e:
+            result = BatchResult(path=path, success=False, error=str(e))
+        result.processing_time_ms = (time.perf_counter() - start_time) * 1000
+        results.append(result)
+    
+    if thumbnails:
+        start_time = time.perf_counter()
+        hash_values = hash_thumbnails(np.stack(thumbnails), algorithm, hash_size)
+        # Spread the kernel time evenly over the images it hashed
+        kernel_ms = (time.perf_counter() - start_time) * 1000 / len(thumbnails)
+        
+        for result, hash_value in zip(loaded, hash_values.tolist()):
+            result.hash_value = hash_value
+            result.hash_hex = hash_to_hex(hash_value)
+            result.processing_time_ms += kernel_ms
+    
+    return results
+
+
 # =============================================================================
 # PERCEPTUAL HASHER CLASS
 # =============================================================================
@@ -350,7 +634,7 @@ class PerceptualHasher:
     Example:
         hasher = PerceptualHasher(algorithm=HashAlgorithm.PHASH)
         
-        # Single image
+        # Single image (path, bytes, PIL image or numpy array)
         hash_result = hasher.hash_image("photo.jpg")
         
         # Batch processing
@@ -359,6 +643,11 @@ class PerceptualHasher:
             workers=8,
             on_progress=lambda d, t: print(f"{d}/{t}")
         )
+        
+        # Streaming over a huge corpus with a reusable worker pool
+        with PerceptualHasher() as hasher:
+            for result in hasher.hash_batch_iter(path_generator, workers=8):
+                ...
     """
     
     def __init__(
@@ -376,22 +665,28 @@ class PerceptualHasher:
         self.algorithm = algorithm
         self.hash_size = hash_size
         self._hash_func = HASH_FUNCTIONS[algorithm]
+        
+        # Worker pool reused across batch calls (created on first use)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_workers = 0
     
-    def hash_image(self, path: Union[str, Path]) -> ImageHash:
+    def hash_image(self, image: ImageSource) -> ImageHash:
         """
         Hash a single image.
         
         Args:
-            path: Path to the image file
+            image: Path to the image file, or an in-memory image
+                   (encoded bytes, PIL image or numpy array)
             
         Returns:
             ImageHash object with hash value and metadata
+            (path is None for in-memory images)
             
         Raises:
             IOError: If image cannot be loaded
         """
-        path = Path(path)
-        hash_value = self._hash_func(path, self.hash_size)
+        path = Path(image) if isinstance(image, (str, Path)) else None
+        hash_value = self._hash_func(path or image, self.hash_size)
         
         return ImageHash(
             path=path,
@@ -402,92 +697,145 @@ class PerceptualHasher:
     
     def hash_batch(
         self,
-        paths: Iterator[Union[str, Path]],
+        paths: Iterable[Union[str, Path]],
         workers: int = 4,
-        on_progress: Optional[Callable[[int, int], None]] = None,
-        chunk_size: int = 100
+        on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+        chunk_size: int = 100,
+        batch_size: int = 256,
+        ordered: bool = False
     ) -> list[BatchResult]:
         """
         Hash multiple images in parallel.
         
-        Uses ProcessPoolExecutor for CPU-bound hashing operations.
+        Collects the output of hash_batch_iter() into a list.
         
         Args:
-            paths: Iterator of image paths
+            paths: Iterable of image paths (may be a lazy iterator)
             workers: Number of worker processes
-            on_progress: Optional callback(done, total) for progress updates
+            on_progress: Optional callback(done, total) for progress updates;
+                         total is None when the input has no known length
             chunk_size: Number of images to process before progress update
+            batch_size: Number of images hashed per worker task
+            ordered: Return results in input order
             
         Returns:
             List of BatchResult objects
         """
-        # Convert to list for length and reuse
-        path_list = [Path(p) for p in paths]
-        total = len(path_list)
-        
-        if total == 0:
-            return []
+        total = len(paths) if isinstance(paths, Sized) else None
         
         results: list[BatchResult] = []
-        done = 0
-        
-        # Prepare arguments for worker function
-        args_list = [(p, self.algorithm, self.hash_size) for p in path_list]
+        next_progress = chunk_size
         
-        with ProcessPoolExecutor(max_workers=workers) as executor:
-            # Submit all jobs
-            future_to_path = {
-                executor.submit(_hash_single_image, args): args[0]
-                for args in args_list
-            }
+        for result in self.hash_batch_iter(
+            paths, workers=workers, batch_size=batch_size, ordered=ordered
+        ):
+            results.append(result)
             
-            # Collect results as they complete
-            for future in as_completed(future_to_path):
-                result = future.result()
-                results.append(result)
-                done += 1
-                
-                if on_progress and done % chunk_size == 0:
-                    on_progress(done, total)
+            if on_progress and len(results) >= next_progress:
+                on_progress(len(results), total)
+                next_progress += chunk_size
         
         # Final progress update
-        if on_progress:
-            on_progress(done, total)
+        if on_progress and results:
+            on_progress(len(results), total)
         
         return results
     
     def hash_batch_iter(
         self,
-        paths: Iterator[Union[str, Path]],
-        workers: int = 4
+        paths: Iterable[Union[str, Path]],
+        workers: int = 4,
+        batch_size: int = 256,
+        max_in_flight: Optional[int] = None,
+        ordered: bool = False
     ) -> Iterator[BatchResult]:
         """
         Hash multiple images, yielding results as they complete.
         
-        Memory-efficient generator mode for very large datasets.
+        Streaming mode for very large datasets: `paths` is consumed lazily,
+        one batch at a time, and at most `max_in_flight` batches are queued
+        in the worker pool. Memory use is therefore bounded by
+        batch_size * max_in_flight regardless of the corpus size.
         
         Args:
-            paths: Iterator of image paths
-            workers: Number of worker processes
+            paths: Iterable of image paths (may be a lazy iterator)
+            workers: Number of worker processes (<= 1 hashes in-process)
+            batch_size: Number of images hashed per worker task
+            max_in_flight: Maximum batches submitted but not yet yielded
+                           (default: 2 * workers)
+            ordered: Yield results in input order instead of completion order
             
         Yields:
-            BatchResult objects as they complete
+            BatchResult objects
         """
-        path_list = [Path(p) for p in paths]
+        path_iter = (Path(p) for p in paths)
+        batches = iter(lambda: list(islice(path_iter, batch_size)), [])
         
-        if not path_list:
+        if workers <= 1:
+            for batch in batches:
+                yield from _hash_image_chunk((batch, self.algorithm, self.hash_size))
             return
         
-        args_list = [(p, self.algorithm, self.hash_size) for p in path_list]
+        executor = self._get_executor(workers)
+        max_in_flight = max(1, max_in_flight or workers * 2)
+        pending: deque[Future] = deque()
         
-        with ProcessPoolExecutor(max_workers=workers) as executor:
-            future_to_path = {
-                executor.submit(_hash_single_image, args): args[0]
-                for args in args_list
-            }
+        try:
+            for batch in batches:
+                pending.append(
+                    executor.submit(_hash_image_chunk, (batch, self.algorithm, self.hash_size))
+                )
+                if len(pending) >= max_in_flight:
+                    yield from self._drain(pending, ordered, keep=max_in_flight - 1)
             
-            for future in as_completed(future_to_path):
-                yield future.result()
+            yield from self._drain(pending, ordered, keep=0)
+        finally:
+            # Generator closed early: drop batches that have not started yet
+            for future in pending:
+                future.cancel()
+    
+    @staticmethod
+    def _drain(
+        pending: deque[Future],
+        ordered: bool,
+        keep: int
+    ) -> Iterator[BatchResult]:
+        """Yield finished batches until at most `keep` remain in flight."""
+        while len(pending) > keep:
+            if ordered:
+                # Block on the oldest batch so output follows input order
+                future = pending[0]
+                results = future.result()
+                pending.popleft()
+                yield from results
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                for future in done:
+                    yield from future.result()
+    
+    def _get_executor(self, workers: int) -> ProcessPoolExecutor:
+        """Return the persistent worker pool, (re)creating it if needed."""
+        if self._executor is not None and self._executor_workers != workers:
+            self.close()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+            self._executor_workers = workers
+        return self._executor
+    
+    def close(self) -> None:
+        """Shut down the persistent worker pool (recreated on next batch call)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            self._executor_workers = 0
+    
+    def __enter__(self) -> PerceptualHasher:
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
     
     def hamming_distance(
         self,
@@ -537,6 +885,553 @@ class PerceptualHasher:
         return h
 
 
+# =============================================================================
+# COLUMNAR HASH STORE
+# =============================================================================
+
+def _write_replacing(path: str, write: Callable[[io.BufferedWriter], None]) -> None:
+    """
+    Write `path` through a uniquely named temporary file and an atomic
+    rename, so readers that memory-mapped the old file keep a valid
+    mapping instead of seeing it truncated and rewritten.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path) or "."
+    )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class _StringTable:
+    """
+    Interned, append-only table of strings.
+    
+    Stored on disk as an int64 offsets array plus one UTF-8 blob, both of
+    which can be memory-mapped; strings are only decoded when requested.
+    """
+    
+    def __init__(self):
+        self._strings: list[str] = []
+        self._lookup: Optional[dict[str, int]] = {}
+        # Memory-mapped (offsets, blob) when loaded from disk
+        self._mapped: Optional[tuple[np.ndarray, np.ndarray]] = None
+    
+    def __len__(self) -> int:
+        if self._mapped is not None:
+            return len(self._mapped[0]) - 1
+        return len(self._strings)
+    
+    def __getitem__(self, i: int) -> str:
+        if self._mapped is not None:
+            offsets, blob = self._mapped
+            return bytes(blob[offsets[i]:offsets[i + 1]]).decode('utf-8')
+        return self._strings[i]
+    
+    def intern(self, value: str) -> int:
+        """Return the id of `value`, adding it if it is new."""
+        if self._mapped is not None:
+            # First write after a load: materialize the table
+            self._strings = [self[i] for i in range(len(self))]
+            self._mapped = None
+            self._lookup = None
+        if self._lookup is None:
+            self._lookup = {v: i for i, v in enumerate(self._strings)}
+        
+        string_id = self._lookup.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._lookup[value] = string_id
+        return string_id
+    
+    def save(self, prefix: str) -> None:
+        encoded = [self[i].encode('utf-8') for i in range(len(self))]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        _write_replacing(prefix + ".offsets.npy", lambda f: np.save(f, offsets))
+        _write_replacing(prefix + ".blob", lambda f: f.write(b''.join(encoded)))
+    
+    @classmethod
+    def load(cls, prefix: str, mmap: bool = True) -> _StringTable:
+        table = cls()
+        offsets = np.load(prefix + ".offsets.npy", mmap_mode='r' if mmap else None)
+        if offsets[-1] == 0:
+            blob = np.zeros(0, dtype=np.uint8)
+        elif mmap:
+            blob = np.memmap(prefix + ".blob", dtype=np.uint8, mode='r')
+        else:
+            blob = np.fromfile(prefix + ".blob", dtype=np.uint8)
+        table._mapped = (offsets, blob)
+        table._lookup = None
+        return table
+
+
+class HashStore:
+    """
+    Compact, columnar store of 64-bit perceptual hashes.
+    
+    Hashes live in one contiguous uint64 array and each row's path is an
+    int32 id into an interned string table (-1 for in-memory images), so
+    a row costs 12 bytes instead of a full ImageHash object. Stores can be
+    saved and memory-mapped back from disk, and distance scans are
+    vectorized popcounts over the whole array.
+    
+    Example:
+        store = HashStore.from_image_hashes(hashes)
+        store.save("data/logos")
+        store = HashStore.load("data/logos")          # memory-mapped
+        rows, distances = store.scan(query_hash, radius=10)
+    """
+    
+    # Rows compared per step in scans (bounds temporary memory)
+    SCAN_CHUNK = 1 << 22
+    
+    def __init__(self, algorithm: HashAlgorithm = HashAlgorithm.PHASH):
+        self.algorithm = algorithm
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._ids = np.empty(0, dtype=np.int32)
+        self._size = 0
+        self._paths = _StringTable()
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def hashes(self) -> np.ndarray:
+        """uint64 hash values, one per row."""
+        return self._hashes[:self._size]
+    
+    @property
+    def ids(self) -> np.ndarray:
+        """int32 path ids, one per row (-1 when the row has no path)."""
+        return self._ids[:self._size]
+    
+    def _reserve(self, extra: int) -> None:
+        """Grow the column buffers (geometrically) to fit `extra` more rows."""
+        needed = self._size + extra
+        writable = self._hashes.flags.writeable and not isinstance(self._hashes, np.memmap)
+        if needed <= len(self._hashes) and writable:
+            return
+        capacity = max(needed, 2 * len(self._hashes), 1024)
+        hashes = np.empty(capacity, dtype=np.uint64)
+        ids = np.empty(capacity, dtype=np.int32)
+        hashes[:self._size] = self._hashes[:self._size]
+        ids[:self._size] = self._ids[:self._size]
+        self._hashes, self._ids = hashes, ids
+    
+    def _path_id(self, path: Optional[Union[str, Path]]) -> int:
+        return -1 if path is None else self._paths.intern(str(path))
+    
+    def add(self, hash_value: int, path: Optional[Union[str, Path]] = None) -> int:
+        """Append one hash and return its row."""
+        self._reserve(1)
+        row = self._size
+        self._hashes[row] = hash_value
+        self._ids[row] = self._path_id(path)
+        self._size += 1
+        return row
+    
+    def extend(
+        self,
+        hash_values: np.ndarray,
+        paths: Optional[Iterable[Optional[Union[str, Path]]]] = None
+    ) -> None:
+        """Append many hashes (and optionally their paths) at once."""
+        hash_values = np.asarray(hash_values, dtype=np.uint64)
+        count = len(hash_values)
+        if paths is None:
+            ids = np.full(count, -1, dtype=np.int32)
+        else:
+            ids = np.fromiter((self._path_id(p) for p in paths), dtype=np.int32, count=count)
+        
+        self._reserve(count)
+        self._hashes[self._size:self._size + count] = hash_values
+        self._ids[self._size:self._size + count] = ids
+        self._size += count
+    
+    @classmethod
+    def from_image_hashes(cls, hashes: Iterable[ImageHash]) -> HashStore:
+        hashes = list(hashes)
+        store = cls(hashes[0].algorithm if hashes else HashAlgorithm.PHASH)
+        store.extend(
+            np.fromiter((h.hash_value for h in hashes), dtype=np.uint64, count=len(hashes)),
+            (h.path for h in hashes)
+        )
+        return store
+    
+    def name(self, row: int) -> Optional[str]:
+        """Raw interned string (path or label) of a row, or None."""
+        path_id = int(self._ids[row])
+        return None if path_id < 0 else self._paths[path_id]
+    
+    def path(self, row: int) -> Optional[Path]:
+        """Path of a row (None for in-memory images)."""
+        name = self.name(row)
+        return None if name is None else Path(name)
+    
+    def to_image_hash(self, row: int) -> ImageHash:
+        hash_value = int(self._hashes[row])
+        return ImageHash(
+            path=self.path(row),
+            hash_value=hash_value,
+            hash_hex=hash_to_hex(hash_value),
+            algorithm=self.algorithm
+        )
+    
+    def distances(self, hash_value: int) -> np.ndarray:
+        """Hamming distance from `hash_value` to every row (uint8)."""
+        out = np.empty(self._size, dtype=np.uint8)
+        for start in range(0, self._size, self.SCAN_CHUNK):
+            stop = min(start + self.SCAN_CHUNK, self._size)
+            out[start:stop] = hamming_distances(hash_value, self._hashes[start:stop])
+        return out
+    
+    def scan(self, hash_value: int, radius: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Linear vectorized radius query.
+        
+        Returns:
+            (rows, distances) within `radius`, sorted by distance
+        """
+        distances = self.distances(hash_value)
+        rows = np.flatnonzero(distances <= radius)
+        order = np.argsort(distances[rows], kind='stable')
+        return rows[order], distances[rows][order]
+    
+    def save(self, prefix: Union[str, Path]) -> None:
+        """
+        Write the store as `<prefix>.hashes.npy`, `<prefix>.ids.npy`,
+        `<prefix>.paths.offsets.npy` and `<prefix>.paths.blob`.
+        
+        Each file is replaced atomically (stores loaded with mmap keep
+        reading the old files), and `<prefix>.json` goes last.
+        """
+        prefix = str(prefix)
+        directory = os.path.dirname(prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        _write_replacing(prefix + ".hashes.npy", lambda f: np.save(f, self.hashes))
+        _write_replacing(prefix + ".ids.npy", lambda f: np.save(f, self.ids))
+        self._paths.save(prefix + ".paths")
+        info = {"algorithm": self.algorithm.value, "count": self._size}
+        _write_replacing(prefix + ".json", lambda f: f.write(json.dumps(info).encode()))
+    
+    @classmethod
+    def load(cls, prefix: Union[str, Path], mmap: bool = True) -> HashStore:
+        """
+        Load a store written by save().
+        
+        With mmap=True (default) the columns are memory-mapped read-only,
+        so opening is O(1) and pages are shared between processes; the
+        first add/extend copies them into memory.
+        """
+        prefix = str(prefix)
+        with open(prefix + ".json") as f:
+            info = json.load(f)
+        
+        mmap_mode = 'r' if mmap else None
+        store = cls(HashAlgorithm(info["algorithm"]))
+        store._hashes = np.load(prefix + ".hashes.npy", mmap_mode=mmap_mode)
+        store._ids = np.load(prefix + ".ids.npy", mmap_mode=mmap_mode)
+        store._size = len(store._hashes)
+        store._paths = _StringTable.load(prefix + ".paths", mmap=mmap)
+        return store
+    
+    @staticmethod
+    def exists(prefix: Union[str, Path]) -> bool:
+        return os.path.exists(str(prefix) + ".json")
+
+
+# =============================================================================
+# MULTI-INDEX HASHING
+# =============================================================================
+
+@lru_cache(maxsize=64)
+def _probe_masks(width: int, radius: int) -> np.ndarray:
+    """All `width`-bit XOR masks with at most `radius` bits set."""
+    masks = [0]
+    for bits in range(1, min(radius, width) + 1):
+        for positions in combinations(range(width), bits):
+            mask = 0
+            for position in positions:
+                mask |= 1 << position
+            masks.append(mask)
+    masks = np.array(masks, dtype=np.uint64)
+    masks.setflags(write=False)
+    return masks
+
+
+def _expand_ranges(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Concatenate the integer ranges [lo[i], hi[i]) into one flat array."""
+    counts = hi - lo
+    nonempty = counts > 0
+    lo, counts = lo[nonempty], counts[nonempty]
+    if len(counts) == 0:
+        return np.empty(0, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    return np.repeat(lo - starts, counts) + np.arange(counts.sum())
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing (MIH) index for exact Hamming-radius search.
+    
+    The 64-bit hash is split into `num_tables` disjoint substrings, each
+    with its own lookup table. By the pigeonhole principle any hash
+    within distance r of the query differs from it by at most r // m bits
+    in at least one substring, so probing every substring value within
+    that small radius finds every match. Candidates are then verified
+    with a vectorized popcount, so results are exact.
+    
+    Tables are NumPy arrays rather than dicts: rows sorted by substring
+    plus either a direct-address array of bucket starts (substrings up to
+    24 bits) or the sorted keys for binary search. Memory stays at a few
+    bytes per hash per table.
+    
+    Example:
+        index = MultiIndexHash(np.array(hash_values, dtype=np.uint64))
+        rows, distances = index.query(query_hash, radius=10)
+        for rows_a, rows_b in index.pairs_within(radius=10):
+            ...
+    """
+    
+    # Substrings up to this width get a 2**width bucket-start array
+    DIRECT_TABLE_BITS = 24
+    
+    def __init__(self, hashes: np.ndarray, num_tables: Optional[int] = None):
+        """
+        Build the index.
+        
+        Args:
+            hashes: Array of 64-bit hash values (row i is id i)
+            num_tables: Number of substrings (default: chosen from corpus size)
+        """
+        self.hashes = np.ascontiguousarray(hashes, dtype=np.uint64)
+        n = len(self.hashes)
+        self.num_tables = num_tables or self.default_num_tables(n)
+        
+        row_dtype = np.int32 if n < 2 ** 31 else np.int64
+        
+        # (shift, width) of each substring, most significant first
+        self._substrings: list[tuple[int, int]] = []
+        # Row ids sorted by substring key, per substring
+        self._orders: list[np.ndarray] = []
+        # Bucket starts (direct tables) or sorted keys (binary search), per substring
+        self._lookups: list[np.ndarray] = []
+        
+        shift = 64
+        for t in range(self.num_tables):
+            width = 64 // self.num_tables + (1 if t < 64 % self.num_tables else 0)
+            shift -= width
+            keys = self._substring_keys(self.hashes, shift, width)
+            order = np.argsort(keys, kind='stable').astype(row_dtype)
+            
+            if width <= self.DIRECT_TABLE_BITS:
+                starts = np.zeros((1 << width) + 1, dtype=row_dtype)
+                np.cumsum(np.bincount(keys, minlength=1 << width), out=starts[1:])
+                lookup = starts
+            else:
+                lookup = keys[order]
+            
+            self._substrings.append((shift, width))
+            self._orders.append(order)
+            self._lookups.append(lookup)
+    
+    @staticmethod
+    def default_num_tables(n: int) -> int:
+        """Pick m ≈ 64 / log2(n) so each substring table has ~1 entry per key."""
+        if n < 2:
+            return 2
+        return int(min(8, max(2, round(64 / np.log2(n)))))
+    
+    @staticmethod
+    def _substring_keys(hashes: np.ndarray, shift: int, width: int) -> np.ndarray:
+        keys = (hashes >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+        return keys.astype(np.uint32) if width <= 32 else keys
+    
+    def __len__(self) -> int:
+        return len(self.hashes)
+    
+    def _bucket_bounds(self, table: int, probes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """[lo, hi) positions in the table's row order for each probe key."""
+        lookup = self._lookups[table]
+        if self._substrings[table][1] <= self.DIRECT_TABLE_BITS:
+            probes = probes.astype(np.intp)
+            return lookup[probes], lookup[probes + 1]
+        probes = probes.astype(lookup.dtype)
+        return (
+            np.searchsorted(lookup, probes, side='left'),
+            np.searchsorted(lookup, probes, side='right'),
+        )
+    
+    def _substring_radii(self, radius: int) -> list[int]:
+        """
+        Search radius for each substring.
+        
+        With r = m * q + a, a match has distance <= q in one of the first
+        a + 1 substrings or <= q - 1 in one of the rest; otherwise its total
+        distance would be at least (a + 1)(q + 1) + (m - a - 1) q > r.
+        """
+        q, a = divmod(radius, self.num_tables)
+        return [q if t <= a else q - 1 for t in range(self.num_tables)]
+    
+    def _probe_count(self, radius: int) -> int:
+        """Number of substring keys a single radius query probes."""
+        return sum(
+            sum(comb(width, k) for k in range(sub_radius + 1))
+            for (_, width), sub_radius in zip(self._substrings, self._substring_radii(radius))
+        )
+    
+    def candidates(self, hash_value: int, radius: int) -> np.ndarray:
+        """Rows sharing a substring within its probe radius (a superset of the matches)."""
+        # Very large radii probe more keys than there are rows; scan instead
+        if self._probe_count(radius) >= len(self.hashes):
+            return np.arange(len(self.hashes))
+        
+        query = np.uint64(hash_value)
+        found = []
+        for t, sub_radius in enumerate(self._substring_radii(radius)):
+            if sub_radius < 0:
+                continue
+            shift, width = self._substrings[t]
+            key = (query >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+            lo, hi = self._bucket_bounds(t, _probe_masks(width, sub_radius) ^ key)
+            found.append(self._orders[t][_expand_ranges(lo, hi)])
+        
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+    
+    def query(self, hash_value: int, radius: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find every stored hash within `radius` of `hash_value`.
+        
+        Args:
+            hash_value: 64-bit query hash
+            radius: Maximum Hamming distance (inclusive)
+            
+        Returns:
+            (rows, distances) arrays sorted by distance (closest first)
+        """
+        rows = self.candidates(hash_value, radius)
+        distances = hamming_distances(hash_value, self.hashes[rows])
+        keep = distances <= radius
+        rows, distances = rows[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        return rows[order], distances[order]
+    
+    def pairs_within(
+        self,
+        radius: int,
+        block_size: int = 8192
+    ) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """
+        All-pairs self-join: every pair of stored hashes within `radius`.
+        
+        Every row is used as a query, a block of rows at a time, with each
+        substring probe vectorized over the whole block. Each pair is
+        reported exactly once, with the lower row first.
+        
+        Cost grows with n * probes + matching pairs rather than n².
+        
+        Args:
+            radius: Maximum Hamming distance (inclusive)
+            block_size: Query rows processed per step (bounds memory)
+            
+        Yields:
+            (rows_a, rows_b) arrays of matching pairs, rows_a < rows_b
+        """
+        n = len(self.hashes)
+        
+        if self._probe_count(radius) >= n:
+            yield from self._scan_pairs(radius, block_size)
+            return
+        
+        sub_radii = self._substring_radii(radius)
+        
+        for t, sub_radius in enumerate(sub_radii):
+            if sub_radius < 0:
+                continue
+            shift, width = self._substrings[t]
+            order = self._orders[t]
+            
+            # Query in substring-sorted order: a block of neighbouring keys
+            # probes a narrow slice of the table, which keeps lookups in cache
+            for start in range(0, n, block_size):
+                query_rows = order[start:start + block_size]
+                keys = self._substring_keys(self.hashes[query_rows], shift, width)
+                found_a, found_b = [], []
+                
+                for mask in _probe_masks(width, sub_radius):
+                    lo, hi = self._bucket_bounds(t, keys ^ keys.dtype.type(mask))
+                    hits = np.flatnonzero(hi > lo)
+                    if len(hits) == 0:
+                        continue
+                    rows_b = order[_expand_ranges(lo[hits], hi[hits])]
+                    rows_a = np.repeat(query_rows[hits], hi[hits] - lo[hits])
+                    keep = rows_b > rows_a
+                    found_a.append(rows_a[keep])
+                    found_b.append(rows_b[keep])
+                
+                if not found_a:
+                    continue
+                rows_a = np.concatenate(found_a)
+                rows_b = np.concatenate(found_b)
+                pair_xor = self.hashes[rows_a] ^ self.hashes[rows_b]
+                keep = popcount64(pair_xor) <= radius
+                
+                # Report each pair once: drop pairs an earlier substring already found
+                for earlier in range(t):
+                    if sub_radii[earlier] < 0:
+                        continue
+                    e_shift, e_width = self._substrings[earlier]
+                    sub_dist = popcount64(self._substring_keys(pair_xor, e_shift, e_width))
+                    keep &= sub_dist > sub_radii[earlier]
+                
+                if keep.any():
+                    yield rows_a[keep], rows_b[keep]
+    
+    def _scan_pairs(
+        self,
+        radius: int,
+        block_size: int
+    ) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """Brute-force self-join for radii too large for substring probing."""
+        n = len(self.hashes)
+        # Keep each block's distance matrix around 16M entries
+        rows_per_block = max(1, min(block_size, (1 << 24) // max(n, 1)))
+        
+        for start in range(0, n, rows_per_block):
+            stop = min(start + rows_per_block, n)
+            block = self.hashes[start:stop]
+            distances = popcount64(block[:, None] ^ self.hashes[None, start:])
+            rows_a, offsets = np.nonzero(distances <= radius)
+            rows_a += start
+            rows_b = offsets + start
+            keep = rows_b > rows_a
+            if keep.any():
+                yield rows_a[keep], rows_b[keep]
+
+
+def _max_pairwise_distance(hashes: np.ndarray, block_rows: int = 1024) -> int:
+    """Largest Hamming distance between any two hashes in a group."""
+    # Exact duplicates do not change the maximum
+    unique = np.unique(hashes)
+    max_dist = 0
+    for start in range(0, len(unique), block_rows):
+        block = unique[start:start + block_rows]
+        distances = popcount64(block[:, None] ^ unique[None, start:])
+        max_dist = max(max_dist, int(distances.max()))
+    return max_dist
+
+
 # =============================================================================
 # DUPLICATE DETECTOR CLASS
 # =============================================================================
@@ -550,7 +1445,7 @@ class DuplicateDetector:
     - Find near-duplicates within configurable threshold
     - Group similar images into clusters
     - Incremental detection against existing hash set
-    - Optimized comparison using bucket pre-filtering for large sets
+    - Exact radius queries via a multi-index hashing (MIH) index
     
     Example:
         detector = DuplicateDetector(
@@ -584,124 +1479,83 @@ class DuplicateDetector:
         self.hasher = PerceptualHasher(algorithm=algorithm)
         
         # Storage for loaded hashes (for incremental detection)
-        self._loaded_hashes: list[ImageHash] = []
+        self._store = HashStore(algorithm)
         
-        # Bucket index for optimized lookups (prefix -> list of hashes)
-        self._bucket_index: dict[int, list[ImageHash]] = {}
-        self._bucket_bits = 8  # Use top 8 bits for bucketing
+        # Multi-index hashing index over the loaded hashes (row i = store row i)
+        self._index: Optional[MultiIndexHash] = None
     
-    def load_hashes(self, hashes: list[ImageHash]) -> None:
+    def load_hashes(self, hashes: Union[HashStore, list[ImageHash]]) -> None:
         """
         Load existing hashes for incremental detection.
         
         Args:
-            hashes: List of pre-computed ImageHash objects
+            hashes: A HashStore (e.g. HashStore.load(prefix)) or a list of
+                    pre-computed ImageHash objects
         """
-        self._loaded_hashes = list(hashes)
-        self._build_bucket_index()
+        if not isinstance(hashes, HashStore):
+            hashes = HashStore.from_image_hashes(hashes)
+        self._store = hashes
+        self._build_index()
         logger.info(f"Loaded {len(hashes)} hashes into detector")
     
-    def _build_bucket_index(self) -> None:
-        """Build bucket index for fast approximate lookups."""
-        self._bucket_index.clear()
-        
-        for img_hash in self._loaded_hashes:
-            # Use top N bits as bucket key
-            bucket_key = img_hash.hash_value >> (64 - self._bucket_bits)
-            
-            if bucket_key not in self._bucket_index:
-                self._bucket_index[bucket_key] = []
-            self._bucket_index[bucket_key].append(img_hash)
-    
-    def _get_candidate_buckets(self, hash_value: int) -> list[int]:
-        """
-        Get bucket keys that might contain similar hashes.
-        
-        For near-duplicate detection, we need to check nearby buckets.
-        """
-        primary_bucket = hash_value >> (64 - self._bucket_bits)
-        
-        # For small thresholds, check primary bucket only
-        if self.threshold <= 8:
-            return [primary_bucket]
-        
-        # For larger thresholds, check adjacent buckets
-        candidates = [primary_bucket]
-        for offset in [-1, 1]:
-            adjacent = primary_bucket + offset
-            if 0 <= adjacent < (1 << self._bucket_bits):
-                candidates.append(adjacent)
-        
-        return candidates
+    def _build_index(self) -> None:
+        """Build the MIH index used for exact radius lookups."""
+        self._index = MultiIndexHash(self._store.hashes)
     
     def find_matches(
         self,
-        image_path: Union[str, Path],
+        image: ImageSource,
         threshold: Optional[int] = None
     ) -> list[DuplicateMatch]:
         """
         Find images matching the given image in the loaded hash set.
         
         Args:
-            image_path: Path to query image
+            image: Path to query image, or an in-memory image
             threshold: Override default threshold (optional)
             
         Returns:
             List of matching images sorted by distance
         """
-        if not self._loaded_hashes:
+        if not len(self._store):
             logger.warning("No hashes loaded. Call load_hashes() first.")
             return []
         
         threshold = threshold if threshold is not None else self.threshold
         
         # Hash the query image
-        query_hash = self.hasher.hash_image(image_path)
-        
-        matches: list[DuplicateMatch] = []
-        
-        # Use bucket pre-filtering for large sets
-        if len(self._loaded_hashes) > 1000:
-            candidate_buckets = self._get_candidate_buckets(query_hash.hash_value)
-            candidates = []
-            for bucket_key in candidate_buckets:
-                candidates.extend(self._bucket_index.get(bucket_key, []))
-        else:
-            candidates = self._loaded_hashes
+        query_hash = self.hasher.hash_image(image)
         
-        # Compare with candidates
-        for img_hash in candidates:
-            dist = hamming_distance(query_hash.hash_value, img_hash.hash_value)
-            
-            if dist <= threshold:
-                matches.append(DuplicateMatch(
-                    path=img_hash.path,
-                    hash_hex=img_hash.hash_hex,
-                    distance=dist,
-                    similarity=similarity_from_distance(dist)
-                ))
+        # Exact radius query; rows come back sorted by distance
+        rows, distances = self._index.query(query_hash.hash_value, threshold)
         
-        # Sort by distance (closest first)
-        matches.sort(key=lambda m: m.distance)
+        matches: list[DuplicateMatch] = []
+        for row, dist in zip(rows.tolist(), distances.tolist()):
+            matches.append(DuplicateMatch(
+                path=self._store.path(row),
+                hash_hex=hash_to_hex(int(self._store.hashes[row])),
+                distance=dist,
+                similarity=similarity_from_distance(dist)
+            ))
         
         return matches
     
     def is_duplicate(
         self,
-        image_path: Union[str, Path],
+        image: ImageSource,
         threshold: Optional[int] = None
     ) -> bool:
         """
         Check if an image is a duplicate of any loaded image.
         
         Args:
-            image_path: Path to check
+            image: Path or in-memory image to check
             threshold: Override default threshold
             
         Returns:
             True if a duplicate is found
         """
-        matches = self.find_matches(image_path, threshold)
+        matches = self.find_matches(image, threshold)
         return len(matches) > 0
     
     def find_duplicates(
@@ -740,19 +1594,42 @@ class DuplicateDetector:
             for r in results if r.success and r.hash_value is not None
         ]
         
-        if len(valid_hashes) < 2:
+        return self.cluster_hashes(valid_hashes)
+    
+    def cluster_hashes(self, hashes: list[ImageHash]) -> list[DuplicateGroup]:
+        """
+        Group already computed hashes into duplicate clusters.
+        
+        Near-duplicate pairs come from an MIH self-join (one radius query
+        per hash, vectorized per block) and are streamed into a Union-Find,
+        so the cost grows with the number of matching pairs rather than
+        with all n² pairs.
+        
+        Args:
+            hashes: Pre-computed ImageHash objects
+            
+        Returns:
+            List of DuplicateGroup objects (2+ images each)
+        """
+        if len(hashes) < 2:
             return []
         
-        logger.info(f"Finding duplicates among {len(valid_hashes)} images...")
+        logger.info(f"Finding duplicates among {len(hashes)} images...")
+        
+        hash_values = np.fromiter(
+            (h.hash_value for h in hashes), dtype=np.uint64, count=len(hashes)
+        )
+        index = MultiIndexHash(hash_values)
         
         # Union-Find for clustering
-        parent = list(range(len(valid_hashes)))
-        rank = [0] * len(valid_hashes)
+        parent = list(range(len(hashes)))
+        rank = [0] * len(hashes)
         
         def find(x: int) -> int:
-            if parent[x] != x:
-                parent[x] = find(parent[x])
-            return parent[x]
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
         
         def union(x: int, y: int) -> None:
             px, py = find(x), find(y)
@@ -764,23 +1641,16 @@ class DuplicateDetector:
             if rank[px] == rank[py]:
                 rank[px] += 1
         
-        # Compare all pairs (with optimization for small threshold)
-        n = len(valid_hashes)
-        comparisons = 0
+        # Stream near-duplicate pairs from the index into the Union-Find
+        n = len(hashes)
+        pair_count = 0
         
-        for i in range(n):
-            for j in range(i + 1, n):
-                dist = hamming_distance(
-                    valid_hashes[i].hash_value,
-                    valid_hashes[j].hash_value
-                )
-                
-                if dist <= self.threshold:
-                    union(i, j)
-                
-                comparisons += 1
+        for rows_a, rows_b in index.pairs_within(self.threshold):
+            for i, j in zip(rows_a.tolist(), rows_b.tolist()):
+                union(i, j)
+            pair_count += len(rows_a)
         
-        logger.info(f"Performed {comparisons} comparisons")
+        logger.info(f"Found {pair_count} near-duplicate pairs")
         
         # Group by root
         groups: dict[int, list[int]] = {}
@@ -797,14 +1667,8 @@ class DuplicateDetector:
             if len(indices) < 2:
                 continue
             
-            group_hashes = [valid_hashes[i] for i in indices]
-            
-            # Calculate max distance within group
-            max_dist = 0
-            for i, h1 in enumerate(group_hashes):
-                for h2 in group_hashes[i + 1:]:
-                    dist = hamming_distance(h1.hash_value, h2.hash_value)
-                    max_dist = max(max_dist, dist)
+            group_hashes = [hashes[i] for i in indices]
+            max_dist = _max_pairwise_distance(hash_values[indices])
             
             duplicate_groups.append(DuplicateGroup(
                 images=group_hashes,
@@ -0,0 +1,168 @@
+import os
+import pickle
+from typing import Optional, Union
+
+import numpy as np
+
+from app.services.perceptual_hash import (
+    HashAlgorithm,
+    HashStore,
+    MultiIndexHash,
+    hash_to_hex,
+    hex_to_hash,
+    similarity_from_distance
+)
+
+# Hamming distance at or below which two marks count as near-exact duplicates
+# (same cut-off as EmbeddingService.compare_hashes)
+DUPLICATE_DISTANCE = 10
+
+
+class PHashIndex:
+    """
+    Persistent perceptual-hash index of registered marks.
+
+    Lives next to the FAISS indexes (`<index_path>_phash.*`) and answers
+    exact Hamming-radius queries through a multi-index hashing index, so
+    duplicate detection is a cheap lookup instead of a CLIP heuristic.
+
+    Marks are keyed by registry id, like VectorStore: re-adding an id
+    replaces its hash and delete() removes it. Replaced and deleted rows
+    are skipped by searches and dropped when the index is saved.
+    """
+
+    def __init__(self, index_path="vector_store.index"):
+        self.index_path = index_path + "_phash"
+        self.metadata_path = self.index_path + ".meta"
+
+        if HashStore.exists(self.index_path):
+            self.load_index()
+        else:
+            self.store = HashStore(HashAlgorithm.PHASH)
+            self.metadata = {}  # Map registry id to metadata
+            self._rows = {}
+            self._dead = set()
+
+        self._index: Optional[MultiIndexHash] = None
+
+    def save_index(self):
+        self._compact()
+        self.store.save(self.index_path)
+        tmp_path = self.metadata_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.metadata, f)
+        os.replace(tmp_path, self.metadata_path)
+
+    def load_index(self):
+        self.store = HashStore.load(self.index_path)
+        if os.path.exists(self.metadata_path):
+            with open(self.metadata_path, 'rb') as f:
+                self.metadata = pickle.load(f)
+        else:
+            self.metadata = {}
+        self._rows = None  # Built on first use
+        self._dead = set()
+        self._index = None
+        if any(isinstance(key, int) for key in self.metadata):
+            # Saved before upserts: metadata keyed by row, ids maybe repeated
+            self._row_map()
+
+    def _row_map(self) -> dict:
+        """Map registry id to its live row."""
+        if self._rows is None:
+            # The last row of an id is its live one (older saves could repeat ids)
+            rows = {}
+            for row in range(len(self.store)):
+                name = self.store.name(row)
+                if name in rows:
+                    self._dead.add(rows[name])
+                rows[name] = row
+            if any(isinstance(key, int) for key in self.metadata):
+                self.metadata = {
+                    self.store.name(row): metadata for row, metadata in self.metadata.items()
+                    if rows.get(self.store.name(row)) == row
+                }
+            self._rows = rows
+        return self._rows
+
+    def _compact(self):
+        """Rewrite the store without replaced or deleted rows."""
+        rows = self._row_map()
+        if not self._dead:
+            return
+        live = np.array(sorted(rows.values()), dtype=np.int64)
+        store = HashStore(self.store.algorithm)
+        store.extend(self.store.hashes[live], [self.store.name(row) for row in live])
+        self.store = store
+        self._rows = {store.name(row): row for row in range(len(store))}
+        self._dead = set()
+        self._index = None
+
+    def _get_index(self) -> MultiIndexHash:
+        # Rebuilt lazily after the store changes
+        if self._index is None or len(self._index) != len(self.store):
+            self._index = MultiIndexHash(self.store.hashes)
+        return self._index
+
+    def add(self, id: str, phash: Union[str, int], metadata: dict, save: bool = True):
+        """Upsert the hash of mark `id`, replacing any stored one."""
+        hash_value = hex_to_hash(phash) if isinstance(phash, str) else phash
+        rows = self._row_map()
+        if id in rows:
+            self._dead.add(rows[id])
+        rows[id] = self.store.add(hash_value, id)
+        self.metadata[id] = metadata
+        if save:
+            self.save_index()
+
+    def delete(self, ids: list, save: bool = True) -> int:
+        """Delete marks by registry id; returns the number removed."""
+        rows = self._row_map()
+        removed = 0
+        for id in ids:
+            row = rows.pop(id, None)
+            if row is not None:
+                self._dead.add(row)
+                self.metadata.pop(id, None)
+                removed += 1
+        if save and removed:
+            self.save_index()
+        return removed
+
+    def get(self, id: str) -> Optional[dict]:
+        """Metadata of mark `id`, or None if it is not registered."""
+        if id not in self._row_map():
+            return None
+        return self.metadata.get(id, {})
+
+    def ids(self) -> set:
+        """Ids of every registered mark."""
+        return set(self._row_map())
+
+    def search(self, phash: Union[str, int], radius: int = DUPLICATE_DISTANCE, k: int = 5):
+        """
+        Registered marks within `radius` bits of `phash`, closest first.
+        """
+        if not len(self.store):
+            return []
+
+        hash_value = hex_to_hash(phash) if isinstance(phash, str) else phash
+        rows, distances = self._get_index().query(hash_value, radius)
+        if self._dead:
+            live = np.array([row not in self._dead for row in rows.tolist()], dtype=bool)
+            rows, distances = rows[live], distances[live]
+
+        results = []
+        for row, dist in zip(rows[:k].tolist(), distances[:k].tolist()):
+            id = self.store.name(row)
+            results.append({
+                "id": id,
+                "phash": hash_to_hex(int(self.store.hashes[row])),
+                "distance": dist,
+                "similarity": round(similarity_from_distance(dist) * 100, 2),
+                "metadata": self.metadata.get(id, {})
+            })
+        return results
+
+# Singleton
+phash_index = PHashIndex()
@@ -1,28 +1,19 @@
-from PIL import Image, ImageOps
-import io
-import numpy as np
+from app.services.image_context import ImageContext
 
 class PreprocessingService:
-    def preprocess(self, image_bytes: bytes) -> Image.Image:
+    def preprocess(self, image_bytes: bytes) -> ImageContext:
         """
         Preprocesses the image for consistent analysis.
+        - Decodes the upload once
+        - Normalizes orientation from EXIF
         - Converts to RGB
-        - Resizes to standard size (e.g., 224x224 for CLIP) - *actually we keep it larger for OCR, let CLIP handle its own resize*
-        - Normalizes orientation
+        - Lazily derives the resolutions each layer needs (224px CLIP, 32px pHash, <=1024px OCR)
+
+        The returned ImageContext is shared by every downstream service so the
+        upload is never decoded twice in the same request.
         """
         try:
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Handle orientation from EXIF
-            image = ImageOps.exif_transpose(image)
-            
-            # Convert to RGB (remove alpha channel if present)
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # We don't resize here for EVERYTHING because OCR needs high res.
-            # But we can return a standard "analysis ready" image object.
-            return image
+            return ImageContext(image_bytes)
         except Exception as e:
             print(f"Preprocessing error: {e}")
             raise e
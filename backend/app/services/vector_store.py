@@ -1,74 +1,585 @@
 import faiss
+import json
 import numpy as np
 import os
-import pickle
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from app.services.metadata_store import MetadataStore
+
+# Supported index types:
+# - "flat":     exact brute-force search (default; fine for small registers)
+# - "hnsw":     graph index, lowest query latency, no training, more RAM
+# - "ivf_flat": inverted lists over raw vectors, needs train()
+# - "ivf_pq":   inverted lists over product-quantized codes, smallest RAM, needs train()
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# Supported metrics:
+# - "cosine": vectors are L2-normalized on add and search and indexed by
+#             inner product, so FAISS scores are cosine similarities
+# - "l2":     squared L2 distance on the raw vectors (stores created
+#             before metrics existed)
+METRICS = ("cosine", "l2")
+
+DEFAULT_INDEX_PARAMS = {
+    "hnsw_m": 32,            # Graph degree
+    "ef_construction": 80,   # Build-time beam width
+    "ef_search": 64,         # Query-time beam width
+    "nlist": 1024,           # IVF cells
+    "nprobe": 16,            # IVF cells visited per query
+    "pq_bytes_per_dim": 8,   # PQ sub-vector length (dim / this = code bytes)
+}
 
 class VectorStore:
-    def __init__(self, index_path="vector_store.index"):
+    def __init__(self, index_path="vector_store.index", flush_every=0, flush_interval=0,
+                 index_type=None, index_params=None, metric=None, mmap=None):
         self.index_path = index_path
+        # Legacy pickled metadata, read as-is until migrate() imports it into SQLite
         self.metadata_path = index_path + ".meta"
-        
+        self.metadata_db_path = index_path + ".db"
+        self.config_path = index_path + ".config"
+
         self.text_dimension = 384
         self.image_dimension = 512
-        
+
+        # Index type is persisted in the .config file; an existing store
+        # keeps its type (use rebuild() to change it)
+        self.index_type = index_type or os.getenv("VECTOR_INDEX_TYPE", "flat")
+        self.index_params = dict(DEFAULT_INDEX_PARAMS, **(index_params or {}))
+        self.metric = metric or os.getenv("VECTOR_METRIC", "cosine")
+
+        # Saved indexes are loaded lazily on first use. With mmap they are
+        # mapped read-only instead of read into the heap, so start-up is
+        # instant and worker processes share one copy through the page
+        # cache; the first write to a modality reloads it into memory.
+        self.mmap = os.getenv("VECTOR_INDEX_MMAP", "1") == "1" if mmap is None else mmap
+        self._indexes = {}       # kind -> loaded index
+        self._writable = set()   # kinds whose index is held in heap memory
+        self._loaded_version = None  # contents version the loaded indexes hold
+        # Serializes lazy loads and reloads (request threads share the store)
+        self._lock = threading.RLock()
+
+        # Write batching: outside batch() every add is saved immediately.
+        # Inside batch() saves are deferred until the batch exits, or until
+        # `flush_every` vectors / `flush_interval` seconds have accumulated.
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._batch_depth = 0
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {self.index_type!r}; expected one of {INDEX_TYPES}")
+        if self.metric not in METRICS:
+            raise ValueError(f"Unknown metric {self.metric!r}; expected one of {METRICS}")
+
+        # Map FAISS id to metadata
+        self.metadata = MetadataStore(self.metadata_db_path, legacy_path=self.metadata_path)
+
         if os.path.exists(self.index_path + "_text") and os.path.exists(self.index_path + "_image"):
             self.load_index()
+
+    def _dimension(self, kind: str) -> int:
+        return self.text_dimension if kind == "text" else self.image_dimension
+
+    def _read_index(self, kind: str, mmap: bool):
+        flags = 0
+        if mmap:
+            # IVF inverted lists and flat vector storage are mapped differently
+            if self.index_type.startswith("ivf"):
+                flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+            else:
+                flags = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+        index = faiss.read_index(f"{self.index_path}_{kind}", flags)
+        self._apply_search_params(index)
+        return index
+
+    def _get_index(self, kind: str):
+        """Index for `kind`, loaded (or created, for a new store) on first access."""
+        index = self._indexes.get(kind)
+        if index is not None:
+            return index
+        with self._lock:
+            # Another thread may have loaded it while we waited
+            if kind not in self._indexes:
+                if self._loaded_version is None:
+                    # Read before the files, so it never claims newer contents
+                    self._loaded_version = self.metadata.version()
+                if os.path.exists(f"{self.index_path}_{kind}"):
+                    # Legacy indexes (no stable ids) are only ever read here;
+                    # their positions are their FAISS ids. See migrate().
+                    index = self._indexes[kind] = self._read_index(kind, self.mmap)
+                    if not self.mmap and self._has_ids(index):
+                        self._writable.add(kind)
+                else:
+                    self._indexes[kind] = self._create_index(self._dimension(kind))
+                    self._writable.add(kind)
+            return self._indexes[kind]
+
+    def _writable_index(self, kind: str):
+        """Index for `kind`, reloaded into memory first if it is memory-mapped."""
+        with self._lock:
+            index = self._get_index(kind)
+            if not self._has_ids(index):
+                raise RuntimeError(
+                    f"The {kind} index predates stable ids; run migrate() (e.g. via scripts.seed_db) before writing"
+                )
+            if kind not in self._writable:
+                # Memory-mapped indexes are read-only; an unsaved change is
+                # impossible here, so the file on disk is current
+                index = self._indexes[kind] = self._read_index(kind, mmap=False)
+                self._writable.add(kind)
+            return index
+
+    @staticmethod
+    def _base_index(index):
+        """The index wrapped by an IndexIDMap2, or `index` itself."""
+        if isinstance(index, faiss.IndexIDMap):
+            return faiss.downcast_index(index.index)
+        return index
+
+    @staticmethod
+    def _is_ivf(index) -> bool:
+        try:
+            faiss.extract_index_ivf(index)
+            return True
+        except RuntimeError:
+            return False
+
+    def _has_ids(self, index) -> bool:
+        # IVF indexes store ids natively; everything else is wrapped in IndexIDMap2
+        return isinstance(index, faiss.IndexIDMap) or self._is_ivf(index)
+
+    def migrate(self):
+        """
+        Convert a store saved before stable ids (vector i has FAISS id i,
+        metadata in a pickle) in place: indexes become id-mapped, keeping
+        the ids, and the metadata moves into SQLite.
+
+        Searches read legacy stores as they are and writes refuse them, so
+        run this once, as an explicit step, before writing (seed_db does).
+        Re-running it, or running it in two processes, converts each index
+        at most once.
+        """
+        with self._lock:
+            self.metadata.migrate()
+            for kind in ("text", "image"):
+                path = f"{self.index_path}_{kind}"
+                if not os.path.exists(path):
+                    continue
+                # Check the file, not a cached index: another process may have migrated it
+                legacy = self._read_index(kind, mmap=False)
+                if not self._has_ids(legacy):
+                    print(f"Migrating {kind} index ({legacy.ntotal} vectors) to stable ids...")
+                    index = self._create_index(self._dimension(kind))
+                    if legacy.ntotal:
+                        index.add_with_ids(
+                            legacy.reconstruct_n(0, legacy.ntotal), np.arange(legacy.ntotal, dtype=np.int64)
+                        )
+                    # New marks get ids after every legacy vector, with or without metadata
+                    self.metadata.allocate_ids(kind, 0, minimum=legacy.ntotal)
+                    self.metadata.commit()
+                    self._write_index(index, path)
+                    legacy = index
+                self._indexes[kind] = legacy
+                self._writable.add(kind)
+
+    @staticmethod
+    def _write_index(index, path: str):
+        """
+        Write `index` to `path` through a uniquely named temporary file and
+        an atomic rename, so processes mapping the old file keep a valid
+        mapping and concurrent writers never share a temporary file.
+        """
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path) or "."
+        )
+        os.close(fd)
+        try:
+            faiss.write_index(index, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @property
+    def text_index(self):
+        return self._get_index("text")
+
+    @text_index.setter
+    def text_index(self, index):
+        with self._lock:
+            self._indexes["text"] = index
+            self._writable.add("text")
+
+    @property
+    def image_index(self):
+        return self._get_index("image")
+
+    @image_index.setter
+    def image_index(self, index):
+        with self._lock:
+            self._indexes["image"] = index
+            self._writable.add("image")
+
+    def _create_index(self, dimension: int):
+        index_type = self.index_type
+        params = self.index_params
+        metric = faiss.METRIC_INNER_PRODUCT if self.metric == "cosine" else faiss.METRIC_L2
+        if index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(dimension, params["hnsw_m"], metric)
+            index.hnsw.efConstruction = params["ef_construction"]
+            index = faiss.IndexIDMap2(index)
+        elif index_type == "ivf_flat":
+            index = faiss.index_factory(dimension, f"IVF{params['nlist']},Flat", metric)
+        elif index_type == "ivf_pq":
+            code_size = dimension // params["pq_bytes_per_dim"]
+            index = faiss.index_factory(dimension, f"IVF{params['nlist']},PQ{code_size}x8", metric)
+        elif metric == faiss.METRIC_INNER_PRODUCT:
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
         else:
-            self.text_index = faiss.IndexFlatL2(self.text_dimension)
-            self.image_index = faiss.IndexFlatL2(self.image_dimension)
-            self.metadata = {} # Map ID to metadata
+            index = faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))
+        self._apply_search_params(index)
+        return index
+
+    def _apply_search_params(self, index):
+        """Set query-time knobs (efSearch / nprobe) on an index."""
+        base = self._base_index(index)
+        if isinstance(base, faiss.IndexHNSW):
+            base.hnsw.efSearch = self.index_params["ef_search"]
+        elif self._is_ivf(index):
+            faiss.extract_index_ivf(index).nprobe = self.index_params["nprobe"]
+
+    def save_config(self):
+        with open(self.config_path, 'w') as f:
+            json.dump({
+                "index_type": self.index_type,
+                "metric": self.metric,
+                "index_params": self.index_params
+            }, f, indent=2)
+
+    def load_config(self):
+        # Stores written before index types / metrics existed are flat L2
+        config = {"index_type": "flat"}
+        if os.path.exists(self.config_path):
+            with open(self.config_path) as f:
+                config = json.load(f)
+        self.index_type = config["index_type"]
+        self.metric = config.get("metric", "l2")
+        self.index_params.update(config.get("index_params", {}))
+
+    def _prepare(self, vectors, dimension: int) -> np.ndarray:
+        """Vectors as a contiguous float32 (N, dimension) array, normalized for cosine stores."""
+        vecs = np.array(vectors, dtype=np.float32).reshape(-1, dimension)
+        if self.metric == "cosine":
+            faiss.normalize_L2(vecs)
+        return vecs
+
+    def _to_similarity(self, scores: np.ndarray) -> np.ndarray:
+        """Convert FAISS scores to cosine similarity."""
+        if self.metric == "cosine":
+            return scores
+        # Squared L2 between unit vectors: |a - b|^2 = 2 - 2cos
+        return 1 - scores / 2
+
+    @property
+    def is_trained(self) -> bool:
+        return self.text_index.is_trained and self.image_index.is_trained
+
+    def train(self, text_sample=None, image_sample=None):
+        """
+        Train IVF quantizers from a representative sample of vectors.
+
+        Needs at least `nlist` vectors per modality (faiss recommends ~40x).
+        Flat and HNSW indexes need no training and ignore this.
+        """
+        for kind, sample in (("text", text_sample), ("image", image_sample)):
+            if sample is not None:
+                self._train(kind, sample)
+
+    def _train(self, kind: str, sample):
+        if not self._get_index(kind).is_trained:
+            self._writable_index(kind).train(self._prepare(sample, self._dimension(kind)))
+
+    def rebuild(self, index_type: str = None, metric: str = None, **index_params):
+        """
+        Rebuild both indexes as `index_type` / `metric` (default: unchanged),
+        training IVF quantizers on the stored vectors themselves. Metadata
+        keys are unchanged.
+        """
+        index_type = index_type or self.index_type
+        metric = metric or self.metric
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}; expected one of {METRICS}")
+        # Only marks with metadata are carried over, which also drops
+        # tombstoned (deleted but not removable) vectors
+        live = {}
+        for kind in ("text", "image"):
+            ids = self.metadata.ids(kind)
+            live[kind] = (ids, self._vectors(self._writable_index(kind), ids))
+
+        self.index_type = index_type
+        self.metric = metric
+        self.index_params.update(index_params)
+        for kind, (ids, vectors) in live.items():
+            vectors = self._prepare(vectors, self._dimension(kind))
+            self._indexes[kind] = self._create_index(self._dimension(kind))
+            self._writable.add(kind)
+            self._train(kind, vectors)
+            if len(ids):
+                self._indexes[kind].add_with_ids(vectors, ids)
+            self.metadata.clear_tombstones(kind)
+        self._mark_dirty(sum(len(ids) for ids, _ in live.values()) or 1)
+
+    def _vectors(self, index, ids: np.ndarray) -> np.ndarray:
+        """Stored vectors for FAISS `ids`."""
+        if len(ids) == 0:
+            return np.zeros((0, index.d), dtype=np.float32)
+        if self._is_ivf(index):
+            # Lookup by id needs a direct map
+            faiss.extract_index_ivf(index).set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index.reconstruct_batch(ids)
 
     def save_index(self):
         # Ensure directory exists
         directory = os.path.dirname(self.index_path)
         if directory and not os.path.exists(directory):
             os.makedirs(directory)
-            
-        faiss.write_index(self.text_index, self.index_path + "_text")
-        faiss.write_index(self.image_index, self.index_path + "_image")
-        with open(self.metadata_path, 'wb') as f:
-            pickle.dump(self.metadata, f)
+
+        # Memory-mapped (and legacy) indexes are unmodified and already on disk
+        for kind in ("text", "image"):
+            path = f"{self.index_path}_{kind}"
+            if kind not in self._writable and os.path.exists(path):
+                continue
+            self._write_index(self._get_index(kind), path)
+        self.metadata.commit()
+        self.save_config()
 
     def load_index(self):
-        self.text_index = faiss.read_index(self.index_path + "_text")
-        self.image_index = faiss.read_index(self.index_path + "_image")
-        if os.path.exists(self.metadata_path):
-            with open(self.metadata_path, 'rb') as f:
-                self.metadata = pickle.load(f)
+        # Indexes themselves are (re)loaded lazily by _get_index
+        with self._lock:
+            self.load_config()
+            self._indexes = {}
+            self._writable = set()
+            self._loaded_version = None
+
+    @contextmanager
+    def batch(self, flush_every: int = None):
+        """
+        Group many adds into one write.
+
+            with vector_store.batch():
+                for ...:
+                    vector_store.add_text(...)
+
+        Each index file and the metadata are written once when the outermost
+        batch exits (plus any size/time-triggered flushes), instead of after
+        every vector. `flush_every` overrides the store's setting for the
+        duration of the batch.
+        """
+        previous_flush_every = self.flush_every
+        if flush_every is not None:
+            self.flush_every = flush_every
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            self.flush_every = previous_flush_every
+            if self._batch_depth == 0:
+                self.flush()
+
+    def flush(self):
+        """Write pending changes to disk, if there are any."""
+        if self._pending:
+            self.save_index()
+            self._pending = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def version(self) -> int:
+        """
+        Contents version, bumped by every add, delete and rebuild (and shared
+        with other processes once flushed). Caches of search results compare
+        it to detect stale entries.
+        """
+        return self.metadata.version()
+
+    @property
+    def loaded_version(self) -> int:
+        """
+        Contents version of the indexes this process searches: read when
+        they were loaded and advanced by its own writes. Another process's
+        changes move `version` but not this, since the indexes loaded here
+        (e.g. memory-mapped) do not see them.
+        """
+        with self._lock:
+            for kind in ("text", "image"):
+                self._get_index(kind)
+            return self._loaded_version
+
+    def _mark_dirty(self, count: int):
+        version = self.metadata.bump_version()
+        with self._lock:
+            # Only if no other process changed the store since it was loaded
+            if self._loaded_version == version - 1:
+                self._loaded_version = version
+        self._pending += count
+        if (
+            self._batch_depth == 0
+            or (self.flush_every and self._pending >= self.flush_every)
+            or (self.flush_interval and time.monotonic() - self._last_flush >= self.flush_interval)
+        ):
+            self.flush()
+
+    def _add_batch(self, kind: str, ids: list, vectors, metadatas: list):
+        index = self._writable_index(kind)
+        vecs = self._prepare(vectors, self._dimension(kind))
+        if not index.is_trained:
+            raise RuntimeError(
+                f"The {kind} index ({self.index_type}) is not trained; call train() with a sample first"
+            )
+        if not len(vecs) == len(ids) == len(metadatas):
+            raise ValueError(f"Got {len(vecs)} vectors, {len(ids)} ids and {len(metadatas)} metadata entries")
+
+        # Upsert: the last entry for an id wins and replaces any stored mark
+        last = {id: position for position, id in enumerate(ids)}
+        keep = sorted(last.values())
+        if len(keep) < len(ids):
+            vecs = vecs[keep]
+            ids = [ids[position] for position in keep]
+            metadatas = [metadatas[position] for position in keep]
+        self._remove(kind, self.metadata.find_ids(kind, ids))
+
+        faiss_ids = self.metadata.allocate_ids(kind, len(vecs))
+        index.add_with_ids(vecs, faiss_ids)
+        self.metadata.put_many(kind, zip(faiss_ids, ids, metadatas))
+        self._mark_dirty(len(vecs))
+
+    def _remove(self, kind: str, faiss_ids: np.ndarray):
+        if len(faiss_ids) == 0:
+            return
+        if isinstance(self._base_index(self._get_index(kind)), faiss.IndexHNSW):
+            # HNSW cannot remove vectors: tombstone them until the next rebuild()
+            self.metadata.add_tombstones(kind, faiss_ids)
         else:
-            self.metadata = {}
+            self._writable_index(kind).remove_ids(faiss_ids)
+        self.metadata.delete(kind, faiss_ids)
+
+    def _delete(self, kind: str, ids: list) -> int:
+        faiss_ids = self.metadata.find_ids(kind, ids)
+        self._remove(kind, faiss_ids)
+        if len(faiss_ids):
+            self._mark_dirty(len(faiss_ids))
+        return len(faiss_ids)
+
+    def add_text_batch(self, ids: list, vectors, metadatas: list):
+        """
+        Upsert an (N, 384) array of text vectors, one registry id and
+        metadata dict each. Re-adding an id replaces the stored mark.
+        """
+        self._add_batch("text", ids, vectors, metadatas)
+
+    def add_image_batch(self, ids: list, vectors, metadatas: list):
+        """Upsert an (N, 512) array of image vectors (see add_text_batch)."""
+        self._add_batch("image", ids, vectors, metadatas)
 
     def add_text(self, id: str, vector: list, metadata: dict):
-        vec = np.array([vector], dtype=np.float32)
-        self.text_index.add(vec)
-        self.metadata[f"text_{self.text_index.ntotal - 1}"] = metadata
-        self.save_index()
+        self.add_text_batch([id], [vector], [metadata])
 
     def add_image(self, id: str, vector: list, metadata: dict):
-        vec = np.array([vector], dtype=np.float32)
-        self.image_index.add(vec)
-        self.metadata[f"image_{self.image_index.ntotal - 1}"] = metadata
-        self.save_index()
-
-    def search_text(self, vector: list, k: int = 5):
-        vec = np.array([vector], dtype=np.float32)
-        distances, indices = self.text_index.search(vec, k)
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx != -1:
-                meta = self.metadata.get(f"text_{idx}", {})
-                results.append({"score": float(distances[0][i]), "metadata": meta})
-        return results
-
-    def search_image(self, vector: list, k: int = 5):
-        vec = np.array([vector], dtype=np.float32)
-        distances, indices = self.image_index.search(vec, k)
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx != -1:
-                meta = self.metadata.get(f"image_{idx}", {})
-                results.append({"score": float(distances[0][i]), "metadata": meta})
-        return results
+        self.add_image_batch([id], [vector], [metadata])
+
+    def delete_text(self, ids: list) -> int:
+        """Delete text marks by registry id; returns the number removed."""
+        return self._delete("text", ids)
+
+    def delete_image(self, ids: list) -> int:
+        """Delete image marks by registry id; returns the number removed."""
+        return self._delete("image", ids)
+
+    def _search_batch(self, kind: str, vectors, k: int, min_similarity=None) -> list:
+        """
+        Search a (Q, d) query matrix in one FAISS call and return one
+        best-first result list per query.
+        """
+        index = self._get_index(kind)
+        queries = self._prepare(vectors, self._dimension(kind))
+        if index.ntotal == 0 or len(queries) == 0:
+            return [[] for _ in range(len(queries))]
+
+        is_hnsw = isinstance(self._base_index(index), faiss.IndexHNSW)
+        if min_similarity is None or is_hnsw:
+            # HNSW has no exact range search: fetch k neighbours and filter.
+            # Over-fetch so tombstoned vectors cannot crowd out live ones.
+            fetch = k
+            if is_hnsw:
+                fetch += self.metadata.tombstone_count(kind)
+            scores, indices = index.search(queries, min(fetch, index.ntotal))
+            hits = []
+            for row_scores, row_indices in zip(scores, indices):
+                valid = row_indices != -1
+                hits.append((row_scores[valid], row_indices[valid]))
+        else:
+            # Threshold inside FAISS; range_search results are unordered
+            if self.metric == "cosine":
+                radius = min_similarity
+            else:
+                radius = 2 * (1 - min_similarity)
+            lims, scores, indices = index.range_search(queries, radius)
+            hits = []
+            for start, end in zip(lims[:-1], lims[1:]):
+                row_scores, row_indices = scores[start:end], indices[start:end]
+                order = np.argsort(-row_scores if self.metric == "cosine" else row_scores, kind="stable")[:k]
+                hits.append((row_scores[order], row_indices[order]))
+
+        # Only the returned rows are read from the metadata store, once per
+        # distinct id; vectors without a row have been deleted
+        all_ids = np.unique(np.concatenate([row_indices for _, row_indices in hits]))
+        metadatas = self.metadata.get_many(kind, all_ids.tolist())
+
+        batch_results = []
+        for row_scores, row_indices in hits:
+            similarities = self._to_similarity(row_scores)
+            results = []
+            for idx, score, similarity in zip(row_indices.tolist(), row_scores.tolist(), similarities.tolist()):
+                if len(results) == k:
+                    break
+                if idx not in metadatas:
+                    continue
+                if min_similarity is not None and similarity < min_similarity:
+                    continue
+                results.append({"score": score, "similarity": similarity, "metadata": metadatas[idx]})
+            batch_results.append(results)
+        return batch_results
+
+    def search_text(self, vector: list, k: int = 5, min_similarity: float = None):
+        """
+        Nearest text vectors, best first.
+
+        Each result carries the raw FAISS `score` and the cosine `similarity`;
+        with `min_similarity` only results at or above that floor are returned.
+        """
+        return self._search_batch("text", [vector], k, min_similarity)[0]
+
+    def search_image(self, vector: list, k: int = 5, min_similarity: float = None):
+        """Nearest image vectors, best first (see search_text)."""
+        return self._search_batch("image", [vector], k, min_similarity)[0]
+
+    def search_text_batch(self, vectors, k: int = 5, min_similarity: float = None) -> list:
+        """
+        search_text for a (Q, 384) array of queries in a single FAISS call,
+        which lets BLAS/OpenMP work across queries. Returns Q result lists.
+        """
+        return self._search_batch("text", vectors, k, min_similarity)
+
+    def search_image_batch(self, vectors, k: int = 5, min_similarity: float = None) -> list:
+        """search_image for a (Q, 512) array of queries (see search_text_batch)."""
+        return self._search_batch("image", vectors, k, min_similarity)
 
 # Singleton
 vector_store = VectorStore()
@@ -0,0 +1,118 @@
+"""
+Benchmark: multi-index hashing (MIH) vs linear scan for pHash radius queries.
+
+Builds a synthetic corpus of random 64-bit hashes (10M by default), plants
+near-duplicates of the query hashes, and compares per-query latency of:
+- the linear scan DuplicateDetector used to run (Python loop over ints)
+- a vectorized NumPy popcount scan
+- the MultiIndexHash index
+
+With --cluster it instead times the all-pairs self-join that
+DuplicateDetector.cluster_hashes runs (e.g. 1M hashes at threshold 10).
+
+Usage (from backend/):
+    python -m scripts.benchmark_hash_index --size 10000000 --radius 10
+    python -m scripts.benchmark_hash_index --cluster --size 1000000 --radius 10
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.perceptual_hash import MultiIndexHash, hamming_distance, hamming_distances
+
+
+def make_corpus(size: int, queries: int, radius: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    hashes = rng.integers(0, 2 ** 64 - 1, size, dtype=np.uint64, endpoint=True)
+    query_hashes = rng.integers(0, 2 ** 64 - 1, queries, dtype=np.uint64, endpoint=True)
+
+    # Plant one near-duplicate per query, with flips spread over the whole hash
+    for i, query in enumerate(query_hashes):
+        bits = rng.choice(64, size=rng.integers(0, radius + 1), replace=False)
+        flips = np.uint64(0)
+        for bit in bits:
+            flips |= np.uint64(1) << np.uint64(bit)
+        hashes[rng.integers(0, size)] = query ^ flips
+    return hashes, query_hashes
+
+
+def time_queries(fn, queries) -> np.ndarray:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.array(timings)
+
+
+def report(name: str, timings: np.ndarray) -> None:
+    print(
+        f"   {name:22s} p50 {np.percentile(timings, 50):10.3f} ms"
+        f"   p95 {np.percentile(timings, 95):10.3f} ms"
+    )
+
+
+def run_benchmark(size: int, queries: int, radius: int, python_queries: int) -> None:
+    print(f"Corpus: {size:,} hashes, {queries} queries, radius {radius}")
+    hashes, query_hashes = make_corpus(size, queries, radius)
+    query_list = query_hashes.tolist()
+
+    start = time.perf_counter()
+    index = MultiIndexHash(hashes)
+    build_s = time.perf_counter() - start
+    print(f"   MIH build: {build_s:.2f} s ({index.num_tables} tables)")
+
+    # Exactness check against the vectorized scan
+    for query in query_list:
+        rows, _ = index.query(query, radius)
+        expected = np.flatnonzero(hamming_distances(query, hashes) <= radius)
+        assert np.array_equal(np.sort(rows), expected), "MIH missed a match"
+
+    hash_list = hashes.tolist()
+
+    def python_scan(query):
+        return [i for i, h in enumerate(hash_list) if hamming_distance(query, h) <= radius]
+
+    def numpy_scan(query):
+        return np.flatnonzero(hamming_distances(query, hashes) <= radius)
+
+    def mih_query(query):
+        return index.query(query, radius)
+
+    print("Latency per query:")
+    report("linear scan (Python)", time_queries(python_scan, query_list[:python_queries]))
+    report("linear scan (NumPy)", time_queries(numpy_scan, query_list))
+    report("MIH", time_queries(mih_query, query_list))
+
+
+def run_cluster_benchmark(size: int, radius: int) -> None:
+    print(f"Clustering: {size:,} hashes, threshold {radius}")
+    # ~5% of the corpus are planted near-duplicates of other entries
+    hashes, _ = make_corpus(size, size // 20, radius)
+
+    start = time.perf_counter()
+    index = MultiIndexHash(hashes)
+    pair_count = sum(len(rows_a) for rows_a, _ in index.pairs_within(radius))
+    elapsed = time.perf_counter() - start
+
+    print(f"   {pair_count:,} near-duplicate pairs in {elapsed:.1f} s")
+    print(f"   (all-pairs scan would need {size * (size - 1) // 2:,} comparisons)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=10_000_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--radius", type=int, default=10)
+    parser.add_argument("--cluster", action="store_true", help="Benchmark the all-pairs self-join")
+    parser.add_argument(
+        "--python-queries", type=int, default=3,
+        help="Queries timed with the (slow) pure-Python scan"
+    )
+    args = parser.parse_args()
+    if args.cluster:
+        run_cluster_benchmark(args.size, args.radius)
+    else:
+        run_benchmark(args.size, args.queries, args.radius, args.python_queries)
@@ -0,0 +1,78 @@
+"""
+Benchmark: heatmap overlay colorization and full rendering by image size.
+
+For square images from 256px to 4096px, times:
+- the per-pixel putpixel loop render_heatmap used to run (skipped above
+  --loop-max, where one call takes minutes)
+- the vectorized colorize() lookup-table path
+- the whole render_heatmap call (smoothing, colorize, composite, encode),
+  once at full size as PNG and once with the default bounded WebP output
+
+The attention map is a random CLIP-sized (7x7) patch grid.
+
+Usage (from backend/):
+    python -m scripts.benchmark_heatmap
+    python -m scripts.benchmark_heatmap --sizes 256 1024 4096 --repeats 5
+"""
+
+import argparse
+import time
+
+import numpy as np
+from PIL import Image
+
+from app.services.heatmap_render import COLORMAP, MAX_ALPHA, colorize, render_heatmap
+
+
+def colorize_loop(attention: np.ndarray) -> Image.Image:
+    """The original putpixel implementation, for comparison."""
+    height, width = attention.shape
+    heatmap = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    for x in range(width):
+        for y in range(height):
+            intensity = attention[y, x]
+            r, g, b = COLORMAP[min(255, int(intensity * 255))]
+            heatmap.putpixel((x, y), (r, g, b, int(intensity * MAX_ALPHA)))
+    return heatmap
+
+
+def best_of(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def run_benchmark(sizes, repeats: int, loop_max: int) -> None:
+    rng = np.random.default_rng(0)
+    print(f"{'size':>6s} {'putpixel loop':>15s} {'colorize':>12s} {'render full PNG':>16s} {'render default':>16s}")
+    for size in sizes:
+        image = Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8))
+        attention = rng.random((size, size))
+        grid = rng.random((7, 7)).astype(np.float32)
+
+        if size <= loop_max:
+            loop_ms = f"{best_of(lambda: colorize_loop(attention), 1):12.1f} ms"
+            # Same pixels as the loop
+            assert np.array_equal(np.asarray(colorize_loop(attention)), np.asarray(colorize(attention)))
+        else:
+            loop_ms = f"{'skipped':>15s}"
+        colorize_ms = best_of(lambda: colorize(attention), repeats)
+        full_ms = best_of(lambda: render_heatmap(image, grid, max_edge=0, format="png"), repeats)
+        render_ms = best_of(lambda: render_heatmap(image, grid), repeats)
+        print(f"{size:6d} {loop_ms} {colorize_ms:9.1f} ms {full_ms:13.1f} ms {render_ms:13.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 512, 1024, 2048, 4096])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--loop-max", type=int, default=1024, help="Largest size to time the putpixel loop at")
+    args = parser.parse_args()
+    run_benchmark(args.sizes, args.repeats, args.loop_max)
+
+
+if __name__ == "__main__":
+    main()
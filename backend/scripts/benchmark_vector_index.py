@@ -0,0 +1,103 @@
+"""
+Benchmark: recall vs latency of the VectorStore index types.
+
+Builds a synthetic corpus of clustered, L2-normalized 512-d vectors (the
+image modality), uses the flat index as exact ground truth, and reports for
+each approximate index type its build time (train + add), per-query latency
+and recall@k against the flat baseline.
+
+Usage (from backend/):
+    python -m scripts.benchmark_vector_index --size 200000 --queries 500
+    python -m scripts.benchmark_vector_index --types hnsw ivf_pq --nprobe 32
+"""
+
+import argparse
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from app.services.vector_store import INDEX_TYPES, VectorStore
+
+DIMENSION = 512
+
+
+def make_corpus(size: int, queries: int, clusters: int = 1000, seed: int = 0):
+    # Embeddings of real marks are clustered, not uniform; uniform data is
+    # a pathological case for every ANN index
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIMENSION)).astype(np.float32)
+    assignment = rng.integers(0, clusters, size + queries)
+    vectors = centers[assignment] + 0.3 * rng.standard_normal((size + queries, DIMENSION)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors[:size], vectors[size:]
+
+
+def build_store(directory: str, index_type: str, params: dict, corpus: np.ndarray, train_size: int):
+    store = VectorStore(
+        index_path=f"{directory}/{index_type}.index", index_type=index_type, index_params=params
+    )
+    start = time.perf_counter()
+    store.train(image_sample=corpus[:train_size])
+    # Skip metadata/disk writes: only the index itself is being measured
+    store.image_index.add_with_ids(corpus, np.arange(len(corpus), dtype=np.int64))
+    return store, time.perf_counter() - start
+
+
+def search_all(store: VectorStore, queries: np.ndarray, k: int):
+    timings = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        _, indices = store.image_index.search(query[None, :], k)
+        timings.append((time.perf_counter() - start) * 1000)
+        results.append(indices[0])
+    return np.array(timings), np.array(results)
+
+
+def recall_at_k(results: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(np.intersect1d(found, expected)) for found, expected in zip(results, truth))
+    return hits / truth.size
+
+
+def run_benchmark(size: int, queries: int, k: int, index_types: list, params: dict) -> None:
+    print(f"Corpus: {size:,} x {DIMENSION}-d vectors, {queries} queries, recall@{k}")
+    corpus, query_vectors = make_corpus(size, queries)
+    train_size = min(size, 40 * params["nlist"])
+
+    with tempfile.TemporaryDirectory() as directory:
+        baseline, build_s = build_store(directory, "flat", params, corpus, train_size)
+        timings, truth = search_all(baseline, query_vectors, k)
+        print(f"   {'type':10s} {'build':>9s} {'p50':>10s} {'p95':>10s} {'recall':>8s}")
+        print(
+            f"   {'flat':10s} {build_s:8.1f}s {np.percentile(timings, 50):8.3f}ms"
+            f" {np.percentile(timings, 95):8.3f}ms {1.0:8.3f}"
+        )
+
+        for index_type in index_types:
+            if index_type == "flat":
+                continue
+            store, build_s = build_store(directory, index_type, params, corpus, train_size)
+            timings, results = search_all(store, query_vectors, k)
+            print(
+                f"   {index_type:10s} {build_s:8.1f}s {np.percentile(timings, 50):8.3f}ms"
+                f" {np.percentile(timings, 95):8.3f}ms {recall_at_k(results, truth):8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES[1:]), choices=INDEX_TYPES)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    args = parser.parse_args()
+    run_benchmark(
+        args.size, args.queries, args.k, args.types,
+        {"nlist": args.nlist, "nprobe": args.nprobe, "ef_search": args.ef_search, "hnsw_m": args.hnsw_m},
+    )
@@ -1,25 +1,67 @@
 from app.services.vector_store import vector_store
+from app.services.phash_index import phash_index
+from app.services.mark_registry import mark_registry
 from app.services.embedding_service import embedding_service
-import os
+from app.services.image_context import ImageContext
+from pathlib import Path
+import hashlib
+import sys
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif"}
 
 def seed_data():
     print("Seeding dummy data...")
     
     # Dummy text trademarks
     trademarks = ["Starbucks", "Nike", "Apple", "Google", "Microsoft"]
-    for tm in trademarks:
-        print(f"Processing {tm}...")
-        # Add to text index (SBERT)
-        text_emb = embedding_service.get_text_embedding(tm)
-        vector_store.add_text(tm, text_emb, {"name": tm, "type": "text"})
-        
-        # Add to image index (CLIP Text) - Zero-Shot Concept Matching
-        clip_emb = embedding_service.get_clip_text_embedding(tm)
-        vector_store.add_image(tm, clip_emb, {"name": tm, "type": "text_concept"})
+    # Write the index files once at the end instead of after every vector.
+    # Adds are upserts keyed by id, so re-running the seed replaces marks
+    # instead of duplicating them.
+    with mark_registry.batch():
+        for tm in trademarks:
+            print(f"Processing {tm}...")
+            # Text index (SBERT) and image index (CLIP Text) - Zero-Shot Concept Matching
+            text_emb = embedding_service.get_text_embedding(tm)
+            clip_emb = embedding_service.get_clip_text_embedding(tm)
+            mark_registry.add_text_mark(tm, text_emb, clip_emb, {"name": tm, "type": "text"})
         
-    # TODO: Add dummy images if available
-    
     print("Seeding complete.")
 
+def seed_logo_images(image_dir: str):
+    """
+    Register every logo image in `image_dir` (file stem = mark name):
+    CLIP embedding into the vector store and pHash into the pHash index.
+    Logos registered by an earlier run from identical files are skipped;
+    changed files replace their mark in both.
+    """
+    paths = sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    print(f"Checking {len(paths)} logo images in {image_dir}...")
+    
+    seeded = 0
+    # Flush the vector store every 1000 logos so a long ingest can resume
+    with mark_registry.batch(flush_every=1000):
+        for path in paths:
+            content = path.read_bytes()
+            file_hash = hashlib.sha256(content).hexdigest()
+            # Logos share the image index with text concepts; keep their ids apart
+            mark_id = f"logo:{path.stem}"
+            registered = phash_index.get(mark_id)
+            if registered is not None and registered.get("sha256") == file_hash:
+                continue
+            
+            print(f"Processing {path.name}...")
+            image_ctx = ImageContext(content)
+            metadata = {"name": path.stem, "type": "logo", "file": path.name, "sha256": file_hash}
+            image_emb = embedding_service.get_image_embedding(image_ctx)
+            mark_registry.add_logo(mark_id, image_emb, embedding_service.get_phash(image_ctx), metadata)
+            seeded += 1
+    
+    print(f"Logo seeding complete: {seeded} new or changed logos.")
+
 if __name__ == "__main__":
+    # Stores saved before stable ids are read-only until converted
+    vector_store.migrate()
     seed_data()
+    # Optional: python -m scripts.seed_db path/to/logos
+    if len(sys.argv) > 1:
+        seed_logo_images(sys.argv[1])
@@ -0,0 +1,88 @@
+import numpy as np
+
+from app.services.analysis_cache import AnalysisCache
+from app.services.cache import DiskCache, LRUCache
+from app.services.embedding_cache import EmbeddingCache, _disk_caches
+
+
+def test_lru_cache_evicts_least_recently_used_within_bounds():
+    """Entries beyond max_items or max_bytes evict the least recently used."""
+    cache = LRUCache(max_items=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    assert cache.get("a") == b"1"  # "b" is now least recently used
+    cache.put("c", b"3")
+    assert "b" not in cache and "a" in cache and "c" in cache
+
+    cache = LRUCache(max_bytes=10)
+    cache.put("a", b"x" * 6)
+    cache.put("b", b"x" * 6)
+    assert "a" not in cache and cache.bytes == 6
+
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 1
+
+
+def test_disk_cache_is_shared_and_trimmed(tmp_path):
+    """Entries written by one DiskCache are read by another on the same file."""
+    path = str(tmp_path / "cache.db")
+    writer = DiskCache(path, max_items=3)
+    writer.TRIM_EVERY = 1
+    for i in range(5):
+        writer.put(f"k{i}", f"v{i}".encode())
+
+    reader = DiskCache(path)
+    assert reader.get("k4") == b"v4"
+    assert reader.get("k0") is None  # Oldest entries trimmed
+    assert reader.count() == 3
+
+
+def test_analysis_cache_drops_matches_of_older_store_versions(tmp_path):
+    """Model outputs survive a vector store change; match lists do not."""
+    cache = AnalysisCache(max_items=10, max_bytes=1 << 20, path=str(tmp_path / "analysis.db"))
+    entry = {"image_embedding": [0.1, 0.2], "detected_text": "ACME", "visual_matches": [{"similarity": 0.9}]}
+    cache.put("digest", 3, entry)
+
+    assert cache.get("digest", 3) == entry
+    assert cache.get("digest", 4) == {"image_embedding": [0.1, 0.2], "detected_text": "ACME"}
+    assert cache.get("other", 3) == {}
+
+    # Disk tier survives the in-memory tier
+    cache.clear()
+    assert cache.get("digest", 3) == entry
+
+
+def test_analysis_cache_ignores_entries_of_other_pipelines(tmp_path):
+    """Entries computed with other models or OCR settings are never served."""
+    path = str(tmp_path / "analysis.db")
+    AnalysisCache(path=path, pipeline="clip=a;ocr=fast").put("digest", 1, {"detected_text": "ACME"})
+
+    assert AnalysisCache(path=path, pipeline="clip=a;ocr=fast").get("digest", 1) == {"detected_text": "ACME"}
+    assert AnalysisCache(path=path, pipeline="clip=b;ocr=fast").get("digest", 1) == {}
+    assert AnalysisCache(path=path, pipeline="clip=a;ocr=full").get("digest", 1) == {}
+
+
+def test_embedding_cache_computes_each_normalized_text_once(tmp_path):
+    """Texts differing only in case/whitespace share one entry, also across caches on one file."""
+    calls = []
+
+    def compute(texts):
+        calls.append(list(texts))
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+    path = str(tmp_path / "embeddings.db")
+    cache = EmbeddingCache("model", 2, path=path)
+    vectors = cache.embed(["Nike", " NIKE ", "Apple"], compute)
+    assert calls == [["Nike", "Apple"]]
+    assert vectors.shape == (3, 2) and np.array_equal(vectors[0], vectors[1])
+
+    cache.embed(["nike"], compute)
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+    # Another worker (its own connection to the file) reads the disk tier
+    _disk_caches.clear()
+    other = EmbeddingCache("model", 2, path=path)
+    assert other.disk is not cache.disk
+    assert np.array_equal(other.get("apple"), vectors[2])
+    assert EmbeddingCache("other-model", 2, path=path).get("apple") is None
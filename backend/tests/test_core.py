@@ -2,7 +2,7 @@ import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 from app.services.embedding_service import embedding_service
-from app.services.vector_store import vector_store
+from app.services.vector_store import VectorStore
 from PIL import Image
 import io
 import numpy as np
@@ -24,19 +24,24 @@ def test_phash_generation():
     assert isinstance(phash, str)
     assert len(phash) > 0
 
-def test_vector_store_persistence():
+def test_vector_store_persistence(tmp_path):
     """Test that vector store saves and loads correctly."""
+    path = str(tmp_path / "vector_store.index")
+    store = VectorStore(index_path=path)
+
     # Add dummy data
     vector = np.random.rand(512).astype('float32')
-    vector_store.add_image("test_id", vector, {"test": "data"})
+    store.add_image("test_id", vector, {"test": "data"})
     
     # Check if files exist
-    assert os.path.exists("vector_store.index_image")
-    assert os.path.exists("vector_store.index.meta")
+    assert os.path.exists(path + "_image")
+    assert os.path.exists(path + ".db")
     
     # Reload
-    vector_store.load_index()
-    assert vector_store.image_index.ntotal > 0
+    reloaded = VectorStore(index_path=path)
+    assert reloaded.image_index.ntotal > 0
+    assert reloaded.metadata.find_ids("image", ["test_id"]).tolist() == [0]
+    assert reloaded.search_image(vector, k=1)[0]["metadata"] == {"test": "data"}
 
 def test_analyze_logo_endpoint():
     """Test the /analyze/logo endpoint."""
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from app.services.executors import TORCH_THREADS, StageLimit, cpu_executor, run_stage, shutdown
+from app.services.heatmap_render import render_heatmap
+
+
+def test_stage_limit_rejects_beyond_queue():
+    """Calls beyond concurrency + max_queue fail fast with 429."""
+    stage = StageLimit("test", concurrency=1, max_queue=1)
+    release = asyncio.Event()
+    entered = []
+
+    async def work():
+        async with stage.slot():
+            entered.append(True)
+            await release.wait()
+
+    async def main():
+        tasks = [asyncio.create_task(work()) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert stage.in_flight == 2 and stage.queued == 1
+
+        with pytest.raises(HTTPException) as exc_info:
+            await work()
+        assert exc_info.value.status_code == 429
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert stage.in_flight == 0 and len(entered) == 2
+
+    asyncio.run(main())
+
+
+def test_heatmap_renders_in_process_pool():
+    """render_heatmap runs in the CPU process pool and matches in-process output."""
+    image = Image.new("RGB", (64, 48), (200, 30, 30))
+    attention = np.random.default_rng(0).random((7, 7))
+
+    async def main():
+        return await run_stage("heatmap_render", render_heatmap, image, attention, executor=cpu_executor())
+
+    try:
+        assert asyncio.run(main()) == render_heatmap(image, attention)
+    finally:
+        shutdown()
+
+
+@pytest.mark.parametrize("loader", ["_load_sbert", "_load_clip"])
+def test_model_loaders_cap_torch_threads(monkeypatch, loader):
+    """Loading a model (on any thread, e.g. a micro-batcher's) caps torch's intra-op pool."""
+    torch = pytest.importorskip("torch")
+    sentence_transformers = pytest.importorskip("sentence_transformers")
+    transformers = pytest.importorskip("transformers")
+    from app.services import embedding_service
+
+    # The cap, not the weights, is under test
+    monkeypatch.setattr(sentence_transformers, "SentenceTransformer", lambda name: object())
+    for name in ("CLIPModel", "CLIPProcessor"):
+        monkeypatch.setattr(transformers, name, type(name, (), {"from_pretrained": staticmethod(lambda *a, **k: object())}))
+    previous = torch.get_num_threads()
+    torch.set_num_threads(TORCH_THREADS + 1)
+    try:
+        thread = threading.Thread(target=getattr(embedding_service, loader))
+        thread.start()
+        thread.join()
+        assert torch.get_num_threads() == TORCH_THREADS
+    finally:
+        torch.set_num_threads(previous)
@@ -0,0 +1,52 @@
+import base64
+import importlib
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.services import heatmap_render
+from app.services.heatmap_render import COLORMAP, MAX_ALPHA, colorize, heatmap_mime, render_heatmap
+
+
+def test_colorize_matches_per_pixel_colormap():
+    """The lookup-table overlay equals the per-pixel colormap and alpha."""
+    rng = np.random.default_rng(0)
+    attention = rng.random((17, 23))
+    attention[0, 0], attention[-1, -1] = 0.0, 1.0
+
+    overlay = np.asarray(colorize(attention))
+
+    assert overlay.shape == (17, 23, 4)
+    for y in range(17):
+        for x in range(23):
+            intensity = attention[y, x]
+            expected = COLORMAP[min(255, int(intensity * 255))] + (int(intensity * MAX_ALPHA),)
+            assert tuple(overlay[y, x]) == expected
+
+
+def test_render_heatmap_bounds_size_and_encodes_format():
+    """Overlays are downscaled to max_edge (keeping aspect) in the requested format."""
+    image = Image.new("RGB", (1600, 800), (30, 60, 90))
+    grid = np.random.default_rng(0).random((7, 7))
+
+    for format, pil_format in (("webp", "WEBP"), ("jpeg", "JPEG"), ("png", "PNG")):
+        rendered = Image.open(io.BytesIO(base64.b64decode(render_heatmap(image, grid, max_edge=400, format=format))))
+        assert rendered.format == pil_format
+        assert rendered.size == (400, 200)
+    assert heatmap_mime("webp") == "image/webp"
+
+    # 0 keeps the original size
+    rendered = Image.open(io.BytesIO(base64.b64decode(render_heatmap(image, grid, max_edge=0, format="png"))))
+    assert rendered.size == (1600, 800)
+
+
+@pytest.mark.parametrize("variable, value", [("HEATMAP_MODE", "svg"), ("HEATMAP_FORMAT", "gif")])
+def test_invalid_settings_fail_at_import(monkeypatch, variable, value):
+    """A bad HEATMAP_MODE or HEATMAP_FORMAT is rejected when the module loads, not per request."""
+    monkeypatch.setenv(variable, value)
+    with pytest.raises(ValueError, match=variable):
+        importlib.reload(heatmap_render)
+    monkeypatch.delenv(variable)
+    importlib.reload(heatmap_render)
@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing the app must not load any model or its framework; those load
+# at start-up warm-up or on first use (app.services.lazy_model).
+IMPORT_BUDGET_SECONDS = 5.0
+HEAVY_MODULES = ("torch", "transformers", "sentence_transformers", "easyocr", "diffusers")
+
+_PROBE = (
+    "import json, sys; import app.main; "
+    f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+)
+
+
+def test_app_import_is_fast_and_loads_no_models():
+    """`import app.main` stays within budget and imports no model framework."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+
+    if result.returncode != 0:
+        if "ModuleNotFoundError" in result.stderr and not any(m in result.stderr for m in HEAVY_MODULES):
+            pytest.skip(f"app dependency not installed: {result.stderr.strip().splitlines()[-1]}")
+        pytest.fail(result.stderr)
+
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+    assert elapsed < IMPORT_BUDGET_SECONDS, f"import app.main took {elapsed:.2f}s"
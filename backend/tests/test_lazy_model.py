@@ -0,0 +1,27 @@
+import pytest
+
+from app.services import lazy_model
+from app.services.lazy_model import LazyModel, load_errors, readiness, warm_up
+
+
+def test_warm_up_reports_failed_loads(monkeypatch):
+    """A failed load is recorded and raised after every model was attempted, and cleared by a later success."""
+    monkeypatch.setattr(lazy_model, "MODELS", [])
+    attempts = []
+
+    def flaky():
+        attempts.append(True)
+        if len(attempts) == 1:
+            raise OSError("weights not found")
+        return "model"
+
+    broken = LazyModel("broken", flaky)
+    fine = LazyModel("fine", lambda: "model")
+
+    with pytest.raises(RuntimeError, match="broken"):
+        warm_up()
+    assert readiness() == {"broken": False, "fine": True}
+    assert load_errors() == {"broken": "OSError: weights not found"}
+
+    assert broken.get() == "model"
+    assert load_errors() == {} and fine.loaded
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.micro_batcher import MicroBatcher
+
+
+def test_concurrent_calls_share_one_batch():
+    """Items submitted together are processed in a single batch_fn call."""
+    calls = []
+    batcher = MicroBatcher(lambda items: calls.append(list(items)) or [i * 2 for i in items], max_wait=0.05)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit_async(i) for i in range(10)))
+
+    assert asyncio.run(main()) == [i * 2 for i in range(10)]
+    assert calls == [list(range(10))]
+    batcher.close()
+
+
+def test_batches_are_capped_at_max_batch_size():
+    """No batch_fn call receives more than max_batch_size items."""
+    sizes = []
+    release = threading.Event()
+
+    def batch_fn(items):
+        release.wait()
+        sizes.append(len(items))
+        return items
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait=0.01)
+    futures = [batcher.submit(i) for i in range(10)]
+    release.set()
+
+    assert [f.result(timeout=5) for f in futures] == list(range(10))
+    assert max(sizes) <= 4 and sum(sizes) == 10
+    batcher.close()
+
+
+def test_batch_errors_reach_every_caller():
+    """An exception in batch_fn fails each future of that batch."""
+    def batch_fn(items):
+        raise ValueError("model failed")
+
+    batcher = MicroBatcher(batch_fn, max_wait=0.01)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+    batcher.close()
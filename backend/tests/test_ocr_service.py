@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from PIL import Image
+
+from app.services.ocr_service import OCRService, ocr_service
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeReader:
+    """EasyOCR stand-in: one text box per image whose top-left corner is white."""
+
+    def __init__(self, box_height):
+        self.box_height = box_height
+        self.detect_batches = []
+        self.read_sizes = []
+
+    def detect(self, batch, **kwargs):
+        images = batch if batch.ndim == 4 else batch[None]
+        self.detect_batches.append(len(images))
+        boxes = [[[0, 40, 0, self.box_height]] if image[0, 0, 0] > 128 else [] for image in images]
+        return boxes, [[] for _ in images]
+
+    def readtext(self, image, **kwargs):
+        self.read_sizes.append((image.shape[1], image.shape[0]))
+        return ["ACME"]
+
+
+@pytest.fixture
+def reader(monkeypatch):
+    fake = FakeReader(box_height=64)
+    monkeypatch.setattr(OCRService, "reader", property(lambda self: fake))
+    return fake
+
+
+def logo(size, text):
+    image = Image.new("RGB", size, (0, 0, 0))
+    if text:
+        image.paste((255, 255, 255), (0, 0, 64, 64))
+    return image
+
+
+def test_gate_skips_recognition_without_text(reader):
+    """Images the low-resolution detector finds no text in are never recognized."""
+    assert ocr_service.extract_text(logo((800, 600), text=False)) == ""
+    assert reader.read_sizes == []
+
+
+@pytest.mark.parametrize("box_height, read_size", [(64, (512, 256)), (8, (1024, 512))])
+def test_recognition_resolution_follows_text_size(reader, box_height, read_size):
+    """Large text is read below OCR_MAX_SIZE, and the caller's image is left unchanged."""
+    reader.box_height = box_height
+    image = logo((2048, 1024), text=True)
+
+    assert ocr_service.extract_text(image) == "ACME"
+    assert image.size == (2048, 1024)
+    # Capped to 1024x512, gated at 512x256: 64px gate boxes are 128px text,
+    # which only needs OCR_TEXT_HEIGHT (32) px, so the gate resolution is read
+    assert reader.read_sizes == [read_size]
+
+
+def test_batch_api_detects_once_per_batch(reader):
+    """extract_texts runs one detection call per batch and keeps input order."""
+    images = [logo((300 + 10 * i, 200), text=i % 2 == 0) for i in range(5)]
+
+    assert ocr_service.extract_texts(images, batch_size=4) == ["ACME", "", "ACME", "", "ACME"]
+    assert reader.detect_batches == [4, 1]
+    assert len(reader.read_sizes) == 3
+
+
+def test_unknown_modes_are_rejected(reader):
+    """Bad per-call modes raise instead of silently using the fast path; so does a bad OCR_MODE."""
+    with pytest.raises(ValueError, match="ful"):
+        ocr_service.extract_text(logo((100, 100), text=True), mode="ful")
+    with pytest.raises(ValueError, match="ful"):
+        ocr_service.extract_texts([logo((100, 100), text=True)], mode="ful")
+
+    # In a fresh interpreter: reloading here would register a second reader
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.services.ocr_service"], cwd=BACKEND_DIR,
+        env=dict(os.environ, OCR_MODE="ful"), capture_output=True, text=True
+    )
+    assert result.returncode != 0 and "Unknown OCR_MODE 'ful'" in result.stderr
@@ -0,0 +1,244 @@
+from PIL import Image, ImageDraw
+import io
+import numpy as np
+from pathlib import Path
+
+from app.services.perceptual_hash import (
+    DuplicateDetector,
+    HashAlgorithm,
+    HashStore,
+    ImageHash,
+    MultiIndexHash,
+    PerceptualHasher,
+    compute_all_hashes,
+    compute_ahash,
+    compute_dhash,
+    compute_phash,
+    hamming_distance,
+    hash_thumbnails,
+    hash_to_hex,
+    load_and_preprocess,
+    thumbnail_size,
+)
+
+def create_test_image(size=(120, 90)):
+    """Create a simple image with some structure to hash."""
+    img = Image.new('RGB', size, color='white')
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((10, 10, 70, 70), fill='red')
+    draw.rectangle((60, 30, 110, 80), fill='blue')
+    return img
+
+def test_in_memory_sources_match_file(tmp_path):
+    """Paths, bytes, PIL images and arrays all produce the same hash."""
+    img = create_test_image()
+    path = tmp_path / "logo.png"
+    img.save(path)
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+
+    for func in (compute_phash, compute_ahash, compute_dhash):
+        expected = func(path)
+        assert func(buffer.getvalue()) == expected
+        assert func(img) == expected
+        assert func(np.array(img)) == expected
+
+def test_float_and_out_of_range_arrays_match_uint8():
+    """Arrays are clipped to 0-255 uint8 first, also when already at thumbnail size."""
+    rng = np.random.default_rng(1)
+    for func, shape in ((compute_phash, (32, 32)), (compute_ahash, (8, 8)), (compute_dhash, (8, 9)), (compute_phash, (50, 40))):
+        raw = rng.uniform(-300, 700, shape)
+        pixels = np.clip(raw, 0, 255).astype(np.uint8)
+        assert func(raw) == func(pixels) == func(Image.fromarray(pixels))
+
+def test_compute_all_hashes_matches_individual():
+    """The single-decode path is bit-identical to the individual functions."""
+    img = create_test_image()
+    hashes = compute_all_hashes(img)
+    assert hashes[HashAlgorithm.PHASH] == compute_phash(img)
+    assert hashes[HashAlgorithm.AHASH] == compute_ahash(img)
+    assert hashes[HashAlgorithm.DHASH] == compute_dhash(img)
+
+def test_hash_image_in_memory_has_no_path():
+    """In-memory images are hashed without a backing file."""
+    hasher = PerceptualHasher(algorithm=HashAlgorithm.PHASH)
+    result = hasher.hash_image(create_test_image())
+    assert result.path is None
+    assert len(result.hash_hex) == 16
+
+def test_batched_kernels_match_single_image_hashes():
+    """The (N, H, W) kernels are bit-identical to the per-image functions."""
+    rng = np.random.default_rng(0)
+    images = [create_test_image()] + [
+        Image.fromarray(rng.integers(0, 256, (64, 48, 3), dtype=np.uint8))
+        for _ in range(5)
+    ]
+    single = {
+        HashAlgorithm.PHASH: compute_phash,
+        HashAlgorithm.AHASH: compute_ahash,
+        HashAlgorithm.DHASH: compute_dhash,
+    }
+
+    for algorithm, func in single.items():
+        size = thumbnail_size(algorithm)
+        stack = np.stack([load_and_preprocess(img, size) for img in images])
+        hashes = hash_thumbnails(stack, algorithm)
+        assert hashes.dtype == np.uint64
+        assert hashes.tolist() == [func(img) for img in images]
+
+def test_hash_batch_uses_chunked_workers(tmp_path):
+    """Batch hashing matches single hashing and reports unreadable files."""
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"logo_{i}.png"
+        create_test_image((100 + 10 * i, 90)).save(path)
+        paths.append(path)
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+    paths.append(broken)
+
+    hasher = PerceptualHasher(algorithm=HashAlgorithm.PHASH)
+    results = {r.path: r for r in hasher.hash_batch(paths, workers=2, batch_size=2)}
+
+    assert len(results) == 6
+    assert not results[broken].success
+    for path in paths[:-1]:
+        assert results[path].hash_hex == hasher.hash_image(path).hash_hex
+
+def test_hash_batch_iter_streams_lazily_in_order(tmp_path):
+    """A lazy path generator is consumed in bounded batches and order is kept."""
+    paths = []
+    for i in range(9):
+        path = tmp_path / f"logo_{i}.png"
+        create_test_image((80 + 7 * i, 90)).save(path)
+        paths.append(path)
+
+    consumed = []
+    def lazy_paths():
+        for path in paths:
+            consumed.append(path)
+            yield path
+
+    with PerceptualHasher(algorithm=HashAlgorithm.DHASH) as hasher:
+        stream = hasher.hash_batch_iter(
+            lazy_paths(), workers=2, batch_size=2, max_in_flight=2, ordered=True
+        )
+        first = next(stream)
+        # Only the batches allowed in flight have been pulled from the generator
+        assert len(consumed) <= 2 * 3
+        results = [first] + list(stream)
+        # The pool is reused across calls
+        again = hasher.hash_batch(paths, workers=2, batch_size=4, ordered=True)
+
+    assert [r.path for r in results] == paths
+    assert [r.hash_hex for r in again] == [r.hash_hex for r in results]
+
+def test_multi_index_hash_matches_linear_scan():
+    """MIH returns exactly the hashes a linear scan finds within the radius."""
+    rng = np.random.default_rng(1)
+    base = rng.integers(0, 2 ** 63, 200, dtype=np.uint64) * np.uint64(2)
+    # Near-duplicates of the base hashes, including flips in the top bits
+    hashes = base
+    for bit_count in range(1, 13):
+        bits = rng.integers(0, 64, (len(base), bit_count)).astype(np.uint64)
+        flips = np.bitwise_or.reduce(np.uint64(1) << bits, axis=1)
+        hashes = np.concatenate([hashes, base ^ flips])
+
+    hash_list = hashes.tolist()
+    for num_tables in (None, 3, 5):
+        index = MultiIndexHash(hashes, num_tables=num_tables)
+        for query in hashes[::97].tolist():
+            for radius in (0, 3, 10, 16):
+                rows, distances = index.query(query, radius)
+                expected = [
+                    i for i, h in enumerate(hash_list)
+                    if hamming_distance(query, h) <= radius
+                ]
+                assert sorted(rows.tolist()) == expected
+                assert distances.tolist() == sorted(distances.tolist())
+
+def test_cluster_hashes_matches_brute_force_pairs():
+    """Index-backed clustering finds every pair a quadratic scan would."""
+    rng = np.random.default_rng(2)
+    base = rng.integers(0, 2 ** 63, 300, dtype=np.uint64)
+    bits = rng.integers(0, 64, (300, 6)).astype(np.uint64)
+    hashes = np.concatenate([base, base ^ np.bitwise_or.reduce(np.uint64(1) << bits, axis=1)])
+    hash_list = hashes.tolist()
+
+    index = MultiIndexHash(hashes)
+    pairs = set()
+    for rows_a, rows_b in index.pairs_within(10):
+        for pair in zip(rows_a.tolist(), rows_b.tolist()):
+            assert pair not in pairs
+            pairs.add(pair)
+    expected = {
+        (i, j)
+        for i in range(len(hash_list))
+        for j in range(i + 1, len(hash_list))
+        if hamming_distance(hash_list[i], hash_list[j]) <= 10
+    }
+    assert pairs == expected
+
+    detector = DuplicateDetector(threshold=10)
+    groups = detector.cluster_hashes([
+        ImageHash(path=None, hash_value=h, hash_hex=hash_to_hex(h), algorithm=HashAlgorithm.PHASH)
+        for h in hash_list
+    ])
+    grouped = {img.hash_value for g in groups for img in g.images}
+    assert grouped == {hash_list[i] for pair in expected for i in pair}
+    for group in groups:
+        values = [img.hash_value for img in group.images]
+        assert group.max_distance == max(
+            hamming_distance(a, b) for a in values for b in values
+        )
+
+def test_hash_store_round_trip_memory_mapped(tmp_path):
+    """A saved store reloads memory-mapped and answers scans and detector queries."""
+    rng = np.random.default_rng(3)
+    hashes = rng.integers(0, 2 ** 63, 1000, dtype=np.uint64)
+    paths = [f"marks/{i % 400}.png" for i in range(1000)]
+
+    store = HashStore()
+    store.extend(hashes[:-1], paths[:-1])
+    store.add(int(hashes[-1]))
+    store.save(tmp_path / "marks")
+
+    loaded = HashStore.load(tmp_path / "marks")
+    assert isinstance(loaded.hashes, np.memmap)
+    assert len(loaded) == 1000
+    assert loaded.path(0) == Path("marks/0.png")
+    assert loaded.ids[400] == loaded.ids[0]  # interned
+    assert loaded.path(999) is None
+
+    query = int(hashes[123]) ^ 0b101
+    rows, distances = loaded.scan(query, 4)
+    assert rows.tolist() == [123] and distances.tolist() == [2]
+
+    # Appending after a memory-mapped load copies the columns into memory
+    loaded.add(query, "marks/new.png")
+    assert len(loaded) == 1001 and loaded.path(1000) == Path("marks/new.png")
+    assert HashStore.load(tmp_path / "marks").hashes.tolist() == hashes.tolist()
+
+    image = create_test_image()
+    detector = DuplicateDetector(threshold=4)
+    store.add(PerceptualHasher().hash_image(image).hash_value, "marks/logo.png")
+    detector.load_hashes(store)
+    matches = detector.find_matches(image)
+    assert [m.path for m in matches] == [Path("marks/logo.png")]
+
+
+def test_hash_store_save_keeps_mapped_readers_valid(tmp_path):
+    """Saving over a store replaces its files, so a reader mapping the old ones is unaffected."""
+    store = HashStore()
+    store.extend(np.arange(100, dtype=np.uint64), [f"marks/{i}.png" for i in range(100)])
+    store.save(tmp_path / "marks")
+    reader = HashStore.load(tmp_path / "marks")
+
+    writer = HashStore.load(tmp_path / "marks")
+    writer.extend(np.full(1000, 7, dtype=np.uint64), ["marks/other.png"] * 1000)
+    writer.save(tmp_path / "marks")
+
+    assert reader.hashes.tolist() == list(range(100))
+    assert reader.path(99) == Path("marks/99.png")
+    assert len(HashStore.load(tmp_path / "marks")) == 1100
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")] == []
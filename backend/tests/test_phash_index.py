@@ -0,0 +1,65 @@
+import pickle
+
+import numpy as np
+
+from app.services.mark_registry import MarkRegistry
+from app.services.perceptual_hash import HashAlgorithm, HashStore
+from app.services.phash_index import PHashIndex
+from app.services.vector_store import VectorStore
+
+NIKE = 0x0F0F0F0F0F0F0F0F
+ACME = 0xF0F0F0F0F0F0F0F0
+
+
+def test_marks_are_upserted_and_deleted_by_id(tmp_path):
+    """Replaced and deleted marks stop matching, in memory and after a reload."""
+    path = str(tmp_path / "vector_store.index")
+    index = PHashIndex(path)
+    index.add("logo:nike", NIKE, {"name": "nike"}, save=False)
+    index.add("logo:acme", ACME, {"name": "acme"}, save=False)
+    index.add("logo:nike", ACME ^ 1, {"name": "nike", "version": 2}, save=False)
+
+    assert index.search(NIKE) == []
+    assert [r["id"] for r in index.search(ACME)] == ["logo:acme", "logo:nike"]
+    assert index.search(ACME)[1]["metadata"] == {"name": "nike", "version": 2}
+
+    assert index.delete(["logo:acme", "logo:missing"], save=False) == 1
+    assert [r["id"] for r in index.search(ACME)] == ["logo:nike"]
+
+    index.save_index()
+    reloaded = PHashIndex(path)
+    assert len(reloaded.store) == 1
+    assert reloaded.ids() == {"logo:nike"}
+    assert reloaded.get("logo:nike") == {"name": "nike", "version": 2}
+    assert reloaded.get("logo:acme") is None
+
+
+def test_index_saved_before_upserts_keeps_last_row_per_id(tmp_path):
+    """Row-keyed metadata and repeated ids of older saves resolve to the last row."""
+    prefix = str(tmp_path / "vector_store.index_phash")
+    store = HashStore(HashAlgorithm.PHASH)
+    store.extend(np.array([NIKE, ACME, NIKE ^ 1], dtype=np.uint64), ["logo:nike", "logo:acme", "logo:nike"])
+    store.save(prefix)
+    with open(prefix + ".meta", "wb") as f:
+        pickle.dump({0: {"name": "old"}, 1: {"name": "acme"}, 2: {"name": "new"}}, f)
+
+    index = PHashIndex(str(tmp_path / "vector_store.index"))
+    results = index.search(NIKE)
+    assert [(r["id"], r["metadata"]["name"]) for r in results] == [("logo:nike", "new")]
+    assert index.get("logo:acme") == {"name": "acme"}
+
+
+def test_registry_writes_and_deletes_both_stores(tmp_path):
+    """A logo added or deleted through the registry changes the vector store and pHash index together."""
+    path = str(tmp_path / "vector_store.index")
+    registry = MarkRegistry(VectorStore(index_path=path), PHashIndex(path))
+    vector = np.random.rand(512).astype(np.float32)
+
+    with registry.batch():
+        registry.add_logo("logo:nike", vector, NIKE, {"name": "nike"})
+    assert PHashIndex(path).ids() == {"logo:nike"}
+    assert VectorStore(index_path=path).search_image(vector, k=1)[0]["metadata"] == {"name": "nike"}
+
+    assert registry.delete(["logo:nike"]) == 2
+    assert PHashIndex(path).search(NIKE) == []
+    assert VectorStore(index_path=path).search_image(vector, k=1) == []
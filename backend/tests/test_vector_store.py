@@ -0,0 +1,260 @@
+import os
+import pytest
+import numpy as np
+from unittest.mock import MagicMock
+
+from app.services.vector_store import VectorStore
+
+@pytest.fixture
+def store(tmp_path):
+    return VectorStore(index_path=str(tmp_path / "vector_store.index"))
+
+def random_vectors(n, dim):
+    vectors = np.random.rand(n, dim).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_batch_add_writes_once(store, tmp_path):
+    """Adds inside batch() are saved once when the batch exits."""
+    store.save_index = MagicMock(wraps=store.save_index)
+
+    with store.batch():
+        store.add_image_batch(["a", "b"], random_vectors(2, 512), [{"name": "a"}, {"name": "b"}])
+        store.add_text("c", random_vectors(1, 384)[0], {"name": "c"})
+        assert store.save_index.call_count == 0
+
+    assert store.save_index.call_count == 1
+    reloaded = VectorStore(index_path=str(tmp_path / "vector_store.index"))
+    assert reloaded.image_index.ntotal == 2
+    assert reloaded.text_index.ntotal == 1
+
+def test_batch_size_triggered_flush(store):
+    """flush_every bounds how much unsaved work a long batch accumulates."""
+    store.save_index = MagicMock(wraps=store.save_index)
+
+    with store.batch(flush_every=2):
+        for i in range(5):
+            store.add_text(str(i), random_vectors(1, 384)[0], {"name": str(i)})
+
+    # Two size-triggered flushes plus the final one
+    assert store.save_index.call_count == 3
+    # The override only lasts for the batch
+    assert store.flush_every == 0
+
+def test_ivf_index_requires_training_and_persists_type(tmp_path):
+    """IVF stores must be trained before adds and reopen with their saved type."""
+    path = str(tmp_path / "vector_store.index")
+    store = VectorStore(index_path=path, index_type="ivf_flat", index_params={"nlist": 4, "nprobe": 4})
+
+    with pytest.raises(RuntimeError):
+        store.add_image("a", random_vectors(1, 512)[0], {"name": "a"})
+
+    store.train(text_sample=random_vectors(64, 384), image_sample=random_vectors(64, 512))
+    vectors = random_vectors(20, 512)
+    store.add_image_batch([str(i) for i in range(20)], vectors, [{"name": str(i)} for i in range(20)])
+
+    # Reopening without an explicit type uses the persisted config
+    reloaded = VectorStore(index_path=path)
+    assert reloaded.index_type == "ivf_flat"
+    assert reloaded.index_params["nprobe"] == 4
+    assert reloaded.search_image(vectors[7], k=1)[0]["metadata"] == {"name": "7"}
+
+def test_rebuild_converts_flat_store(store):
+    """rebuild() carries existing vectors over to the new index type."""
+    vectors = random_vectors(10, 512)
+    store.add_image_batch([str(i) for i in range(10)], vectors, [{"name": str(i)} for i in range(10)])
+
+    store.rebuild("hnsw")
+
+    assert store.index_type == "hnsw"
+    assert store.image_index.ntotal == 10
+    assert store.search_image(vectors[3], k=1)[0]["metadata"] == {"name": "3"}
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_cosine_similarity_and_floor(tmp_path, index_type):
+    """Results carry cosine similarity; min_similarity drops weaker matches."""
+    store = VectorStore(index_path=str(tmp_path / "vector_store.index"), index_type=index_type, metric="cosine")
+    query = np.zeros(384, dtype=np.float32)
+    query[0] = 1
+    # Unnormalized vectors at cosine 1.0, 0.8 and 0.0 from the query
+    vectors = np.zeros((3, 384), dtype=np.float32)
+    vectors[0, 0] = 5
+    vectors[1, :2] = [0.8 * 3, 0.6 * 3]
+    vectors[2, 1] = 2
+    store.add_text_batch(["a", "b", "c"], vectors, [{"name": n} for n in "abc"])
+
+    results = store.search_text(query * 7, k=3)
+    assert [r["metadata"]["name"] for r in results] == ["a", "b", "c"]
+    assert np.allclose([r["similarity"] for r in results], [1.0, 0.8, 0.0], atol=1e-5)
+
+    results = store.search_text(query, k=3, min_similarity=0.5)
+    assert [r["metadata"]["name"] for r in results] == ["a", "b"]
+
+def test_metadata_migrates_from_legacy_pickle(tmp_path):
+    """A pickled .meta dict is imported into the SQLite metadata store once."""
+    import pickle
+    path = str(tmp_path / "vector_store.index")
+    with open(path + ".meta", "wb") as f:
+        pickle.dump({"text_0": {"name": "Nike"}, "image_0": {"name": "Nike logo"}}, f)
+
+    store = VectorStore(index_path=path)
+    assert store.metadata.get("text", 0) == {"name": "Nike"}
+    assert not os.path.exists(path + ".db")  # Reads do not import it
+
+    store.metadata.migrate()
+    assert os.path.exists(path + ".db")
+    assert store.metadata.get("image", 0) == {"name": "Nike logo"}
+    assert VectorStore(index_path=path).metadata.count("text") == 1
+
+def test_search_reads_only_returned_metadata(store):
+    """Search materializes metadata for the top-k rows only."""
+    vectors = random_vectors(50, 512)
+    store.add_image_batch([str(i) for i in range(50)], vectors, [{"name": str(i)} for i in range(50)])
+    store.metadata.get_many = MagicMock(wraps=store.metadata.get_many)
+
+    results = store.search_image(vectors[0], k=3)
+
+    assert len(results) == 3
+    (kind, ids), _ = store.metadata.get_many.call_args
+    assert kind == "image" and len(ids) == 3
+
+def test_mmap_index_loads_lazily_and_reloads_for_writes(tmp_path):
+    """Saved indexes are mapped on first use and copied into memory before a write."""
+    path = str(tmp_path / "vector_store.index")
+    store = VectorStore(index_path=path)
+    vectors = random_vectors(10, 512)
+    store.add_image_batch([str(i) for i in range(10)], vectors, [{"name": str(i)} for i in range(10)])
+
+    reloaded = VectorStore(index_path=path, mmap=True)
+    assert reloaded._indexes == {}
+    assert reloaded.search_image(vectors[4], k=1)[0]["metadata"] == {"name": "4"}
+    assert "image" not in reloaded._writable
+
+    reloaded.add_image("10", random_vectors(1, 512)[0], {"name": "10"})
+    assert "image" in reloaded._writable
+    assert VectorStore(index_path=path, mmap=True).image_index.ntotal == 11
+
+def test_concurrent_first_searches_load_index_once(tmp_path):
+    """Threads racing on a cold store share one lazily loaded index."""
+    from concurrent.futures import ThreadPoolExecutor
+    path = str(tmp_path / "vector_store.index")
+    vectors = random_vectors(10, 512)
+    VectorStore(index_path=path).add_image_batch([str(i) for i in range(10)], vectors, [{"name": str(i)} for i in range(10)])
+
+    store = VectorStore(index_path=path, mmap=True)
+    reads = []
+    read_index = store._read_index
+    store._read_index = lambda kind, mmap: reads.append(kind) or read_index(kind, mmap)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda i: store.search_image(vectors[i], k=1), range(10)))
+
+    assert reads == ["image"]
+    assert [r[0]["metadata"]["name"] for r in results] == [str(i) for i in range(10)]
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_upsert_and_delete_by_id(tmp_path, index_type):
+    """Re-adding an id replaces the mark; deleted marks are never returned."""
+    store = VectorStore(index_path=str(tmp_path / "vector_store.index"), index_type=index_type)
+    vectors = random_vectors(3, 512)
+    store.add_image_batch(["a", "b", "c"], vectors, [{"name": n} for n in "abc"])
+
+    # Upsert "a" with b's vector: only one "a" remains
+    store.add_image("a", vectors[1], {"name": "a2"})
+    assert store.metadata.count("image") == 3
+    names = [r["metadata"]["name"] for r in store.search_image(vectors[1], k=3)]
+    assert sorted(names) == ["a2", "b", "c"]
+
+    assert store.delete_image(["b", "missing"]) == 1
+    names = [r["metadata"]["name"] for r in store.search_image(vectors[1], k=3)]
+    assert sorted(names) == ["a2", "c"]
+
+    # rebuild() compacts away tombstones and removed vectors
+    store.rebuild()
+    assert store.image_index.ntotal == 2
+
+def test_legacy_index_is_read_only_until_migrated(tmp_path):
+    """Legacy stores are searched in place; migrate() keeps their positions as FAISS ids."""
+    import faiss, pickle
+    path = str(tmp_path / "vector_store.index")
+    vectors = random_vectors(2, 384)
+    legacy = faiss.IndexFlatL2(384)
+    legacy.add(vectors)
+    faiss.write_index(legacy, path + "_text")
+    faiss.write_index(faiss.IndexFlatL2(512), path + "_image")
+    with open(path + ".meta", "wb") as f:
+        pickle.dump({"text_0": {"name": "Nike"}, "text_1": {"name": "Apple"}}, f)
+
+    files = sorted(p.name for p in tmp_path.iterdir())
+    legacy_bytes = open(path + "_text", "rb").read()
+
+    store = VectorStore(index_path=path)
+    # Searching a legacy store only reads it
+    assert store.search_text(vectors[1], k=1)[0]["metadata"] == {"name": "Apple"}
+    assert sorted(p.name for p in tmp_path.iterdir()) == files
+    assert open(path + "_text", "rb").read() == legacy_bytes
+    with pytest.raises(RuntimeError, match="migrate"):
+        store.add_text("Nike", vectors[0], {"name": "Nike"})
+
+    store.migrate()
+    store.migrate()  # Idempotent
+    assert not any(p.name.endswith(".tmp") for p in tmp_path.iterdir())
+    store.add_text("Nike", vectors[0], {"name": "Nike", "updated": True})
+    assert store.text_index.ntotal == 2
+    assert store.search_text(vectors[0], k=1)[0]["metadata"]["updated"]
+    assert VectorStore(index_path=path).search_text(vectors[1], k=1)[0]["metadata"] == {"name": "Apple"}
+
+def test_batch_search_matches_single_queries(store):
+    """search_image_batch returns the same per-query results as search_image."""
+    vectors = random_vectors(40, 512)
+    store.add_image_batch([str(i) for i in range(40)], vectors, [{"name": str(i)} for i in range(40)])
+    queries = random_vectors(6, 512)
+
+    for min_similarity in (None, 0.75):
+        batch = store.search_image_batch(queries, k=4, min_similarity=min_similarity)
+        assert len(batch) == 6
+        for query, results in zip(queries, batch):
+            assert results == store.search_image(query, k=4, min_similarity=min_similarity)
+
+def test_version_changes_with_contents(tmp_path):
+    """Adds and deletes bump the persisted contents version; searches do not."""
+    store = VectorStore(index_path=str(tmp_path / "vector_store.index"))
+    assert store.version == 0
+
+    store.add_text("a", random_vectors(1, 384)[0], {"name": "a"})
+    after_add = store.version
+    assert after_add > 0
+    store.search_text(random_vectors(1, 384)[0])
+    assert store.version == after_add
+
+    store.delete_text(["a"])
+    assert store.version > after_add
+    assert VectorStore(index_path=str(tmp_path / "vector_store.index")).version == store.version
+
+def test_loaded_version_follows_the_loaded_indexes(tmp_path):
+    """Another process's writes move `version` but not this store's `loaded_version`."""
+    path = str(tmp_path / "vector_store.index")
+    writer = VectorStore(index_path=path)
+    writer.add_text("a", random_vectors(1, 384)[0], {"name": "a"})
+    assert writer.loaded_version == writer.version
+
+    reader = VectorStore(index_path=path, mmap=True)
+    loaded = reader.loaded_version
+    assert loaded == writer.version
+
+    writer.add_text("b", random_vectors(1, 384)[0], {"name": "b"})
+    assert reader.version > loaded
+    assert reader.loaded_version == loaded
+
+    reader.load_index()
+    assert reader.loaded_version == writer.version
+
+def test_reads_of_a_new_store_write_nothing(tmp_path):
+    """Searches and version reads of an empty store create no files; the first add does."""
+    store = VectorStore(index_path=str(tmp_path / "vector_store.index"))
+    assert store.search_text(random_vectors(1, 384)[0]) == []
+    assert store.version == 0 and store.loaded_version == 0
+    assert store.metadata.count("image") == 0
+    assert list(tmp_path.iterdir()) == []
+
+    store.add_text("a", random_vectors(1, 384)[0], {"name": "a"})
+    assert os.path.exists(tmp_path / "vector_store.index.db")
+    assert store.version == store.loaded_version == 1
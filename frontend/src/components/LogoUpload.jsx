@@ -1,11 +1,53 @@
 "use client";
-import React, { useState } from 'react';
+import React, { useMemo, useState } from 'react';
 import { UploadCloud, Loader2, AlertTriangle, Shield, Activity, ArrowRight } from 'lucide-react';
 import { storageService } from '../services/storageService';
 import { analyzeLogoRisk, fileToBase64 } from '../services/geminiService';
 import { useLanguage } from '../context/LanguageContext';
 import { backendService } from '../services/apiService';
 
+// Same inferno-like colormap the backend uses (app/services/heatmap_render.py)
+const heatColor = (t) => {
+    if (t < 0.25) return [t * 4 * 60, 0, t * 4 * 140];
+    if (t < 0.5) return [60 + (t - 0.25) * 4 * 195, 0, 140 - (t - 0.25) * 4 * 140];
+    if (t < 0.75) return [255, (t - 0.5) * 4 * 165, 0];
+    return [255, 165 + (t - 0.75) * 4 * 90, (t - 0.75) * 4 * 80];
+};
+
+// Colorize an attention grid (backend HEATMAP_MODE=grid) client-side. The
+// browser's smooth upscaling of the tiny canvas stands in for the blur.
+const gridToDataUrl = (grid, aspectRatio = 1) => {
+    const cells = document.createElement('canvas');
+    cells.width = grid[0].length;
+    cells.height = grid.length;
+    const cellsCtx = cells.getContext('2d');
+    const pixels = cellsCtx.createImageData(cells.width, cells.height);
+    grid.flat().forEach((t, i) => {
+        const [r, g, b] = heatColor(t);
+        pixels.data.set([r, g, b, t * 180], i * 4);
+    });
+    cellsCtx.putImageData(pixels, 0, 0);
+
+    // Stretch to the upload's aspect ratio like the server-side overlay
+    const canvas = document.createElement('canvas');
+    canvas.width = 64;
+    canvas.height = Math.max(1, Math.round(64 / aspectRatio));
+    const ctx = canvas.getContext('2d');
+    ctx.imageSmoothingEnabled = true;
+    ctx.drawImage(cells, 0, 0, canvas.width, canvas.height);
+    return canvas.toDataURL();
+};
+
+const heatmapSource = (result) => {
+    if (result?.heatmap) {
+        return `data:${result.heatmap_mime || 'image/png'};base64,${result.heatmap}`;
+    }
+    if (result?.heatmap_grid) {
+        return gridToDataUrl(result.heatmap_grid, result.metadata?.aspect_ratio);
+    }
+    return null;
+};
+
 const LogoUpload = ({ onAnalysisComplete }) => {
     const { t } = useLanguage();
     const [file, setFile] = useState(null);
@@ -17,6 +59,7 @@ const LogoUpload = ({ onAnalysisComplete }) => {
     const [backendResult, setBackendResult] = useState(null);
     const [showHeatmap, setShowHeatmap] = useState(false);
     const [error, setError] = useState(null);
+    const heatmapSrc = useMemo(() => heatmapSource(backendResult), [backendResult]);
 
     const handleFileChange = (e) => {
         if (e.target.files && e.target.files[0]) {
@@ -83,7 +126,7 @@ const LogoUpload = ({ onAnalysisComplete }) => {
                 }));
 
                 // Auto-show heatmap if available
-                if (backendData?.heatmap) {
+                if (backendData?.heatmap || backendData?.heatmap_grid) {
                     setShowHeatmap(true);
                 }
 
@@ -128,9 +171,9 @@ const LogoUpload = ({ onAnalysisComplete }) => {
                     {preview ? (
                         <>
                             <img src={preview} alt="Preview" className="h-full w-full object-contain p-4 opacity-80" />
-                            {showHeatmap && backendResult?.heatmap && (
+                            {showHeatmap && heatmapSrc && (
                                 <img
-                                    src={`data:image/png;base64,${backendResult.heatmap}`}
+                                    src={heatmapSrc}
                                     alt="Heatmap"
                                     className="absolute inset-0 h-full w-full object-contain p-4 opacity-70 animate-fade-in mix-blend-overlay"
                                 />
@@ -153,7 +196,7 @@ const LogoUpload = ({ onAnalysisComplete }) => {
                     <div className="absolute bottom-0 right-0 w-2 h-2 border-b border-r border-neutral-600"></div>
 
                     {/* Heatmap Toggle Control */}
-                    {backendResult?.heatmap && preview && (
+                    {heatmapSrc && preview && (
                         <div className="absolute bottom-4 right-4 z-20">
                             <button
                                 onClick={(e) => {